@@ -0,0 +1,51 @@
+"""比较逐个参数查找的旧分发路径与预编译分发计划的耗时
+
+运行：python -m benchmarks.dispatch_plan
+"""
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from telegram import Chat, Message, Update, User  # noqa: E402
+
+from meido.builtins.dispatcher import HandlerDispatcher  # noqa: E402
+from tests.conftest import make_context, make_update  # noqa: E402
+
+
+class LegacyDispatcher(HandlerDispatcher):
+    """关闭分发计划，每次分发都重新检查签名并查找 catch 函数"""
+
+
+LegacyDispatcher._plan_supported = False
+
+
+class Plugin:
+    def start(self, update: Update, message: Message, user: User, chat: Chat, flag: bool = True):
+        return update, message, user, chat, flag
+
+
+def bench(dispatcher_class, number: int) -> float:
+    dispatcher = dispatcher_class()
+    plugin = Plugin()
+    update, context = make_update(1), make_context()
+
+    def run():
+        dispatcher.dispatch(plugin.start, update=update, context=context)()
+
+    run()
+    return min(timeit.repeat(run, number=number, repeat=5)) / number
+
+
+def main(number: int = 20000) -> None:
+    legacy = bench(LegacyDispatcher, number)
+    planned = bench(HandlerDispatcher, number)
+    print(f"legacy : {legacy * 1e6:8.2f} us/dispatch")
+    print(f"planned: {planned * 1e6:8.2f} us/dispatch")
+    print(f"speedup: {legacy / planned:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
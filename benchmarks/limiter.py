@@ -0,0 +1,64 @@
+"""以约 10k updates/s 的速率向 LimiterHandler 输入来自 50k 个用户的 update
+
+统计每批 update 的处理耗时（包括分片清理），以及桶表的大小。运行：python -m benchmarks.limiter
+"""
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from telegram.ext import ApplicationHandlerStop  # noqa: E402
+
+from meido.handler.limiterhandler import LimiterHandler  # noqa: E402
+from meido.utils.log import logger  # noqa: E402
+from tests.conftest import make_update  # noqa: E402
+
+RATE = 10_000
+USERS = 50_000
+SECONDS = 5
+BATCH = 100
+
+
+async def bench() -> None:
+    logger.disabled = True  # 只测量限流本身，不包括写入日志
+    handler = LimiterHandler()
+    random.seed(0)
+    # 少数活跃用户产生大部分 update，从而同时覆盖被限制与未被限制的情况
+    weights = [1 / (i + 1) for i in range(USERS)]
+    user_ids = random.choices(range(1, USERS + 1), weights=weights, k=RATE * SECONDS)
+    updates = [make_update(i, user_id=user_id) for i, user_id in enumerate(user_ids)]
+
+    batch_times, limited = [], 0
+    interval = BATCH / RATE
+    start = time.perf_counter()
+    for offset in range(0, len(updates), BATCH):
+        batch_start = time.perf_counter()
+        for update in updates[offset : offset + BATCH]:
+            try:
+                await handler.limiter_callback(update, None)
+            except ApplicationHandlerStop:
+                limited += 1
+        batch_times.append(time.perf_counter() - batch_start)
+        if (delay := start + (offset // BATCH + 1) * interval - time.perf_counter()) > 0:
+            await asyncio.sleep(delay)
+    elapsed = time.perf_counter() - start
+
+    per_update = sum(batch_times) / len(updates)
+    batch_times.sort()
+    print(f"updates : {len(updates)} in {elapsed:.2f}s ({len(updates) / elapsed:,.0f}/s offered {RATE:,}/s)")
+    print(f"limited : {limited}")
+    print(f"cost    : {per_update * 1e6:.2f} us/update, capacity ~{1 / per_update:,.0f} updates/s")
+    print(
+        f"batch   : median {statistics.median(batch_times) * 1e3:.3f} ms"
+        f"  p99 {batch_times[int(len(batch_times) * 0.99)] * 1e3:.3f} ms  max {batch_times[-1] * 1e3:.3f} ms"
+    )
+    print(f"buckets : {len(handler.buckets)} users tracked")
+
+
+if __name__ == "__main__":
+    asyncio.run(bench())
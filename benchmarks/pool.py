@@ -0,0 +1,76 @@
+"""以本地的 Bot API 桩服务器比较固定大小的连接池与 PoolController 处理 500 个并发 sendMessage 的耗时
+
+桩服务器对每个请求等待 50ms 后返回，以模拟网络与服务器的延迟。运行：python -m benchmarks.pool
+"""
+import asyncio
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from telegram import Bot  # noqa: E402
+
+from meido.override.telegram import HTTPXRequest  # noqa: E402
+
+CONCURRENCY = 500
+LATENCY = 0.05
+MAX_SIZE = 256
+
+_RESULTS = {
+    "getMe": {"id": 1, "is_bot": True, "first_name": "stub", "username": "stub_bot"},
+    "sendMessage": {"message_id": 1, "date": 0, "chat": {"id": 1, "type": "private"}, "text": "hello"},
+}
+
+
+async def _serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """只支持 keep-alive 的 HTTP/1.1 POST 请求"""
+    try:
+        while request_line := await reader.readline():
+            length = 0
+            while (line := await reader.readline()) not in (b"\r\n", b""):
+                name, _, value = line.decode().partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            await asyncio.sleep(LATENCY)
+            method = request_line.split()[1].decode().rsplit("/", 1)[-1]
+            body = json.dumps({"ok": True, "result": _RESULTS.get(method, True)}).encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def run(label: str, port: int, pool_size: int, pool_min_size: Optional[int]) -> None:
+    request = HTTPXRequest(connection_pool_size=pool_size, pool_timeout=None, pool_min_size=pool_min_size)
+    bot = Bot("123:stub", base_url=f"http://127.0.0.1:{port}/bot", request=request)
+    async with bot:
+        start = time.perf_counter()
+        await asyncio.gather(*(bot.send_message(chat_id=1, text="hello") for _ in range(CONCURRENCY)))
+        elapsed = time.perf_counter() - start
+    stats = "" if request.pool is None else f"  {request.pool.stats()}"
+    print(f"{label:22}: {elapsed:6.2f}s{stats}")
+
+
+async def main() -> None:
+    logging.disable(logging.WARNING)  # 不记录每个请求的日志
+    server = await asyncio.start_server(_serve, "127.0.0.1", 0, backlog=1024)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        await run(f"fixed {MAX_SIZE}", port, MAX_SIZE, None)
+        await run(f"controller 16-{MAX_SIZE}", port, MAX_SIZE, 16)
+        await run("fixed 16", port, 16, None)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""以模拟的 Bot API 检查 RateLimiter 是否会触发 RetryAfter，以及非发送消息的请求是否被 chat 的限流拖慢
+
+模拟的服务器按与 RateLimiter 相同的限制检查每个请求，超出限制时抛出 RetryAfter。
+每个 chat 依次发送 sendChatAction、getChatMember 与 sendMessage，多个 chat 并发执行；
+legacy 表示所有带有 chat_id 的请求都受 chat 的限流。运行：python -m benchmarks.ratelimiter
+"""
+import asyncio
+import statistics
+import sys
+import time
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Union
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from telegram.error import RetryAfter  # noqa: E402
+
+from meido.ratelimiter import RateLimiter, _Bucket  # noqa: E402
+from meido.utils.log import logger  # noqa: E402
+
+LIMITS = {"overall_rate": 1000, "private_rate": 5, "group_rate": 2, "group_burst": 5}
+PRIVATE_CHATS = 40
+GROUP_CHATS = 10
+MESSAGES = 10
+SLACK = 0.005
+"""服务器允许的计时误差（秒）"""
+
+
+class FakeBotAPI:
+    """按与 RateLimiter 相同的限制检查请求的 Bot API"""
+
+    def __init__(self, overall_rate: float, private_rate: float, group_rate: float, group_burst: int):
+        self.overall = _Bucket(overall_rate, max(int(overall_rate), 1))
+        self.private_rate = private_rate
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.chats: Dict[int, _Bucket] = {}
+        self.retry_after = 0
+        self.latencies: Dict[str, List[float]] = {}
+
+    def _check(self, bucket: _Bucket, now: float) -> None:
+        if bucket.delay(now) > SLACK:
+            self.retry_after += 1
+            raise RetryAfter(1)
+        bucket.consume(now)
+
+    async def call(self, endpoint: str, chat_id: int, sent_at: float) -> Union[bool, dict]:
+        now = asyncio.get_running_loop().time()
+        self._check(self.overall, now)
+        if endpoint in RateLimiter._message_endpoints:  # pylint: disable=W0212
+            if (bucket := self.chats.get(chat_id)) is None:
+                if chat_id > 0:
+                    bucket = self.chats[chat_id] = _Bucket(self.private_rate, 1)
+                else:
+                    bucket = self.chats[chat_id] = _Bucket(self.group_rate, self.group_burst)
+            self._check(bucket, now)
+        self.latencies.setdefault(endpoint, []).append(now - sent_at)
+        await asyncio.sleep(0.001)
+        return True
+
+
+class _Everything:
+    def __contains__(self, item: object) -> bool:
+        return True
+
+
+class LegacyRateLimiter(RateLimiter):
+    """所有带有 chat_id 的请求都受 chat 的限流"""
+
+    _message_endpoints = _Everything()
+
+
+async def _chat(limiter: RateLimiter, api: FakeBotAPI, chat_id: int) -> None:
+    loop = asyncio.get_running_loop()
+    for _ in range(MESSAGES):
+        for endpoint in ("sendChatAction", "getChatMember", "sendMessage"):
+            callback = partial(api.call, endpoint, chat_id, loop.time())
+            try:
+                await limiter.process_request(callback, (), {}, endpoint, {"chat_id": chat_id}, None)
+            except RetryAfter:
+                pass
+
+
+async def run(limiter_class) -> None:
+    limiter, api = limiter_class(**LIMITS, max_retries=0), FakeBotAPI(**LIMITS)
+    chats = [i + 1 for i in range(PRIVATE_CHATS)] + [-(i + 1) for i in range(GROUP_CHATS)]
+    start = time.perf_counter()
+    await asyncio.gather(*(_chat(limiter, api, chat_id) for chat_id in chats))
+    elapsed = time.perf_counter() - start
+    await limiter.shutdown()
+    print(f"{limiter_class.__name__}: {elapsed:.2f}s  RetryAfter {api.retry_after}")
+    for endpoint, latencies in api.latencies.items():
+        latencies.sort()
+        print(
+            f"  {endpoint:15} median {statistics.median(latencies) * 1e3:8.2f} ms"
+            f"  p99 {latencies[int(len(latencies) * 0.99)] * 1e3:8.2f} ms"
+        )
+
+
+async def main() -> None:
+    logger.disabled = True
+    await run(RateLimiter)
+    await run(LegacyRateLimiter)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,150 @@
+"""比较 python-telegram-bot 逐个 group 检查与 PluginRouter 路由 200 个插件的耗时
+
+每个插件占用一个 group，包含一个命令、一个 callback query 与一个消息正则的 handler；
+另有少量无法建立索引的 group。此外比较逐个 re.match / re.search 与 CombinedRegex 匹配 200 个正则表达式的耗时。
+运行：python -m benchmarks.router
+"""
+import asyncio
+import random
+import re
+import string
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from telegram.ext import (  # noqa: E402
+    ApplicationHandlerStop,
+    BaseHandler,
+    CallbackQueryHandler,
+    CommandHandler,
+    MessageHandler,
+    filters,
+)
+
+from meido.handler.combinedregex import CombinedRegex, mergeable_pattern  # noqa: E402
+from meido.handler.router import PluginRouter  # noqa: E402
+from tests.conftest import make_bot, make_callback_update, make_update  # noqa: E402
+
+PLUGINS = 200
+GENERIC = 5
+
+
+async def _callback(update, context):
+    return None
+
+
+def build_groups() -> List[List[BaseHandler]]:
+    groups = []
+    for i in range(PLUGINS):
+        groups.append(
+            [
+                CommandHandler(f"cmd{i}", _callback),
+                CallbackQueryHandler(_callback, pattern=f"^plugin{i}:"),
+                MessageHandler(filters.Regex(re.compile(f"^keyword{i}\\b")) & filters.ChatType.PRIVATE, _callback),
+            ]
+        )
+    for _ in range(GENERIC):
+        groups.append([MessageHandler(filters.PHOTO, _callback)])
+    return groups
+
+
+class _Application:
+    bot = SimpleNamespace(defaults=None)
+
+    @staticmethod
+    async def process_error(update, error, **_):
+        return False
+
+
+async def process_linear(groups: List[List[BaseHandler]], update, application, context) -> None:
+    """Application.process_update 的处理方式"""
+    for handlers in groups:
+        try:
+            for handler in handlers:
+                check = handler.check_update(update)
+                if check is not None and check is not False:
+                    await handler.handle_update(update, application, check, context)
+                    break
+        except ApplicationHandlerStop:
+            break
+        except Exception as exc:  # pylint: disable=W0703
+            if await application.process_error(update=update, error=exc):
+                break
+
+
+async def process_router(router: PluginRouter, update, application, context) -> None:
+    if (check := router.check_update(update)) is not None:
+        try:
+            await router.handle_update(update, application, check, context)
+        except ApplicationHandlerStop:
+            pass
+
+
+async def bench(number: int = 2000) -> None:
+    groups = build_groups()
+    router = PluginRouter()
+    for group, handlers in enumerate(groups):
+        router.add_handlers(group, handlers)
+    bot = make_bot()
+    updates = {
+        "command": make_update(1, text=f"/cmd{PLUGINS - 1} arg", bot=bot),
+        "callback": make_callback_update(2, data=f"plugin{PLUGINS - 1}:1"),
+        "regex": make_update(3, text=f"keyword{PLUGINS - 1} hello", bot=bot),
+        "miss": make_update(4, text="hello", bot=bot),
+    }
+    application = _Application()
+    for name, update in updates.items():
+        results = []
+        for label, run in (
+            ("linear", lambda: process_linear(groups, update, application, SimpleNamespace())),
+            ("router", lambda: process_router(router, update, application, SimpleNamespace())),
+        ):
+            await run()
+            start = time.perf_counter()
+            for _ in range(number):
+                await run()
+            results.append((label, (time.perf_counter() - start) / number))
+        (_, linear), (_, routed) = results
+        print(f"{name:8}: linear {linear * 1e6:8.2f} us  router {routed * 1e6:8.2f} us  {linear / routed:6.2f}x")
+
+
+def bench_regex(number: int = 2000) -> None:
+    rand = random.Random(0)
+    words = ["".join(rand.choices(string.ascii_lowercase, k=rand.randint(4, 8))) for _ in range(PLUGINS)]
+    # 一半的正则表达式以 ^ 开头，re.search 时只有这一半能够按字面前缀索引
+    patterns = [re.compile(f"{'^' if i % 2 else ''}{word}\\d*\\b") for i, word in enumerate(words)]
+    texts = {
+        "miss": "今天的天气怎么样？ what a nice day to go outside and play " * 2,
+        "hit": f"{words[-1]}42 and {words[0]} now",
+    }
+    for search in (False, True):
+        combined: CombinedRegex[int] = CombinedRegex(search=search)
+        for value, pattern in enumerate(patterns):
+            combined.add(mergeable_pattern(pattern), value)
+        for name, text in texts.items():
+            methods = [i.search if search else i.match for i in patterns]
+            results = []
+            for run in (
+                lambda: {value for value, method in enumerate(methods) if method(text)},
+                lambda: combined.find(text),
+            ):
+                expected = run()
+                start = time.perf_counter()
+                for _ in range(number):
+                    run()
+                results.append(((time.perf_counter() - start) / number, expected))
+            (sequential, expected), (merged, found) = results
+            assert expected == found
+            label = f"{'search' if search else 'match'} {name}"
+            print(f"{label:12}: sequential {sequential * 1e6:8.2f} us  combined {merged * 1e6:8.2f} us  ", end="")
+            print(f"{sequential / merged:6.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(bench())
+    bench_regex()
@@ -0,0 +1,30 @@
+"""命令行入口"""
+import argparse
+from pathlib import Path
+
+from meido.application import Application
+from meido.config import config
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="meido")
+    parser.add_argument(
+        "--profile-startup",
+        nargs="?",
+        const=True,
+        default=False,
+        metavar="OUTPUT",
+        help="分析启动过程，并将结果写入 OUTPUT（默认为 cache/startup_profile.json）",
+    )
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        config.profile_startup = True
+        if args.profile_startup is not True:
+            config.profile_startup_output = Path(args.profile_startup)
+
+    Application.build().launch()
+
+
+if __name__ == "__main__":
+    main()
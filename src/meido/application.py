@@ -9,6 +9,7 @@ from typing import Callable, List, Optional, TYPE_CHECKING, TypeVar
 import pytz
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from telegram import Bot, Update
 from telegram.error import NetworkError, TelegramError, TimedOut
 from telegram.ext import (
@@ -21,13 +22,17 @@ from typing_extensions import ParamSpec
 from uvicorn import Server
 
 from meido.config import config as application_config
+from meido.dependence.redis import Redis
 from meido.handler.limiterhandler import LimiterHandler
+from meido.handler.router import PluginRouter
 from meido.manager import Managers
 from meido.override.telegram import HTTPXRequest
 from meido.ratelimiter import RateLimiter
 from meido.utils.const import WRAPPER_ASSIGNMENTS
 from meido.utils.log import logger
+from meido.utils.metrics import MetricsRegistry
 from meido.utils.singleton import Singleton
+from meido.utils.workers import WorkerPools
 
 if TYPE_CHECKING:
     from asyncio import Task
@@ -53,6 +58,10 @@ class Application(Singleton):
         self.managers = managers
         self.telegram = telegram
         self.web_server = web_server
+        self.workers = WorkerPools(application_config.thread_pool_size, application_config.process_pool_size)
+        self.metrics = MetricsRegistry()
+        self.router = PluginRouter() if application_config.plugin_router else None
+        self._setup_metrics()
         self.managers.set_application(application=self)  # 给 managers 设置 application
         self.managers.build_executor("Application")
 
@@ -77,6 +86,8 @@ class Application(Singleton):
                     write_timeout=application_config.write_timeout,
                     connect_timeout=application_config.connect_timeout,
                     pool_timeout=application_config.pool_timeout,
+                    http_version=application_config.http_version,
+                    pool_min_size=application_config.connection_pool_min_size,
                 )
             )
             .rate_limiter(RateLimiter())
@@ -92,6 +103,37 @@ class Application(Singleton):
         )
         return cls(managers, telegram, web_server)
 
+    def _setup_metrics(self) -> None:
+        """导出 handler、job、工作池及 Bot API 连接池的指标"""
+        for key in ("max_workers", "in_flight", "max_in_flight", "queue_depth", "submitted", "completed", "failed"):
+            self.metrics.add_collector(
+                f"worker_pool_{key}",
+                f"Worker pool {key.replace('_', ' ')}.",
+                lambda k=key: (({"pool": pool.name}, pool.stats()[k]) for pool in self.workers.pools),
+            )
+        if (pool := getattr(self.telegram.bot.request, "pool", None)) is not None:
+            for key, metric_type in (
+                ("size", "gauge"),
+                ("in_flight", "gauge"),
+                ("waiting", "gauge"),
+                ("acquired", "counter"),
+                ("timeouts", "counter"),
+                ("wait_seconds", "counter"),
+            ):
+                self.metrics.add_collector(
+                    f"http_pool_{key}_total" if metric_type == "counter" else f"http_pool_{key}",
+                    f"Bot API connection pool {key.replace('_', ' ')}.",
+                    lambda k=key: (({}, pool.stats()[k]),),
+                    metric_type,
+                )
+        if self.web_server is not None and (path := application_config.webserver.metrics_path):
+            self.web_app.add_api_route(
+                path,
+                lambda: PlainTextResponse(self.metrics.render(), media_type="text/plain; version=0.0.4"),
+                methods=["GET"],
+                include_in_schema=False,
+            )
+
     @property
     def running(self) -> bool:
         """bot 是否正在运行"""
@@ -121,11 +163,30 @@ class Application(Singleton):
 
     async def initialize(self):
         """BOT 初始化"""
-        self.telegram.add_handler(LimiterHandler(limit_time=10), group=-1)  # 启用入口洪水限制
-        await self.managers.start_dependency()  # 启动基础服务
-        await self.managers.init_components()  # 实例化组件
-        await self.managers.start_services()  # 启动其他服务
-        await self.managers.install_plugins()  # 安装插件
+        limiter = LimiterHandler(limit_time=10)
+        self.telegram.add_handler(limiter, group=-1)  # 启用入口洪水限制
+        if self.router is not None:
+            self.telegram.add_handler(self.router, group=id(self.router))  # 所有插件的 handler 由 router 统一路由
+        timeline = self.managers.timeline
+        if application_config.profile_startup:
+            timeline.enable_profiling()
+        with timeline.span("startup", "dependence"):
+            await self.managers.start_dependency()  # 启动基础服务
+        if application_config.distributed_limiter and (redis := self.managers.dependency_map.get(Redis)) is not None:
+            limiter.use_redis(redis.client)
+        with timeline.span("startup", "component"):
+            await self.managers.init_components()  # 实例化组件
+        with timeline.span("startup", "service"):
+            await self.managers.start_services()  # 启动其他服务
+        with timeline.span("startup", "plugin"):
+            await self.managers.install_plugins()  # 安装插件
+        logger.info("启动耗时：\n%s", timeline.report())
+        if timeline.profiling:
+            try:
+                timeline.dump(application_config.profile_startup_output)
+                logger.info("启动分析结果已保存至 %s", application_config.profile_startup_output)
+            except OSError as e:
+                logger.warning("启动分析结果保存失败：%s", e)
 
     async def shutdown(self):
         """BOT 关闭"""
@@ -229,6 +290,7 @@ class Application(Singleton):
             await self.telegram.updater.stop()
 
         await self.shutdown()
+        self.workers.shutdown()
 
         if self.telegram.running:
             await self.telegram.stop()
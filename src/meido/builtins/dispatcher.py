@@ -1,24 +1,29 @@
 """参数分发器"""
 import asyncio
+import contextlib
 import inspect
 from abc import ABC, abstractmethod
 from asyncio import AbstractEventLoop
-from functools import cached_property, lru_cache, partial, wraps
+from functools import lru_cache, partial, wraps
 from inspect import Parameter, Signature
-from itertools import chain
-from types import GenericAlias, MethodType
+from operator import attrgetter
+from types import FunctionType, GenericAlias, MappingProxyType, MethodType
 from typing import (
     Any,
     Callable,
+    ClassVar,
     Dict,
     List,
+    Mapping,
+    NamedTuple,
     Optional,
     Sequence,
+    Tuple,
     Type,
     Union,
 )
+from weakref import WeakKeyDictionary
 
-from arkowrapper import ArkoWrapper
 from fastapi import FastAPI
 from telegram import Bot as TelegramBot, Chat, Message, Update, User
 from telegram.ext import Application as TelegramApplication, CallbackContext, Job
@@ -31,6 +36,8 @@ from meido.utils.typedefs import R, T
 
 __all__ = (
     "catch",
+    "DispatchPlan",
+    "DispatchContext",
     "AbstractDispatcher",
     "BaseDispatcher",
     "HandlerDispatcher",
@@ -44,11 +51,31 @@ TargetType = Union[Type, str, Callable[[Any], bool]]
 
 _CATCH_TARGET_ATTR = "_catch_targets"
 
+_PLANNED_DISPATCH_FUNCS = ("dispatch_by_catch_funcs", "dispatch_by_default")
+"""会被编译进分发计划的 dispatch 方法"""
+
+_CATCH_CACHE_ATTR = "_meido_catch_cache"
+"""在 CallbackContext 上缓存 catch_func 结果的属性名"""
+
 
 def catch(*targets: Union[str, Type]) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """将方法标记为 catch_func
+
+    catch_func 可以是异步函数。同一个 update 中每个 catch_func 最多只会被执行一次，
+    其结果会被所有需要它的参数共享，且只有在被分发的函数确实需要时才会执行。
+    """
+
     def decorate(func: Callable[P, R]) -> Callable[P, R]:
         setattr(func, _CATCH_TARGET_ATTR, targets)
 
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func, assigned=WRAPPER_ASSIGNMENTS)
+            async def async_wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+                return await func(*args, **kwargs)
+
+            return async_wrapper
+
         @wraps(func, assigned=WRAPPER_ASSIGNMENTS)
         def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
             return func(*args, **kwargs)
@@ -65,11 +92,176 @@ def get_signature(func: Union[type, Callable]) -> Signature:
     return inspect.signature(func)
 
 
+class _PlanItem(NamedTuple):
+    name: str
+    default: Any
+    catch_target: Optional[Union[str, Type]]
+    default_type: Optional[Type]
+    catch_async: bool = False
+
+
+def _provide(catch_func: Callable, dispatcher: Any, cache: Dict[Callable, Any]) -> Any:
+    """执行 catch_func 并缓存结果，异步的 catch_func 会被包装为 Future 以便共享"""
+    try:
+        return cache[catch_func]
+    except KeyError:
+        if isinstance(dispatcher, DispatchContext) and inspect.iscoroutinefunction(catch_func):
+            # 共享的 Future 可能比发起它的分发存活得更久，因此使用独立的上下文执行
+            owner = dispatcher.fork()
+            result = asyncio.ensure_future(catch_func(owner))
+            result.add_done_callback(lambda _: owner.release())
+        else:
+            result = catch_func(dispatcher)
+            if inspect.isawaitable(result):
+                result = asyncio.ensure_future(result)
+        cache[catch_func] = result
+        return result
+
+
+class DispatchPlan:
+    """预编译的分发计划
+
+    记录函数的每个参数应当从何处取值（catch_func、默认依赖或参数默认值）。
+    同一个分发器类对同一个函数只会编译一次，之后每次分发只需按计划取值。
+    """
+
+    __slots__ = ("items", "is_async")
+
+    def __init__(self, items: Tuple[_PlanItem, ...]) -> None:
+        self.items = items
+        self.is_async = any(item.catch_async for item in items)
+
+    def resolve(self, dispatcher: "Union[AbstractDispatcher, DispatchContext]") -> Dict[str, Any]:
+        """按计划从 dispatcher 中取出所有参数"""
+        if self.is_async:
+            raise TypeError("This function requires async catch funcs, use `adispatch` instead.")
+        params = {}
+        catch_func_map = dispatcher.catch_func_map
+        cache = dispatcher.catch_cache()
+        for name, default, catch_target, default_type, _ in self.items:
+            value = default
+            if catch_target is not None:
+                value = _provide(catch_func_map[catch_target], dispatcher, cache)
+            if default_type is not None and (dispatched_value := dispatcher.resolve_default(default_type)) is not None:
+                value = dispatched_value
+            params[name] = value
+        return params
+
+    async def aresolve(self, dispatcher: "Union[AbstractDispatcher, DispatchContext]") -> Dict[str, Any]:
+        """按计划从 dispatcher 中取出所有参数，支持异步的 catch_func"""
+        if not self.is_async:
+            return self.resolve(dispatcher)
+        params = {}
+        catch_func_map = dispatcher.catch_func_map
+        cache = dispatcher.catch_cache()
+        for name, default, catch_target, default_type, catch_async in self.items:
+            value = default
+            if catch_target is not None:
+                value = _provide(catch_func_map[catch_target], dispatcher, cache)
+                if catch_async:
+                    # 同一个 Future 被多个 handler 共享，不能因其中一个被取消而取消
+                    value = await asyncio.shield(value)
+            if default_type is not None and (dispatched_value := dispatcher.resolve_default(default_type)) is not None:
+                value = dispatched_value
+            params[name] = value
+        return params
+
+
+class DispatchContext:
+    """单次分发的上下文
+
+    只保存本次分发的 update 与 context，其余属性均从所属的分发器中获取，
+    从而使同一个分发器可以同时为多个并发的 update 分发参数。
+    上下文在创建后不可修改，分发结束后会被放回空闲列表中复用。
+    """
+
+    __slots__ = ("_dispatcher", "_update", "_context", "_cache")
+
+    _free: ClassVar[List["DispatchContext"]] = []
+    _max_free: ClassVar[int] = 256
+
+    _dispatcher: "AbstractDispatcher"
+    _update: Optional[Update]
+    _context: Optional[CallbackContext]
+    _cache: Optional[Dict[Callable, Any]]
+
+    @classmethod
+    def acquire(
+        cls,
+        dispatcher: "AbstractDispatcher",
+        update: Optional[Update] = None,
+        context: Optional[CallbackContext] = None,
+    ) -> "DispatchContext":
+        try:
+            instance = cls._free.pop()
+        except IndexError:
+            instance = object.__new__(cls)
+        object.__setattr__(instance, "_dispatcher", dispatcher)
+        object.__setattr__(instance, "_update", update)
+        object.__setattr__(instance, "_context", context)
+        object.__setattr__(instance, "_cache", None)
+        return instance
+
+    def fork(self) -> "DispatchContext":
+        """获取一个与本次分发相同的上下文，其生命周期与本上下文无关"""
+        return self.acquire(self._dispatcher, self._update, self._context)
+
+    def release(self) -> None:
+        """清空上下文并放回空闲列表"""
+        object.__setattr__(self, "_dispatcher", None)
+        object.__setattr__(self, "_update", None)
+        object.__setattr__(self, "_context", None)
+        object.__setattr__(self, "_cache", None)
+        if len(self._free) < self._max_free:
+            self._free.append(self)
+
+    def resolve_default(self, annotation: Type[T]) -> Optional[T]:
+        # 默认依赖与单次分发无关，直接交由分发器处理
+        return self._dispatcher.resolve_default(annotation)
+
+    def catch_cache(self) -> Dict[Callable, Any]:
+        """catch_func 的结果缓存
+
+        缓存保存在本次 update 的 CallbackContext 上，因此同一个 update 的所有 handler 共享同一份缓存
+        """
+        if self._cache is None:
+            cache = getattr(self._context, _CATCH_CACHE_ATTR, None)
+            if cache is None:
+                cache = {}
+                if self._context is not None:
+                    with contextlib.suppress(AttributeError):
+                        setattr(self._context, _CATCH_CACHE_ATTR, cache)
+            object.__setattr__(self, "_cache", cache)
+        return self._cache
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        raise AttributeError(f"'{self.__class__.__name__}' object is immutable")
+
+    def __getattr__(self, item: str) -> Any:
+        value = getattr(self._dispatcher, item)
+        if isinstance(value, MethodType) and value.__self__ is self._dispatcher:
+            # 将分发器的方法重新绑定到上下文上，使其读取的是本次分发的 update 与 context
+            return MethodType(value.__func__, self)
+        return value
+
+
 class AbstractDispatcher(ABC):
     """参数分发器"""
 
     IGNORED_ATTRS = []
 
+    catch_funcs: ClassVar[Tuple[FunctionType, ...]] = ()
+    """该分发器类的所有 catch_func（未绑定）"""
+    catch_func_map: ClassVar[Mapping[Union[str, Type], FunctionType]] = MappingProxyType({})
+    """catch 目标 -> 未绑定的 catch_func"""
+    dispatch_funcs: ClassVar[Tuple[FunctionType, ...]] = ()
+    """该分发器类的所有 dispatch_by_* 方法（未绑定）"""
+
+    _plans: ClassVar["WeakKeyDictionary[Callable, DispatchPlan]"] = WeakKeyDictionary()
+    """函数 -> 分发计划；绑定方法以其 __func__ 为键保存在 _method_plans 中，不会使插件实例无法被回收"""
+    _method_plans: ClassVar["WeakKeyDictionary[Callable, DispatchPlan]"] = WeakKeyDictionary()
+    _plan_supported: ClassVar[bool] = True
+
     _args: List[Any] = []
     _kwargs: Dict[Union[str, Type], Any] = {}
     _application: "Optional[Application]" = None
@@ -83,6 +275,36 @@ class AbstractDispatcher(ABC):
             raise RuntimeError(f"No application was set for this {self.__class__.__name__}.")
         return self._application
 
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._build_func_tables()
+        cls._plans = WeakKeyDictionary()
+        cls._method_plans = WeakKeyDictionary()
+
+    @classmethod
+    def _build_func_tables(cls) -> None:
+        """在类创建时收集 catch_func 与 dispatch_by_* 方法，避免每个实例都进行反射"""
+        catch_funcs = []
+        dispatch_funcs = []
+        for attr in dir(cls):
+            if attr.startswith("_") or not isinstance(func := inspect.getattr_static(cls, attr), FunctionType):
+                continue
+            if attr.startswith("dispatch_by_"):
+                dispatch_funcs.append((attr, func))
+            elif attr not in cls.IGNORED_ATTRS and hasattr(func, _CATCH_TARGET_ATTR):
+                catch_funcs.append(func)
+
+        catch_func_map = {}
+        for catch_func in catch_funcs:
+            for catch_target in getattr(catch_func, _CATCH_TARGET_ATTR):
+                catch_func_map[catch_target] = catch_func
+
+        cls.catch_funcs = tuple(catch_funcs)
+        cls.catch_func_map = MappingProxyType(catch_func_map)
+        cls.dispatch_funcs = tuple(func for _, func in dispatch_funcs)
+        # 若子类自定义了其它 dispatch_by_* 方法，则无法预编译，只能逐次分发
+        cls._plan_supported = all(attr in _PLANNED_DISPATCH_FUNCS for attr, _ in dispatch_funcs)
+
     def __init__(self, *args, **kwargs) -> None:
         self._args = list(args)
         self._kwargs = dict(kwargs)
@@ -97,38 +319,6 @@ class AbstractDispatcher(ABC):
             if type_arg != str:
                 self._kwargs[type_arg] = arg
 
-    @cached_property
-    def catch_funcs(self) -> List[MethodType]:
-        # noinspection PyTypeChecker
-        return list(
-            ArkoWrapper(dir(self))
-            .filter(lambda x: not x.startswith("_"))
-            .filter(
-                lambda x: x not in self.IGNORED_ATTRS + ["dispatch", "catch_funcs", "catch_func_map", "dispatch_funcs"]
-            )
-            .map(lambda x: getattr(self, x))
-            .filter(lambda x: isinstance(x, MethodType))
-            .filter(lambda x: hasattr(x, "_catch_targets"))
-        )
-
-    @cached_property
-    def catch_func_map(self) -> Dict[Union[str, Type[T]], Callable[..., T]]:
-        result = {}
-        for catch_func in self.catch_funcs:
-            catch_targets = getattr(catch_func, _CATCH_TARGET_ATTR)
-            for catch_target in catch_targets:
-                result[catch_target] = catch_func
-        return result
-
-    @cached_property
-    def dispatch_funcs(self) -> List[MethodType]:
-        return list(
-            ArkoWrapper(dir(self))
-            .filter(lambda x: x.startswith("dispatch_by_"))
-            .map(lambda x: getattr(self, x))
-            .filter(lambda x: isinstance(x, MethodType))
-        )
-
     @abstractmethod
     def dispatch_by_default(self, parameter: Parameter) -> Parameter:
         """默认的 dispatch 方法"""
@@ -137,25 +327,121 @@ class AbstractDispatcher(ABC):
     def dispatch_by_catch_funcs(self, parameter: Parameter) -> Parameter:
         """使用 catch_func 获取并分配参数"""
 
-    def dispatch(self, func: Callable[P, R]) -> Callable[..., R]:
-        """将参数分配给函数，从而合成一个无需参数即可执行的函数"""
-        params = {}
-        signature = get_signature(func)
-        parameters: Dict[str, Parameter] = dict(signature.parameters)
+    def resolve_default(self, annotation: Type[T]) -> Optional[T]:
+        """dispatch_by_default 所使用的，根据类型获取对应的值"""
+        return None
+
+    def catch_cache(self) -> Dict[Callable, Any]:
+        """catch_func 的结果缓存，默认每次分发使用一份新的缓存"""
+        return {}
 
+    def plan_by_default(self, parameter: Parameter) -> Optional[Type]:
+        """编译分发计划时调用，返回 dispatch_by_default 需要查找的类型"""
+        return None
+
+    def plan_by_catch_funcs(self, parameter: Parameter) -> Optional[Union[str, Type]]:
+        """编译分发计划时调用，返回该参数对应的 catch_func 的目标"""
+        annotation = parameter.annotation
+        if annotation != Any and isinstance(annotation, GenericAlias):
+            return None
+        if annotation in self.catch_func_map:
+            return annotation
+        if parameter.name in self.catch_func_map:
+            return parameter.name
+        return None
+
+    @staticmethod
+    def _dispatchable_parameters(func: Callable) -> Dict[str, Parameter]:
+        if isinstance(func, MethodType):
+            # 使用未绑定函数的签名并去掉第一个参数，避免签名缓存持有绑定方法及其实例
+            parameters: Dict[str, Parameter] = dict(list(get_signature(func.__func__).parameters.items())[1:])
+        else:
+            parameters = dict(get_signature(func).parameters)
         for name, parameter in list(parameters.items()):
-            parameter: Parameter
             if any(
                 [
-                    name == "self" and isinstance(func, (type, MethodType)),
+                    name == "self" and isinstance(func, type),
                     parameter.kind in [Parameter.VAR_KEYWORD, Parameter.VAR_POSITIONAL],
                 ]
             ):
                 del parameters[name]
-                continue
+        return parameters
+
+    def compile_plan(self, func: Callable) -> DispatchPlan:
+        """为 func 编译分发计划"""
+        items = []
+        for name, parameter in self._dispatchable_parameters(func).items():
+            catch_target = self.plan_by_catch_funcs(parameter)
+            items.append(
+                _PlanItem(
+                    name=name,
+                    default=None if parameter.default is Parameter.empty else parameter.default,
+                    catch_target=catch_target,
+                    default_type=self.plan_by_default(parameter),
+                    catch_async=(
+                        catch_target is not None and inspect.iscoroutinefunction(self.catch_func_map[catch_target])
+                    ),
+                )
+            )
+        return DispatchPlan(tuple(items))
+
+    def get_plan(self, func: Callable) -> Optional[DispatchPlan]:
+        """获取 func 的分发计划，若该分发器不支持预编译则返回 None"""
+        if not self._plan_supported:
+            return None
+        cls = type(self)
+        plans, key = (cls._method_plans, func.__func__) if isinstance(func, MethodType) else (cls._plans, func)
+        try:
+            if (plan := plans.get(key)) is None:
+                plan = plans[key] = self.compile_plan(func)
+        except TypeError:  # 无法弱引用的可调用对象，不缓存
+            plan = self.compile_plan(func)
+        return plan
+
+    def dispatch(self, func: Callable[P, R]) -> Callable[..., R]:
+        """将参数分配给函数，从而合成一个无需参数即可执行的函数"""
+        return self._dispatch(func, self)
+
+    async def adispatch(self, func: Callable[P, R]) -> Callable[..., R]:
+        """dispatch 的异步版本，支持异步的 catch_func"""
+        return await self._adispatch(func, self)
+
+    async def _adispatch(
+        self, func: Callable[P, R], target: "Union[AbstractDispatcher, DispatchContext]"
+    ) -> Callable[..., R]:
+        if (plan := self.get_plan(func)) is not None:
+            return partial(func, **await plan.aresolve(target))
+        params = self._dispatch_params(func, target, allow_async=True)
+        for name, value in params.items():
+            if isinstance(value, asyncio.Future):
+                params[name] = await asyncio.shield(value)
+        return partial(func, **params)
+
+    def _dispatch(self, func: Callable[P, R], target: "Union[AbstractDispatcher, DispatchContext]") -> Callable[..., R]:
+        """以 target 作为 catch_func 等方法的 self 进行分发"""
+        if (plan := self.get_plan(func)) is not None:
+            return partial(func, **plan.resolve(target))
+        return partial(func, **self._dispatch_params(func, target, allow_async=False))
+
+    def _requires_async(self, parameter: Parameter) -> bool:
+        """该参数是否需要由异步的 catch_func 提供"""
+        catch_target = self.plan_by_catch_funcs(parameter)
+        return catch_target is not None and inspect.iscoroutinefunction(self.catch_func_map[catch_target])
+
+    def _dispatch_params(
+        self, func: Callable, target: "Union[AbstractDispatcher, DispatchContext]", allow_async: bool
+    ) -> Dict[str, Any]:
+        """不使用分发计划，逐个参数调用 dispatch_by_* 方法；异步 catch_func 的结果为 Future"""
+        params = {}
+        parameters = self._dispatchable_parameters(func)
+        if not allow_async and any(self._requires_async(parameter) for parameter in parameters.values()):
+            raise TypeError("This function requires async catch funcs, use `adispatch` instead.")
 
+        for name, parameter in list(parameters.items()):
+            parameter = parameter.replace()
             for dispatch_func in self.dispatch_funcs:
-                parameters[name] = dispatch_func(parameter)
+                parameter = dispatch_func(target, parameter)
+            parameters[name] = parameter
 
         for name, parameter in parameters.items():
             if parameter.default != Parameter.empty:
@@ -163,7 +449,7 @@ class AbstractDispatcher(ABC):
             else:
                 params[name] = None
 
-        return partial(func, **params)
+        return params
 
     @catch(Application)
     def catch_application(self) -> Application:
@@ -175,46 +461,44 @@ class BaseDispatcher(AbstractDispatcher):
 
     _instances: Sequence[Any]
 
-    def _get_kwargs(self) -> Dict[Type[T], T]:
-        result = self._get_default_kwargs()
-        result[AbstractDispatcher] = self
-        result.update(self._kwargs)
-        return result
-
-    def _get_default_kwargs(self) -> Dict[Type[T], T]:
+    _application_getters: ClassVar[Dict[Type, Callable[["Application"], Any]]] = {
+        FastAPI: attrgetter("web_app"),
+        Server: attrgetter("web_server"),
+        TelegramApplication: attrgetter("telegram"),
+        TelegramBot: attrgetter("telegram.bot"),
+    }
+
+    def resolve_default(self, annotation: Type[T]) -> Optional[T]:
+        """依次从传入的参数、application 自身以及 managers 的类型注册表中查找"""
+        if (value := self._kwargs.get(annotation)) is not None:
+            return value
+        if annotation is AbstractDispatcher:
+            return self
         application = self.application
-        _default_kwargs = {
-            FastAPI: application.web_app,
-            Server: application.web_server,
-            TelegramApplication: application.telegram,
-            TelegramBot: application.telegram.bot,
-        }
+        if (getter := self._application_getters.get(annotation)) is not None:
+            return getter(application)
         if not application.running:
-            for obj in chain(
-                application.managers.dependency,
-                application.managers.components,
-                application.managers.services,
-                application.managers.plugins,
-            ):
-                _default_kwargs[type(obj)] = obj
-        return {k: v for k, v in _default_kwargs.items() if v is not None}
+            return application.managers.registry.get(annotation)
+        return None
 
-    def dispatch_by_default(self, parameter: Parameter) -> Parameter:
+    def plan_by_default(self, parameter: Parameter) -> Optional[Type]:
         annotation = parameter.annotation
+        return annotation if isinstance(annotation, type) else None
+
+    def dispatch_by_default(self, parameter: Parameter) -> Parameter:
         # noinspection PyTypeChecker
-        if isinstance(annotation, type) and (value := self._get_kwargs().get(annotation, None)) is not None:
+        if (annotation := self.plan_by_default(parameter)) is not None and (
+            value := self.resolve_default(annotation)
+        ) is not None:
             parameter._default = value  # pylint: disable=W0212
         return parameter
 
     def dispatch_by_catch_funcs(self, parameter: Parameter) -> Parameter:
-        annotation = parameter.annotation
-        if annotation != Any and isinstance(annotation, GenericAlias):
-            return parameter
-
-        catch_func = self.catch_func_map.get(annotation) or self.catch_func_map.get(parameter.name)
-        if catch_func is not None:
+        if (catch_target := self.plan_by_catch_funcs(parameter)) is not None:
             # noinspection PyUnresolvedReferences,PyProtectedMember
-            parameter._default = catch_func()  # pylint: disable=W0212
+            parameter._default = _provide(  # pylint: disable=W0212
+                self.catch_func_map[catch_target], self, self.catch_cache()
+            )
         return parameter
 
     @catch(AbstractEventLoop)
@@ -230,20 +514,42 @@ class HandlerDispatcher(BaseDispatcher):
         self._update = update
         self._context = context
 
+    def _acquire_context(
+        self, update: Optional[Update] = None, context: Optional[CallbackContext] = None
+    ) -> DispatchContext:
+        update = update or self._update
+        context = context or self._context
+        if update is None:
+            from meido.builtins.contexts import UpdateCV
+
+            update = UpdateCV.get()
+        if context is None:
+            from meido.builtins.contexts import CallbackContextCV
+
+            context = CallbackContextCV.get()
+        return DispatchContext.acquire(self, update, context)
+
     def dispatch(
         self, func: Callable[P, R], *, update: Optional[Update] = None, context: Optional[CallbackContext] = None
     ) -> Callable[..., R]:
-        self._update = update or self._update
-        self._context = context or self._context
-        if self._update is None:
-            from meido.builtins.contexts import UpdateCV
+        dispatch_context = self._acquire_context(update, context)
+        try:
+            return self._dispatch(func, dispatch_context)
+        finally:
+            dispatch_context.release()
 
-            self._update = UpdateCV.get()
-        if self._context is None:
-            from meido.builtins.contexts import CallbackContextCV
+    async def adispatch(
+        self, func: Callable[P, R], *, update: Optional[Update] = None, context: Optional[CallbackContext] = None
+    ) -> Callable[..., R]:
+        dispatch_context = self._acquire_context(update, context)
+        try:
+            return await self._adispatch(func, dispatch_context)
+        finally:
+            dispatch_context.release()
 
-            self._context = CallbackContextCV.get()
-        return super().dispatch(func)
+    def plan_by_default(self, parameter: Parameter) -> Optional[Type]:
+        """HandlerDispatcher 默认不使用 dispatch_by_default"""
+        return None
 
     def dispatch_by_default(self, parameter: Parameter) -> Parameter:
         """HandlerDispatcher 默认不使用 dispatch_by_default"""
@@ -277,13 +583,27 @@ class JobDispatcher(BaseDispatcher):
         super().__init__(context=context, **kwargs)
         self._context = context
 
-    def dispatch(self, func: Callable[P, R], *, context: Optional[CallbackContext] = None) -> Callable[..., R]:
-        self._context = context or self._context
-        if self._context is None:
+    def _acquire_context(self, context: Optional[CallbackContext] = None) -> DispatchContext:
+        context = context or self._context
+        if context is None:
             from meido.builtins.contexts import CallbackContextCV
 
-            self._context = CallbackContextCV.get()
-        return super().dispatch(func)
+            context = CallbackContextCV.get()
+        return DispatchContext.acquire(self, context=context)
+
+    def dispatch(self, func: Callable[P, R], *, context: Optional[CallbackContext] = None) -> Callable[..., R]:
+        dispatch_context = self._acquire_context(context)
+        try:
+            return self._dispatch(func, dispatch_context)
+        finally:
+            dispatch_context.release()
+
+    async def adispatch(self, func: Callable[P, R], *, context: Optional[CallbackContext] = None) -> Callable[..., R]:
+        dispatch_context = self._acquire_context(context)
+        try:
+            return await self._adispatch(func, dispatch_context)
+        finally:
+            dispatch_context.release()
 
     @catch("data")
     def catch_data(self) -> Any:
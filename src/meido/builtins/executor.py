@@ -9,6 +9,7 @@ from telegram.ext import CallbackContext
 from typing_extensions import ParamSpec, Self
 
 from meido.builtins.contexts import handler_contexts, job_contexts
+from meido.utils.workers import Offload, OffloadType, get_callback_offload, get_offload
 
 if TYPE_CHECKING:
     from meido.application import Application
@@ -28,11 +29,14 @@ class BaseExecutor:
         name(str): 该执行器的名称。执行器的名称是唯一的。
 
     只支持执行只拥有 POSITIONAL_OR_KEYWORD 和 KEYWORD_ONLY 两种参数类型的函数
+    同步函数默认直接在事件循环中执行，指定 offload 后会交由 Application 的工作池执行
     """
 
     _lock: ClassVar["LockType"] = Lock()
     _instances: ClassVar[Dict[str, Self]] = {}
     _application: "Optional[Application]" = None
+    _process_supported: ClassVar[bool] = True
+    """被执行的函数能否交由进程池执行"""
 
     def set_application(self, application: "Application") -> None:
         self._application = application
@@ -56,9 +60,19 @@ class BaseExecutor:
         """当前执行器的名称"""
         return self._name
 
-    def __init__(self, name: str, dispatcher: Optional[Type["AbstractDispatcher"]] = None) -> None:
+    def __init__(
+        self, name: str, dispatcher: Optional[Type["AbstractDispatcher"]] = None, offload: OffloadType = None
+    ) -> None:
         self._name = name
         self._dispatcher = dispatcher
+        self._offload = get_offload(offload) if self._process_supported else get_callback_offload(offload)
+
+    async def _run(self, target: Callable, dispatched_func: Callable[[], R], offload: Optional[Offload]) -> R:
+        if inspect.iscoroutinefunction(target):
+            return await dispatched_func()
+        if offload is not None:
+            return await self.application.workers.run(offload, dispatched_func)
+        return dispatched_func()
 
 
 class Executor(BaseExecutor, Generic[P, R]):
@@ -66,34 +80,38 @@ class Executor(BaseExecutor, Generic[P, R]):
         self,
         target: Callable[P, R],
         dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
         **kwargs,
     ) -> R:
         dispatcher = self._dispatcher or dispatcher
         dispatcher_instance = dispatcher(**kwargs)
         dispatcher_instance.set_application(application=self.application)
-        dispatched_func = dispatcher_instance.dispatch(target)  # 分发参数，组成新函数
+        dispatched_func = await dispatcher_instance.adispatch(target)  # 分发参数，组成新函数
 
         # 执行
-        if inspect.iscoroutinefunction(target):
-            result = await dispatched_func()
-        else:
-            result = dispatched_func()
-
-        return result
+        return await self._run(target, dispatched_func, get_offload(offload) or self._offload)
 
 
 class HandlerExecutor(BaseExecutor, Generic[P, R]):
     """Handler专用执行器"""
 
+    def __new__(cls, *args, **kwargs) -> Self:
+        # 每个 callback 各自使用一个执行器，不缓存于以名称为键的 _instances 中，以免持有插件实例
+        return object.__new__(cls)
+
+    _process_supported = False
+
     _callback: Callable[P, R]
     _dispatcher: "HandlerDispatcher"
 
-    def __init__(self, func: Callable[P, R], dispatcher: Optional[Type["HandlerDispatcher"]] = None) -> None:
+    def __init__(
+        self, func: Callable[P, R], dispatcher: Optional[Type["HandlerDispatcher"]] = None, offload: OffloadType = None
+    ) -> None:
         if dispatcher is None:
             from meido.builtins.dispatcher import HandlerDispatcher
 
             dispatcher = HandlerDispatcher
-        super().__init__("handler", dispatcher)
+        super().__init__("handler", dispatcher, offload)
         self._callback = func
         self._dispatcher = dispatcher()
 
@@ -104,19 +122,27 @@ class HandlerExecutor(BaseExecutor, Generic[P, R]):
 
     async def __call__(self, update: Update, context: CallbackContext) -> R:
         with handler_contexts(update, context):
-            dispatched_func = self._dispatcher.dispatch(self._callback, update=update, context=context)
-            return await dispatched_func()
+            dispatched_func = await self._dispatcher.adispatch(self._callback, update=update, context=context)
+            return await self._run(self._callback, dispatched_func, self._offload)
 
 
 class JobExecutor(BaseExecutor):
     """Job 专用执行器"""
 
-    def __init__(self, func: Callable[P, R], dispatcher: Optional[Type["AbstractDispatcher"]] = None) -> None:
+    def __new__(cls, *args, **kwargs) -> Self:
+        # 每个 callback 各自使用一个执行器，不缓存于以名称为键的 _instances 中，以免持有插件实例
+        return object.__new__(cls)
+
+    _process_supported = False
+
+    def __init__(
+        self, func: Callable[P, R], dispatcher: Optional[Type["AbstractDispatcher"]] = None, offload: OffloadType = None
+    ) -> None:
         if dispatcher is None:
             from meido.builtins.dispatcher import JobDispatcher
 
             dispatcher = JobDispatcher
-        super().__init__("job", dispatcher)
+        super().__init__("job", dispatcher, offload)
         self._callback = func
         self._dispatcher = dispatcher()
 
@@ -127,5 +153,5 @@ class JobExecutor(BaseExecutor):
 
     async def __call__(self, context: CallbackContext) -> R:
         with job_contexts(context):
-            dispatched_func = self._dispatcher.dispatch(self._callback, context=context)
-            return await dispatched_func()
+            dispatched_func = await self._dispatcher.adispatch(self._callback, context=context)
+            return await self._run(self._callback, dispatched_func, self._offload)
@@ -5,13 +5,9 @@ from typing import List, Optional, Set
 import dotenv
 from pydantic import AnyUrl, Field, BaseSettings
 
+from meido.utils import jsonlib
 from meido.utils.const import PROJECT_ROOT
 
-try:
-    import ujson as jsonlib
-except ImportError:
-    import json as jsonlib
-
 __all__ = ("ApplicationConfig", "config", "JoinGroups", "LogTracebackConfig")
 
 dotenv.load_dotenv(dotenv_path=dotenv.find_dotenv(usecwd=True))
@@ -103,6 +99,10 @@ class WebServerConfig(Settings):
     host: str = "localhost"
     port: int = 8080
 
+    metrics_path: Optional[str] = None
+    """Prometheus 指标的路由，默认不导出。设置环境变量 ``WEB_METRICS_PATH=/metrics`` 即可启用，
+    该路由没有鉴权，启用时应通过反向代理或防火墙限制只有 Prometheus 能够访问"""
+
     class Config(Settings.Config):
         env_prefix = "web_"
 
@@ -150,6 +150,30 @@ class ApplicationConfig(Settings):
 
     timeout: int = 10
     connection_pool_size: int = 256
+    connection_pool_min_size: Optional[int] = None
+    """连接池的最小容量，指定后同时进行的请求数在该值与 connection_pool_size 之间根据排队情况动态调整，默认固定为 connection_pool_size"""
+    http_version: str = "1.1"
+    """请求 Bot API 时使用的 HTTP 版本，可选 1.1 或 2，使用 2 时需要安装 httpx[http2]"""
+    thread_pool_size: Optional[int] = None
+    """用于执行同步 callback 的线程池大小，默认为 min(32, CPU 数 + 4)"""
+    process_pool_size: Optional[int] = None
+    """用于执行同步 callback 的进程池大小，默认为 CPU 数"""
+    distributed_limiter: bool = False
+    """是否通过 Redis 在多个 BOT 进程之间共享 LimiterHandler 的限流状态"""
+    plugin_router: bool = True
+    """是否使用 PluginRouter 在同一个 group 中按命令索引路由所有插件的 handler"""
+    startup_concurrency: Optional[int] = 16
+    """启动时同时初始化的服务、插件的最大数量，为空则不限制"""
+    startup_manifest: bool = False
+    """是否使用启动清单缓存模块导入与插件反射的结果"""
+    lazy_plugins: bool = False
+    """是否延迟加载插件，即收到匹配的命令或 callback query 时才导入并安装插件。需要启用 startup_manifest"""
+    plugin_idle_timeout: Optional[float] = None
+    """延迟加载的插件闲置多少秒后卸载，为空则不卸载"""
+    profile_startup: bool = False
+    """是否分析启动过程：记录每个模块的导入耗时、每个服务与插件的实例化与初始化耗时及 RSS 变化"""
+    profile_startup_output: Path = PROJECT_ROOT / "cache" / "startup_profile.json"
+    """启动分析结果的 JSON 文件路径"""
     read_timeout: Optional[float] = None
     write_timeout: Optional[float] = None
     connect_timeout: Optional[float] = None
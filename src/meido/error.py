@@ -1,7 +1,19 @@
 """此模块包含核心模块的错误的基类"""
-from typing import Union
+from typing import Sequence, Union
 
 
 class ServiceNotFoundError(Exception):
     def __init__(self, name: Union[str, type]):
         super().__init__(f"No service named '{name if isinstance(name, str) else name.__name__}'")
+
+
+class DependencyCycleError(Exception):
+    def __init__(self, cycle: Sequence[type]):
+        self.cycle = list(cycle)
+        super().__init__(f"Dependency cycle detected: {' -> '.join(i.__name__ for i in self.cycle)}")
+
+
+class UrlResourcesNotFoundError(Exception):
+    def __init__(self, url: str):
+        self.url = url
+        super().__init__(f"Resources not found: {url}")
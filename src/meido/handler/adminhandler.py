@@ -1,4 +1,3 @@
-import asyncio
 from typing import TypeVar, TYPE_CHECKING, Any, Optional
 
 from telegram import Update
@@ -19,8 +18,6 @@ CCT = TypeVar("CCT", bound="CallbackContext[Any, Any, Any, Any]")
 
 
 class AdminHandler(BaseHandler[Update, CCT]):
-    _lock = asyncio.Lock()
-
     def __init__(self, handler: BaseHandler[Update, CCT], application: "Application") -> None:
         self.handler = handler
         self.application = application
@@ -32,15 +29,13 @@ class AdminHandler(BaseHandler[Update, CCT]):
             return False
         return self.handler.check_update(update)
 
-    async def _user_service(self) -> "UserAdminService":
-        async with self._lock:
-            if self.user_service is not None:
-                return self.user_service
+    def _user_service(self) -> "UserAdminService":
+        if self.user_service is None:
             user_service: UserAdminService = self.application.managers.services_map.get(UserAdminService, None)
             if user_service is None:
                 raise ServiceNotFoundError("UserAdminService")
             self.user_service = user_service
-            return self.user_service
+        return self.user_service
 
     async def handle_update(
         self,
@@ -49,7 +44,7 @@ class AdminHandler(BaseHandler[Update, CCT]):
         check_result: Any,
         context: "CCT",
     ) -> RT:
-        user_service = await self._user_service()
+        user_service = self._user_service()
         user = update.effective_user
         if await user_service.is_admin(user.id):
             return await self.handler.handle_update(update, application, check_result, context)
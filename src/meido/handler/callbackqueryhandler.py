@@ -1,8 +1,12 @@
 import asyncio
+import contextlib
+import re
 from contextlib import AbstractAsyncContextManager
 from types import TracebackType
-from typing import TypeVar, TYPE_CHECKING, Any, Optional, Type
+from typing import Dict, Generic, Pattern, Set, Tuple, TypeVar, TYPE_CHECKING, Any, Optional, Type, Union
 
+from telegram import Update
+from telegram.error import TelegramError
 from telegram.ext import CallbackQueryHandler as BaseCallbackQueryHandler, ApplicationHandlerStop
 
 from meido.utils.log import logger
@@ -13,25 +17,158 @@ if TYPE_CHECKING:
 RT = TypeVar("RT")
 UT = TypeVar("UT")
 CCT = TypeVar("CCT", bound="CallbackContext[Any, Any, Any, Any]")
+T = TypeVar("T")
+
+_SPECIAL_CHARS = frozenset(".^$*+?{}[]\\|()")
+_OPTIONAL_QUANTIFIERS = frozenset("*?{")
+
+
+def _has_top_level_alternation(pattern: str) -> bool:
+    depth = 0
+    in_class = False
+    chars = iter(pattern)
+    for char in chars:
+        if char == "\\":
+            next(chars, None)
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+    return False
+
+
+def literal_prefix(pattern: Union[str, Pattern, Any]) -> str:
+    """以 re.match 匹配时，能被 pattern 匹配的字符串必定以之开头的字面前缀；无法确定时返回空字符串"""
+    if isinstance(pattern, Pattern):
+        if pattern.flags & (re.IGNORECASE | re.VERBOSE):
+            return ""
+        pattern = pattern.pattern
+    if not isinstance(pattern, str) or _has_top_level_alternation(pattern):
+        return ""
+    index = 1 if pattern.startswith("^") else 0
+    prefix = []
+    while index < len(pattern):
+        char = pattern[index]
+        if char == "\\":
+            if index + 1 >= len(pattern) or pattern[index + 1].isalnum() or pattern[index + 1] == "_":
+                break  # \d、\w 等字符类以及反向引用
+            char, step = pattern[index + 1], 2
+        elif char in _SPECIAL_CHARS:
+            break
+        else:
+            step = 1
+        if pattern[index + step : index + step + 1] in _OPTIONAL_QUANTIFIERS:
+            break  # 该字符可能不出现
+        prefix.append(char)
+        index += step
+    return "".join(prefix)
+
+
+class _TrieNode(Generic[T]):
+    __slots__ = ("children", "values")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_TrieNode[T]"] = {}
+        self.values: Set[T] = set()
+
+
+class PrefixTrie(Generic[T]):
+    """前缀树：查找所有前缀为给定字符串前缀的值"""
+
+    __slots__ = ("_root",)
+
+    def __init__(self) -> None:
+        self._root: _TrieNode[T] = _TrieNode()
+
+    def add(self, prefix: str, value: T) -> None:
+        node = self._root
+        for char in prefix:
+            node = node.children.setdefault(char, _TrieNode())
+        node.values.add(value)
+
+    def discard(self, prefix: str, value: T) -> None:
+        path = [self._root]
+        for char in prefix:
+            if (node := path[-1].children.get(char)) is None:
+                return
+            path.append(node)
+        path[-1].values.discard(value)
+        for depth in range(len(prefix), 0, -1):  # 移除空的节点
+            if path[depth].values or path[depth].children:
+                break
+            del path[depth - 1].children[prefix[depth - 1]]
+
+    def find(self, text: str) -> Set[T]:
+        """所有前缀为 text 前缀的值"""
+        node = self._root
+        result = set(node.values)
+        for char in text:
+            if (node := node.children.get(char)) is None:
+                break
+            result.update(node.values)
+        return result
 
 
 class OverlappingException(Exception):
     pass
 
 
+class InFlightRegistry:
+    """记录每个用户正在处理中的 callback query
+
+    所有操作都在事件循环中同步完成，无需加锁；每个用户只保存一个 future 与对应的 callback data。
+    """
+
+    __slots__ = ("_flights",)
+
+    def __init__(self) -> None:
+        self._flights: Dict[int, Tuple[Any, asyncio.Future]] = {}
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._flights
+
+    def get(self, user_id: int, data: Any) -> Optional[asyncio.Future]:
+        """用户正在处理的 callback data 与 data 相同时，返回其结果的 future"""
+        if (flight := self._flights.get(user_id)) is not None and flight[0] == data:
+            return flight[1]
+        return None
+
+    def enter(self, user_id: int, data: Any) -> asyncio.Future:
+        if user_id in self._flights:
+            raise OverlappingException
+        future = asyncio.get_running_loop().create_future()
+        self._flights[user_id] = (data, future)
+        return future
+
+    def exit(self, user_id: int) -> None:
+        del self._flights[user_id]
+
+
 class OverlappingContext(AbstractAsyncContextManager):
-    _lock = asyncio.Lock()
+    """同一用户同一时间只能处理一个 callback query，否则抛出 OverlappingException
 
-    def __init__(self, context: "CCT"):
-        self.context = context
+    处理结果会写入 future，供合并的重复点击使用
+    """
 
-    async def __aenter__(self) -> None:
-        async with self._lock:
-            flag = self.context.user_data.get("overlapping", False)
-            if flag:
-                raise OverlappingException
-            self.context.user_data["overlapping"] = True
-            return None
+    registry = InFlightRegistry()
+
+    def __init__(self, user_id: int, data: Any = None):
+        self.user_id = user_id
+        self.data = data
+        self.future: Optional[asyncio.Future] = None
+
+    async def __aenter__(self) -> "OverlappingContext":
+        self.future = self.registry.enter(self.user_id, self.data)
+        return self
+
+    def set_result(self, result: Any) -> None:
+        self.future.set_result(result)
 
     async def __aexit__(
         self,
@@ -39,12 +176,38 @@ class OverlappingContext(AbstractAsyncContextManager):
         exc: Optional[BaseException],
         tb: Optional[TracebackType],
     ) -> None:
-        async with self._lock:
-            del self.context.user_data["overlapping"]
+        self.registry.exit(self.user_id)
+        if self.future.done():
             return None
+        if isinstance(exc, Exception):
+            self.future.set_exception(exc)
+            self.future.exception()  # 没有重复点击等待结果时避免 "exception was never retrieved"
+        else:
+            self.future.cancel()
+        return None
 
 
 class CallbackQueryHandler(BaseCallbackQueryHandler):
+    """同一用户的 callback query 在处理完成前不会重复处理
+
+    :param coalesce: 为 True 时，处理期间对同一按钮的重复点击将直接得到第一次点击的结果，而不是被忽略
+    """
+
+    def __init__(self, *args, coalesce: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.coalesce = coalesce
+
+    async def _coalesce(self, update: Update, future: asyncio.Future) -> RT:
+        user = update.effective_user
+        logger.debug("用户 %s[%s] 重复点击 等待第一次点击的结果", user.full_name, user.id)
+        await asyncio.wait((future,))
+        # 无论第一次点击的结果如何都需要应答，否则客户端的按钮会一直处于加载状态
+        with contextlib.suppress(TelegramError):
+            await update.callback_query.answer()
+        if future.cancelled() or future.exception() is not None:
+            raise ApplicationHandlerStop
+        return future.result()
+
     async def handle_update(
         self,
         update: "UT",
@@ -53,10 +216,15 @@ class CallbackQueryHandler(BaseCallbackQueryHandler):
         context: "CCT",
     ) -> RT:
         self.collect_additional_context(context, update, application, check_result)
+        user = update.effective_user
+        data = update.callback_query.data
+        if self.coalesce and (future := OverlappingContext.registry.get(user.id, data)) is not None:
+            return await self._coalesce(update, future)
         try:
-            async with OverlappingContext(context):
-                return await self.callback(update, context)
+            async with OverlappingContext(user.id, data) as overlapping:
+                result = await self.callback(update, context)
+                overlapping.set_result(result)
+                return result
         except OverlappingException as exc:
-            user = update.effective_user
             logger.warning("用户 %s[%s] 触发 overlapping 该次命令已忽略", user.full_name, user.id)
             raise ApplicationHandlerStop from exc
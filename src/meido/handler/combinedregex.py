@@ -0,0 +1,133 @@
+"""以一次查找匹配多个正则表达式"""
+import re
+from itertools import chain
+from typing import Dict, Generic, List, Optional, Pattern, Set, TypeVar, Union
+
+from meido.handler.callbackqueryhandler import PrefixTrie, literal_prefix
+
+__all__ = ("CombinedRegex", "mergeable_pattern")
+
+T = TypeVar("T")
+
+_SCOPED_FLAGS = {re.IGNORECASE: "i", re.MULTILINE: "m", re.DOTALL: "s", re.VERBOSE: "x"}
+_UNMERGEABLE = re.compile(r"\\[1-9]|\(\?P=|\(\?\(|\(\?[aiLmsux-]+\)")
+"""反向引用、条件匹配以及全局的内联 flag 在合并后会失效"""
+_GROUPS = re.compile(r"\\.|\[\^?\]?(?:\\.|[^\]\\])*\]|\((?:\?P<\w+>)?(?!\?)")
+"""转义字符、字符集以及捕获组（包括命名组）"""
+_FLAGS = {value: key for key, value in _SCOPED_FLAGS.items()}
+_WRAPPED = re.compile(r"\(\?([imsx]*):(.*)\)", re.DOTALL)
+"""mergeable_pattern 所添加的、带有局部 flag 的非捕获组"""
+
+
+def _uncapture(match: "re.Match[str]") -> str:
+    token = match.group()
+    return "(?:" if token[0] == "(" else token
+
+
+def mergeable_pattern(pattern: Union[str, Pattern]) -> Optional[str]:
+    """将 pattern 转换为可以合并的形式；无法合并时返回 None
+
+    flag 会被转换为局部的内联 flag，捕获组会被转换为非捕获组，从而与其他 pattern 的组名或组号互不影响。
+    pattern 无法被 ``re`` 编译时同样无法合并，以保证与 python-telegram-bot 使用 ``re`` 进行的匹配一致。
+    """
+    flags = 0
+    if isinstance(pattern, Pattern):
+        flags = pattern.flags & ~re.UNICODE
+        pattern = pattern.pattern
+    if not isinstance(pattern, str) or _UNMERGEABLE.search(pattern):
+        return None
+    try:
+        re.compile(pattern, flags)
+    except re.error:
+        return None
+    scoped = ""
+    for flag, char in _SCOPED_FLAGS.items():
+        if flags & flag:
+            scoped += char
+            flags &= ~flag
+    if flags:  # 例如 re.ASCII、re.LOCALE
+        return None
+    pattern = _GROUPS.sub(_uncapture, pattern)
+    result = f"(?{scoped}:{pattern})" if scoped else f"(?:{pattern})"
+    try:
+        if re.compile(result).groups:  # 例如 VERBOSE 模式的注释中含有括号，无法确定所有的捕获组均已被转换
+            return None
+    except re.error:
+        return None
+    return result
+
+
+class CombinedRegex(Generic[T]):
+    """多个正则表达式的索引：一次查找即可得到所有与文本匹配的正则表达式所对应的值
+
+    ``re`` 不会为分支建立前缀树，将所有正则表达式合并为一个分支后，每个位置都要依次尝试所有分支，
+    反而比逐个匹配更慢。因此按正则表达式的字面前缀（见 :func:`literal_prefix`）建立前缀树，
+    只有字面前缀与文本开头一致的正则表达式才会被匹配；
+    ``re.search`` 时只有以 ``^`` 开头（且不含 MULTILINE）的正则表达式能够如此索引，
+    其余无法确定字面前缀的正则表达式仍逐个匹配。
+
+    Args:
+        search (bool): 为 True 时与 ``re.search`` 一致，否则与 ``re.match`` 一致
+    """
+
+    def __init__(self, search: bool = False):
+        self._search = search
+        self._values: Dict[str, Set[T]] = {}
+        self._compiled: Dict[str, Pattern] = {}
+        self._prefixes: Dict[str, str] = {}
+        self._trie: PrefixTrie[str] = PrefixTrie()
+        self._unindexed: List[str] = []
+
+    def __bool__(self) -> bool:
+        return bool(self._values)
+
+    def _prefix(self, pattern: str) -> str:
+        """mergeable_pattern 转换后的 pattern 能够匹配的文本必定以之开头的字面前缀"""
+        if (wrapped := _WRAPPED.fullmatch(pattern)) is None:
+            return ""
+        flags, pattern = wrapped.groups()
+        if "i" in flags or "x" in flags:
+            return ""
+        if self._search and ("m" in flags or not pattern.startswith("^")):
+            return ""
+        return literal_prefix(pattern)
+
+    @staticmethod
+    def _compile(pattern: str) -> Pattern:
+        """去掉 mergeable_pattern 添加的外层分组后编译，以保留 ``re`` 对字面前缀的优化"""
+        if (wrapped := _WRAPPED.fullmatch(pattern)) is None:
+            return re.compile(pattern)
+        flags, inner = wrapped.groups()
+        return re.compile(inner, sum((_FLAGS[i] for i in flags), 0))
+
+    def add(self, pattern: str, value: T) -> None:
+        """添加由 mergeable_pattern 转换后的 pattern"""
+        if (values := self._values.get(pattern)) is None:
+            values = self._values[pattern] = set()
+            self._compiled[pattern] = self._compile(pattern)
+            if prefix := self._prefixes.setdefault(pattern, self._prefix(pattern)):
+                self._trie.add(prefix, pattern)
+            else:
+                self._unindexed.append(pattern)
+        values.add(value)
+
+    def discard(self, pattern: str, value: T) -> None:
+        if (values := self._values.get(pattern)) is not None:
+            values.discard(value)
+            if not values:
+                del self._values[pattern], self._compiled[pattern]
+                if prefix := self._prefixes.pop(pattern):
+                    self._trie.discard(prefix, pattern)
+                else:
+                    self._unindexed.remove(pattern)
+
+    def find(self, text: str) -> Set[T]:
+        """所有与 text 匹配的正则表达式所对应的值"""
+        result: Set[T] = set()
+        if not self._values:
+            return result
+        for pattern in chain(self._trie.find(text), self._unindexed):
+            compiled = self._compiled[pattern]
+            if compiled.search(text) if self._search else compiled.match(text):
+                result.update(self._values[pattern])
+        return result
@@ -0,0 +1,92 @@
+import asyncio
+import re
+from time import monotonic
+from typing import Any, Awaitable, Callable, Iterable, Optional, Sequence, TYPE_CHECKING, TypeVar, Union
+
+from telegram import MessageEntity, Update
+from telegram.ext import BaseHandler
+
+if TYPE_CHECKING:
+    from meido.plugin import PluginType
+    from telegram.ext import Application as TelegramApplication
+
+RT = TypeVar("RT")
+UT = TypeVar("UT")
+CCT = TypeVar("CCT", bound="CallbackContext[Any, Any, Any, Any]")
+
+
+class LazyPluginHandler(BaseHandler[Update, CCT]):
+    """延迟加载插件的占位 handler
+
+    收到匹配的命令或 callback query 时才导入并安装插件，并将该 update 交给插件的 handler 处理。
+    插件加载后，此 handler 只记录插件最后一次被使用的时间，由插件自身的 handler 处理 update。
+    启用 :class:`~meido.handler.router.PluginRouter` 时需将此 handler 添加至 router 中，
+    否则插件加载时新添加的 group 若排在其后，router 会再次处理同一个 update。
+
+    :param name: 插件名称
+    :param commands: 插件所响应的命令
+    :param patterns: 插件所响应的 callback query 的正则表达式及其 flags
+    :param loader: 导入并安装插件的函数
+    """
+
+    def __init__(
+        self,
+        name: str,
+        commands: Iterable[str],
+        patterns: Iterable[Sequence[Union[str, int]]],
+        loader: Callable[[], Awaitable[Optional["PluginType"]]],
+    ):
+        self.name = name
+        self.commands = frozenset(i.lower() for i in commands)
+        self.patterns = [re.compile(pattern, flags) for pattern, flags in patterns]
+        self.loader = loader
+        self.plugin: Optional["PluginType"] = None
+        self.last_used = monotonic()
+        self.lock = asyncio.Lock()
+        super().__init__(self.load)
+
+    def _match(self, update: Update) -> bool:
+        # 与 CommandHandler 相同：只匹配消息开头的命令，并且 @ 后的用户名必须是本 BOT
+        if self.commands and (message := update.message or update.edited_message) is not None:
+            if (entities := message.entities) and entities[0].type == MessageEntity.BOT_COMMAND and message.text:
+                if entities[0].offset != 0:
+                    return False
+                command, _, username = message.text[1 : entities[0].length].partition("@")
+                if command.lower() not in self.commands:
+                    return False
+                return not username or username.lower() == message.get_bot().username.lower()
+        if self.patterns and (callback_query := update.callback_query) is not None:
+            if isinstance(data := callback_query.data, str):
+                return any(pattern.match(data) for pattern in self.patterns)
+        return False
+
+    def check_update(self, update: object) -> Optional[bool]:
+        if not isinstance(update, Update) or not self._match(update):
+            return None
+        self.last_used = monotonic()
+        return None if self.plugin is not None else True
+
+    async def load(self) -> Optional["PluginType"]:
+        """导入并安装插件"""
+        async with self.lock:
+            if self.plugin is None:
+                self.plugin = await self.loader()
+            return self.plugin
+
+    async def handle_update(
+        self,
+        update: "UT",
+        application: "TelegramApplication[Any, CCT, Any, Any, Any, Any]",
+        check_result: Any,
+        context: "CCT",
+    ) -> RT:
+        # 安装插件时会添加新的 group，而 Application.process_update 正在遍历 application.handlers，
+        # 替换为副本使遍历不受影响，新添加的 group 从下一个 update 开始处理
+        application.handlers = dict(application.handlers)
+        if (plugin := await self.load()) is None:
+            return None
+        for handler in plugin.handlers:
+            check = handler.check_update(update)
+            if check is not None and check is not False:
+                return await handler.handle_update(update, application, check, context)
+        return None
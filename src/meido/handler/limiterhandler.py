@@ -1,18 +1,148 @@
-import asyncio
-from typing import TypeVar, Optional
+from time import monotonic
+from typing import Dict, List, Optional, TYPE_CHECKING, TypeVar
 
-from telegram import Update
+from redis.exceptions import RedisError
+from telegram import Update, User
 from telegram.ext import ContextTypes, ApplicationHandlerStop, TypeHandler
 
 from meido.utils.log import logger
 
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
 UT = TypeVar("UT")
 CCT = TypeVar("CCT", bound="CallbackContext[Any, Any, Any, Any]")
 
 
-class LimiterHandler(TypeHandler[UT, CCT]):
-    _lock = asyncio.Lock()
+class _Bucket:
+    __slots__ = ("level", "last", "limit_until")
+
+    def __init__(self, level: float, last: float):
+        self.level = level
+        self.last = last
+        self.limit_until = 0.0
+
+
+class BucketTable:
+    """按用户 ID 分片存储的漏桶状态
+
+    所有操作都在事件循环中同步完成，期间不会让出控制权，因此无需加锁。
+    空闲的记录会被定期清理，每次只清理一个分片以避免长时间阻塞事件循环。
+
+    :param shards: 分片数量
+    :param sweep_interval: 清理一个分片的间隔（秒）
+    """
+
+    def __init__(self, shards: int = 64, sweep_interval: float = 1.0):
+        self._shards: List[Dict[int, _Bucket]] = [{} for _ in range(shards)]
+        self._sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self._sweep_shard = 0
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def get(self, user_id: int) -> Optional[_Bucket]:
+        return self._shards[user_id % len(self._shards)].get(user_id)
+
+    def put(self, user_id: int, level: float, time: float) -> None:
+        self._shards[user_id % len(self._shards)][user_id] = _Bucket(level, time)
+
+    def maybe_sweep(self, time: float, rate_per_sec: float) -> None:
+        """每隔 sweep_interval 清理一个分片中桶已漏空且未被限制的记录"""
+        if time < self._next_sweep:
+            return
+        self._next_sweep = time + self._sweep_interval
+        shard = self._shards[self._sweep_shard]
+        self._sweep_shard = (self._sweep_shard + 1) % len(self._shards)
+        idle = [
+            user_id
+            for user_id, bucket in shard.items()
+            if bucket.limit_until <= time and bucket.level <= (time - bucket.last) * rate_per_sec
+        ]
+        for user_id in idle:
+            del shard[user_id]
+
+
+_GCRA_SCRIPT = """
+local blocked = redis.call("PTTL", KEYS[2])
+if blocked > 0 then
+    return blocked
+end
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local tat = math.max(tonumber(redis.call("GET", KEYS[1]) or now), now)
+if tat - now > tonumber(ARGV[2]) then
+    redis.call("SET", KEYS[2], 1, "PX", ARGV[3])
+    return tonumber(ARGV[3])
+end
+redis.call("SET", KEYS[1], tat + interval, "PX", tat + interval - now)
+return 0
+"""
+"""GCRA：KEYS 为理论到达时间与限制标记的键，ARGV 为发射间隔、突发容忍度与限制时间（毫秒）；返回剩余的限制时间（毫秒）"""
+
 
+class RedisLimiter:
+    """基于 Redis 的分布式 GCRA 限流器，多个 BOT 进程共享同一份限流状态
+
+    判断与更新在同一个 Lua 脚本中原子地完成，时间取自 Redis 服务器以避免各进程的时钟偏差。
+    已被限制的用户会记录在本地，限制期间无需再访问 Redis。
+
+    :param client: Redis 客户端
+    :param max_rate: 在限制之前最多允许的容量
+    :param rate_per_sec: 每秒恢复的容量
+    :param amount: 每次输入消耗的容量
+    :param limit_time: 限制时间
+    :param prefix: Redis 键的前缀
+    """
+
+    def __init__(
+        self,
+        client: "Redis",
+        max_rate: float,
+        rate_per_sec: float,
+        amount: float,
+        limit_time: float,
+        prefix: str = "meido:limiter",
+    ):
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(_GCRA_SCRIPT)
+        interval = amount / rate_per_sec
+        self._args = [
+            max(int(interval * 1000), 1),
+            int((max_rate - amount) / rate_per_sec * 1000),
+            max(int(limit_time * 1000), 1),
+        ]
+        self._deny_until: Dict[int, float] = {}
+        self._next_sweep = 0.0
+
+    def _sweep(self, time: float) -> None:
+        if time < self._next_sweep:
+            return
+        self._next_sweep = time + 1.0
+        for user_id in [i for i, until in self._deny_until.items() if until <= time]:
+            del self._deny_until[user_id]
+
+    async def acquire(self, user: User) -> None:
+        """消耗用户的容量，若用户已被限制则抛出 ApplicationHandlerStop"""
+        time = monotonic()
+        self._sweep(time)
+        if (until := self._deny_until.get(user.id)) is not None:
+            if time < until:
+                raise ApplicationHandlerStop
+            del self._deny_until[user.id]
+        key = f"{self.prefix}:{user.id}"
+        blocked = await self._script(keys=[key, f"{key}:block"], args=self._args)
+        if blocked:
+            limit_time = int(blocked) / 1000
+            self._deny_until[user.id] = monotonic() + limit_time
+            logger.warning("用户 %s[%s] 触发洪水限制 已被限制 %s 秒", user.full_name, user.id, limit_time)
+            raise ApplicationHandlerStop
+
+
+class LimiterHandler(TypeHandler[UT, CCT]):
     def __init__(
         self, max_rate: float = 5, time_period: float = 10, amount: float = 1, limit_time: Optional[float] = None
     ):
@@ -24,6 +154,10 @@ class LimiterHandler(TypeHandler[UT, CCT]):
         :class:`telegram.ext.ApplicationHandlerStop`
         异常并在一段时间内防止用户执行任何其他操作
 
+        每个用户的状态保存在 :class:`BucketTable` 中，而不是 ``context.user_data``；
+        调用 :meth:`use_redis` 后改为由 :class:`RedisLimiter` 在多个进程之间共享状态。
+        Redis 出错或超时时暂时改回使用本地的 :class:`BucketTable`，每隔 ``redis_retry_interval`` 秒再尝试 Redis
+
         :param max_rate: 在抛出异常之前最多允许 频率/秒 的速度
         :param time_period: 在限制速率的时间段的持续时间
         :param amount: 提供的容量
@@ -33,39 +167,55 @@ class LimiterHandler(TypeHandler[UT, CCT]):
         self.amount = amount
         self._rate_per_sec = max_rate / time_period
         self.limit_time = limit_time
+        self.buckets = BucketTable()
+        self.backend: Optional[RedisLimiter] = None
+        self.redis_retry_interval = 5.0
+        self._redis_retry_at = 0.0
+        """Redis 不可用时，下一次尝试 Redis 的时间；为 0 表示 Redis 可用"""
         super().__init__(Update, self.limiter_callback)
 
-    async def limiter_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    def use_redis(self, client: "Redis") -> None:
+        """改为使用 Redis 在多个进程之间共享限流状态"""
+        limit_time = self.limit_time or 1 / self._rate_per_sec * self.amount
+        self.backend = RedisLimiter(client, self.max_rate, self._rate_per_sec, self.amount, limit_time)
+
+    async def limiter_callback(self, update: Update, _: ContextTypes.DEFAULT_TYPE):
         if update.inline_query is not None:
             return
-        loop = asyncio.get_running_loop()
-        async with self._lock:
-            time = loop.time()
-            user_data = context.user_data
-            if user_data is None:
+        if (user := update.effective_user) is None:
+            return
+        if self.backend is not None and monotonic() >= self._redis_retry_at:
+            try:
+                await self.backend.acquire(user)
+            except (RedisError, TimeoutError) as exc:
+                if not self._redis_retry_at:
+                    logger.warning("Redis 限流不可用 改为使用本地的限流状态：%s", exc)
+                self._redis_retry_at = monotonic() + self.redis_retry_interval
+            else:
+                if self._redis_retry_at:
+                    logger.info("Redis 限流已恢复")
+                    self._redis_retry_at = 0.0
                 return
-            user_limit_time = user_data.get("limit_time")
-            if user_limit_time is not None:
-                if time >= user_limit_time:
-                    del user_data["limit_time"]
-                else:
-                    raise ApplicationHandlerStop
-            last_task_time = user_data.get("last_task_time", 0)
-            if last_task_time:
-                task_level = user_data.get("task_level", 0)
-                elapsed = time - last_task_time
-                decrement = elapsed * self._rate_per_sec
-                task_level = max(task_level - decrement, 0)
-                user_data["task_level"] = task_level
-                if not task_level + self.amount <= self.max_rate:
-                    if self.limit_time:
-                        limit_time = self.limit_time
-                    else:
-                        limit_time = 1 / self._rate_per_sec * self.amount
-                    user_data["limit_time"] = time + limit_time
-                    user = update.effective_user
-                    logger.warning("用户 %s[%s] 触发洪水限制 已被限制 %s 秒", user.full_name, user.id, limit_time)
-                    raise ApplicationHandlerStop
-            user_data["last_task_time"] = time
-            task_level = user_data.get("task_level", 0)
-            user_data["task_level"] = task_level + self.amount
+        self._acquire_local(user)
+
+    def _acquire_local(self, user: User) -> None:
+        """使用本地的 BucketTable 消耗用户的容量，若用户已被限制则抛出 ApplicationHandlerStop"""
+        time = monotonic()
+        self.buckets.maybe_sweep(time, self._rate_per_sec)
+        bucket = self.buckets.get(user.id)
+        if bucket is None:
+            self.buckets.put(user.id, self.amount, time)
+            return
+        if bucket.limit_until:
+            if time < bucket.limit_until:
+                raise ApplicationHandlerStop
+            bucket.limit_until = 0.0
+        level = max(bucket.level - (time - bucket.last) * self._rate_per_sec, 0)
+        if level + self.amount > self.max_rate:
+            bucket.level, bucket.last = level, time
+            limit_time = self.limit_time or 1 / self._rate_per_sec * self.amount
+            bucket.limit_until = time + limit_time
+            logger.warning("用户 %s[%s] 触发洪水限制 已被限制 %s 秒", user.full_name, user.id, limit_time)
+            raise ApplicationHandlerStop
+        bucket.level = level + self.amount
+        bucket.last = time
@@ -0,0 +1,229 @@
+from bisect import insort
+from typing import Any, Dict, FrozenSet, List, Optional, Set, TYPE_CHECKING, Tuple, TypeVar
+
+from telegram import MessageEntity, Update
+
+# noinspection PyProtectedMember
+from telegram._utils.defaultvalue import DEFAULT_TRUE
+from telegram.ext import (
+    ApplicationHandlerStop,
+    BaseHandler,
+    CallbackQueryHandler,
+    CommandHandler,
+    MessageHandler,
+    PrefixHandler,
+    StringCommandHandler,
+    StringRegexHandler,
+)
+from telegram.ext.filters import Regex
+
+from meido.handler.adminhandler import AdminHandler
+from meido.handler.callbackqueryhandler import PrefixTrie, literal_prefix
+from meido.handler.combinedregex import CombinedRegex, mergeable_pattern
+from meido.handler.lazyhandler import LazyPluginHandler
+
+if TYPE_CHECKING:
+    from telegram.ext import Application as TelegramApplication
+
+RT = TypeVar("RT")
+UT = TypeVar("UT")
+CCT = TypeVar("CCT", bound="CallbackContext[Any, Any, Any, Any]")
+
+Key = Tuple[str, str]
+Match = Tuple[BaseHandler, Any]
+CheckResult = Tuple[List[int], int, Optional[Match], Optional[Exception]]
+"""候选的 group、第一个匹配的 group 的下标、该 group 中匹配的 handler 或检查时抛出的异常"""
+
+
+class PluginRouter(BaseHandler[Update, CCT]):
+    """在同一个 group 中路由所有插件的 handler
+
+    每个插件的 handler 仍按插件划分为独立的 group，并保持 python-telegram-bot 的语义：
+    group 按从小到大的顺序处理，每个 group 中只有第一个匹配的 handler 会处理 update；
+    ApplicationHandlerStop 会终止后续 group 的处理，handler 的异常交由 error handler 处理后继续。
+
+    只包含以下 handler 的 group 会建立索引，只有索引命中时才会检查这些 group，其余 group 对每个 update 都会检查：
+
+    - 命令类 handler（CommandHandler、PrefixHandler、StringCommandHandler）按命令名称索引
+    - CallbackQueryHandler 按 pattern 的字面前缀以前缀树索引
+    - LazyPluginHandler 按其命令与 pattern 的字面前缀索引
+    - StringRegexHandler 与 filters 中含有必须满足的 filters.Regex 的 MessageHandler 的 pattern 合并为一个正则表达式，
+      一次匹配即可得到候选的 group；含有反向引用等无法合并的 pattern 时，该 group 不建立索引
+
+    被索引的 handler 在处理前仍会调用自身的 check_update 进行完整的匹配。
+    """
+
+    def __init__(self):
+        super().__init__(self.handle_update, block=True)
+        self._groups: Dict[int, List[BaseHandler]] = {}
+        self._index: Dict[Key, Set[int]] = {}
+        self._callback_index: PrefixTrie[int] = PrefixTrie()
+        self._string_regex: CombinedRegex[int] = CombinedRegex()
+        self._message_regex: CombinedRegex[int] = CombinedRegex(search=True)
+        self._group_keys: Dict[int, FrozenSet[Key]] = {}
+        self._generic: List[int] = []
+        """包含无法建立索引的 handler 的 group，按从小到大排列"""
+
+    @staticmethod
+    def _handler_keys(handler: BaseHandler) -> Optional[FrozenSet[Key]]:
+        """handler 所响应的命令；若无法建立索引则返回 None"""
+        if isinstance(handler, AdminHandler):
+            handler = handler.handler
+        if isinstance(handler, PrefixHandler):
+            return frozenset(("prefix", i.lower()) for i in handler.commands)
+        if isinstance(handler, CommandHandler):
+            return frozenset(("command", i.lower()) for i in handler.commands)
+        if isinstance(handler, StringCommandHandler):
+            return frozenset({("string", handler.command.lower())})
+        if isinstance(handler, CallbackQueryHandler) and (prefix := literal_prefix(handler.pattern)):
+            return frozenset({("callback", prefix)})
+        if isinstance(handler, LazyPluginHandler):
+            if not all(prefixes := [literal_prefix(i) for i in handler.patterns]):
+                return None
+            return frozenset(("command", i) for i in handler.commands).union(("callback", i) for i in prefixes)
+        if isinstance(handler, StringRegexHandler) and (pattern := mergeable_pattern(handler.pattern)):
+            return frozenset({("string_regex", pattern)})
+        if isinstance(handler, MessageHandler) and (regex_filter := PluginRouter._required_regex(handler.filters)):
+            if pattern := mergeable_pattern(regex_filter.pattern):
+                return frozenset({("message_regex", pattern)})
+        return None
+
+    @staticmethod
+    def _required_regex(message_filter: object) -> Optional[Regex]:
+        """filter 中必须满足的 filters.Regex，例如 ``filters.Regex(...) & filters.ChatType.GROUPS`` 中的 Regex"""
+        if type(message_filter) is Regex:  # pylint: disable=C0123
+            return message_filter
+        if getattr(message_filter, "and_filter", None) is not None:  # filters 的 & 运算所生成的 filter
+            return PluginRouter._required_regex(message_filter.base_filter) or PluginRouter._required_regex(
+                message_filter.and_filter
+            )
+        return None
+
+    @staticmethod
+    def _update_keys(update: object) -> Tuple[Key, ...]:
+        """update 可能匹配的命令"""
+        if isinstance(update, str):
+            return (("string", update[1:].split(" ", 1)[0].lower()),) if update.startswith("/") else ()
+        if not isinstance(update, Update) or (message := update.effective_message) is None or not message.text:
+            return ()
+        keys: Tuple[Key, ...] = ()
+        if words := message.text.split(None, 1):
+            keys = (("prefix", words[0].lower()),)
+        # 与 CommandHandler 相同，命令取自位于开头的 bot_command 实体，使 "/start，" 等紧跟标点的命令同样能够匹配
+        if (entities := message.entities) and entities[0].type == MessageEntity.BOT_COMMAND and entities[0].offset == 0:
+            command = message.text[1 : entities[0].length].split("@", 1)[0]
+            keys += (("command", command.lower()),)
+        return keys
+
+    def add_handlers(self, group: int, handlers: List[BaseHandler]) -> None:
+        """将 handlers 添加至 group 中"""
+        self._groups.setdefault(group, []).extend(handlers)
+        self._reindex(group)
+
+    def remove_group(self, group: int) -> None:
+        if self._groups.pop(group, None) is not None:
+            self._reindex(group)
+
+    def _reindex(self, group: int) -> None:
+        for kind, key in self._group_keys.pop(group, ()):
+            if kind == "callback":
+                self._callback_index.discard(key, group)
+            elif kind == "string_regex":
+                self._string_regex.discard(key, group)
+            elif kind == "message_regex":
+                self._message_regex.discard(key, group)
+            elif (groups := self._index.get((kind, key))) is not None:
+                groups.discard(group)
+                if not groups:
+                    del self._index[(kind, key)]
+        if group in self._generic:
+            self._generic.remove(group)
+        if (handlers := self._groups.get(group)) is None:
+            return
+        keys = [self._handler_keys(handler) for handler in handlers]
+        if any(i is None for i in keys):
+            insort(self._generic, group)
+            return
+        self._group_keys[group] = frozenset().union(*keys)
+        for kind, key in self._group_keys[group]:
+            if kind == "callback":
+                self._callback_index.add(key, group)
+            elif kind == "string_regex":
+                self._string_regex.add(key, group)
+            elif kind == "message_regex":
+                self._message_regex.add(key, group)
+            else:
+                self._index.setdefault((kind, key), set()).add(group)
+
+    def _candidates(self, update: object) -> List[int]:
+        indexed: Set[int] = set()
+        for key in self._update_keys(update):
+            indexed.update(self._index.get(key, ()))
+        if isinstance(update, str):
+            if self._string_regex:
+                indexed.update(self._string_regex.find(update))
+        elif isinstance(update, Update):
+            if (callback_query := update.callback_query) is not None and isinstance(data := callback_query.data, str):
+                indexed.update(self._callback_index.find(data))
+            if self._message_regex and (message := update.effective_message) is not None and message.text:
+                indexed.update(self._message_regex.find(message.text))
+        if not indexed:
+            return self._generic.copy()  # 处理 update 期间 group 可能被移除
+        return sorted(indexed.union(self._generic))
+
+    def _check_group(self, group: int, update: object) -> Optional[Match]:
+        """group 中第一个匹配的 handler"""
+        for handler in self._groups.get(group, ()):
+            check = handler.check_update(update)
+            if check is not None and check is not False:
+                return handler, check
+        return None
+
+    def check_update(self, update: object) -> Optional[CheckResult]:
+        """只检查至第一个匹配的 group，之后的 group 在 handle_update 中逐个检查，
+        使前面的 group 对 update 或 context 的修改能够影响后面的 group 是否匹配；
+        检查时抛出的异常同样交由 handle_update 处理，不影响其他 group
+        """
+        candidates = self._candidates(update)
+        for index, group in enumerate(candidates):
+            try:
+                if (match := self._check_group(group, update)) is not None:
+                    return candidates, index, match, None
+            except Exception as exc:  # pylint: disable=W0703
+                return candidates, index, None, exc
+        return None
+
+    @staticmethod
+    def _is_blocking(handler: BaseHandler, application: "TelegramApplication") -> bool:
+        if handler.block is DEFAULT_TRUE and (defaults := getattr(application.bot, "defaults", None)) is not None:
+            return defaults.block
+        return bool(handler.block)
+
+    async def handle_update(
+        self,
+        update: "UT",
+        application: "TelegramApplication[Any, CCT, Any, Any, Any, Any]",
+        check_result: CheckResult,
+        context: "CCT",
+    ) -> None:
+        candidates, start, match, error = check_result
+        for index in range(start, len(candidates)):
+            # 与 Application.process_update 相同，每个 group 的检查与处理中的异常均交由 error handler 处理
+            try:
+                if index != start:
+                    match = self._check_group(candidates[index], update)
+                elif error is not None:
+                    raise error
+                if match is None:
+                    continue
+                handler, check = match
+                coroutine = handler.handle_update(update, application, check, context)
+                if self._is_blocking(handler, application):
+                    await coroutine
+                else:
+                    application.create_task(coroutine, update=update)
+            except ApplicationHandlerStop:
+                raise
+            except Exception as exc:  # pylint: disable=W0703
+                if await application.process_error(update=update, error=exc):
+                    raise ApplicationHandlerStop from exc
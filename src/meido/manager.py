@@ -1,22 +1,43 @@
 import asyncio
 import sys
+from contextlib import nullcontext
+from functools import reduce
 from importlib import import_module
 from pathlib import Path
-from typing import Dict, Generic, List, Optional, TYPE_CHECKING, Type, TypeVar
+from time import monotonic
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    TYPE_CHECKING,
+    Tuple,
+    Type,
+    TypeVar,
+)
 
-from arkowrapper import ArkoWrapper
 from typing_extensions import ParamSpec
 
 from meido.base_service import BaseServiceType, ComponentType, DependenceType, get_all_services
 from meido.config import config as bot_config
+from meido.error import DependencyCycleError
+from meido.manifest import manifest
 from meido.utils.const import PLUGIN_DIR, PROJECT_ROOT
+from meido.utils.graph import DependencyGraph
 from meido.utils.helpers import gen_pkg
 from meido.utils.log import logger
+from meido.utils.registry import TypeRegistry
+from meido.utils.timeline import StartupTimeline
 
 if TYPE_CHECKING:
     from meido.application import Application
     from meido.plugin import PluginType
     from meido.builtins.executor import Executor
+    from meido.handler.lazyhandler import LazyPluginHandler
 
 if sys.version_info >= (3, 11):
     from asyncio import timeout
@@ -30,16 +51,44 @@ T = TypeVar("T")
 P = ParamSpec("P")
 
 
-def _load_module(path: Path) -> None:
+def _count_targets() -> Tuple[int, int]:
+    """已定义的服务与插件的数量"""
+    from meido.plugin import get_all_plugins
+
+    return sum(1 for _ in get_all_services()), sum(1 for _ in get_all_plugins())
+
+
+def _load_module(
+    path: Path,
+    lazy: Optional[Dict[str, Dict[str, Dict[str, List[Any]]]]] = None,
+    timeline: Optional[StartupTimeline] = None,
+) -> None:
+    """导入 path 下的所有模块
+
+    若提供了 lazy，则可以延迟加载的插件模块不会被导入，而是记录于 lazy 中；
+    若 timeline 启用了分析，则记录每个模块的导入耗时（包括其导入的其他模块）
+    """
     for pkg in gen_pkg(path):
+        if manifest.can_skip(pkg):  # 上次导入时未定义任何服务或插件
+            logger.debug('跳过导入 "%s"', pkg)
+            continue
+        if lazy is not None and pkg not in sys.modules and (plugins := manifest.get_lazy_plugins(pkg)):
+            lazy[pkg] = plugins
+            continue
+        imported = pkg in sys.modules
+        count = _count_targets() if manifest.enabled else (0, 0)
         try:
             logger.debug('正在导入 "%s"', pkg)
-            import_module(pkg)
+            with timeline.span("import", pkg) if timeline is not None and timeline.profiling else nullcontext():
+                import_module(pkg)
         except Exception as e:
             logger.exception(
                 '在导入 "%s" 的过程中遇到了错误 [red bold]%s[/]', pkg, type(e).__name__, exc_info=e, extra={"markup": True}
             )
             raise SystemExit from e
+        if manifest.enabled:  # 已被其他模块导入的模块无法判断，视为定义了服务与插件
+            services, plugins = _count_targets()
+            manifest.record_module(pkg, imported or (services, plugins) != count, imported or services != count[0])
 
 
 class Manager(Generic[T]):
@@ -47,6 +96,8 @@ class Manager(Generic[T]):
 
     _executor: Optional["Executor"] = None
     _lib: Dict[Type[T], T] = {}
+    _registry: TypeRegistry = TypeRegistry()
+    _timeline: StartupTimeline = StartupTimeline()
     _application: "Optional[Application]" = None
 
     def set_application(self, application: "Application") -> None:
@@ -58,6 +109,66 @@ class Manager(Generic[T]):
             raise RuntimeError(f"No application was set for this {self.__class__.__name__}.")
         return self._application
 
+    @property
+    def registry(self) -> TypeRegistry:
+        """所有已启动的依赖、组件、服务和插件的类型注册表"""
+        return self._registry
+
+    @property
+    def timeline(self) -> StartupTimeline:
+        """启动过程的耗时记录"""
+        return self._timeline
+
+    def _register(self, target: Type[T], instance: T) -> None:
+        self._lib[target] = instance
+        self._registry.add(instance, target)
+
+    def _unregister(self, target: Type[T]) -> None:
+        self._lib.pop(target, None)
+        self._registry.remove(target)
+
+    @staticmethod
+    def _levels(targets: Iterable[Type[T]], name: str, skip_cycles: bool = False) -> List[List[Type[T]]]:
+        """依据 __init__ 的类型注解构建依赖图并按拓扑顺序分层
+
+        存在循环依赖时 BOT 将自动关闭；若 skip_cycles 为 True，则只跳过位于环中或依赖于环的目标
+        """
+        graph = DependencyGraph.from_init(targets)
+        if not skip_cycles:
+            try:
+                return graph.levels()
+            except DependencyCycleError as e:
+                logger.error("%s之间存在循环依赖：%s", name, " -> ".join(i.__name__ for i in e.cycle))
+                raise SystemExit from e
+        levels, blocked = graph.partial_levels()
+        if blocked:
+            cycle = graph.find_cycle() or blocked
+            logger.error("%s之间存在循环依赖：%s", name, " -> ".join(i.__name__ for i in cycle))
+            for target in blocked:
+                logger.error('%s "%s" 存在循环依赖，已跳过', name, f"{target.__module__}.{target.__name__}")
+        return levels
+
+    async def _start_levels(self, levels: List[List[Type[T]]], func: Callable[[Type[T]], Awaitable], name: str) -> None:
+        """逐层执行 func，同一层中的目标并发执行，并发数受 startup_concurrency 限制
+
+        启用启动分析时逐个执行，以便准确记录每个目标的耗时与内存变化；出现异常时记录第一个异常，BOT 将自动关闭
+        """
+        limit = 1 if self.timeline.profiling else bot_config.startup_concurrency
+        semaphore = asyncio.Semaphore(limit) if limit else None
+
+        async def run(target: Type[T]) -> None:
+            if semaphore is None:
+                return await func(target)
+            async with semaphore:
+                return await func(target)
+
+        for level in levels:
+            results = await asyncio.gather(*map(run, level), return_exceptions=True)
+            for target, result in zip(level, results):
+                if isinstance(result, BaseException):
+                    logger.error('%s "%s" 初始化失败，BOT 将自动关闭', name, target.__name__, exc_info=result)
+                    raise SystemExit from result
+
     @property
     def executor(self) -> "Executor":
         """执行器"""
@@ -86,27 +197,26 @@ class DependenceManager(Manager[DependenceType]):
     def dependency_map(self) -> Dict[Type[DependenceType], DependenceType]:
         return self._dependency
 
-    async def start_dependency(self) -> None:
-        _load_module(PROJECT_ROOT / "core/dependence")
-
-        for dependence in filter(lambda x: x.is_dependence, get_all_services()):
-            dependence: Type[DependenceType]
-            instance: DependenceType
-            try:
-                if hasattr(dependence, "from_config"):  # 如果有 from_config 方法
-                    instance = dependence.from_config(bot_config)  # 用 from_config 实例化服务
-                else:
-                    instance = await self.executor(dependence)
+    async def _start_dependence(self, dependence: Type[DependenceType]) -> None:
+        instance: DependenceType
+        with self.timeline.span("dependence", dependence.__name__, "construct"):
+            if hasattr(dependence, "from_config"):  # 如果有 from_config 方法
+                instance = dependence.from_config(bot_config)  # 用 from_config 实例化服务
+            else:
+                instance = await self.executor(dependence)
+        with self.timeline.span("dependence", dependence.__name__, "initialize"):
+            await instance.initialize()
+        logger.success('基础服务 "%s" 启动成功', dependence.__name__)
 
-                await instance.initialize()
-                logger.success('基础服务 "%s" 启动成功', dependence.__name__)
+        self._register(dependence, instance)
+        self._dependency[dependence] = instance
 
-                self._lib[dependence] = instance
-                self._dependency[dependence] = instance
+    async def start_dependency(self) -> None:
+        """依据 __init__ 的类型注解构建依赖图，并发启动互不依赖的基础服务"""
+        _load_module(PROJECT_ROOT / "core/dependence", timeline=self.timeline)
 
-            except Exception as e:
-                logger.exception('基础服务 "%s" 初始化失败，BOT 将自动关闭', dependence.__name__)
-                raise SystemExit from e
+        levels = self._levels(filter(lambda x: x.is_dependence, get_all_services()), "基础服务")
+        await self._start_levels(levels, self._start_dependence, "基础服务")
 
     async def stop_dependency(self) -> None:
         async def task(d):
@@ -125,6 +235,10 @@ class DependenceManager(Manager[DependenceType]):
 
         await asyncio.gather(*tasks)
 
+        for dependence in list(self._dependency):
+            self._unregister(dependence)
+            del self._dependency[dependence]
+
 
 class ComponentManager(Manager[ComponentType]):
     """组件管理"""
@@ -139,34 +253,21 @@ class ComponentManager(Manager[ComponentType]):
     def components_map(self) -> Dict[Type[ComponentType], ComponentType]:
         return self._components
 
+    async def _init_component(self, component: Type[ComponentType]) -> None:
+        with self.timeline.span("component", component.__name__, "construct"):
+            instance: ComponentType = await self.executor(component)
+        self._register(component, instance)
+        self._components[component] = instance
+
     async def init_components(self):
+        """依据 __init__ 的类型注解构建依赖图，按拓扑顺序实例化组件"""
         for path in filter(
             lambda x: x.is_dir() and not x.name.startswith("_"), PROJECT_ROOT.joinpath("core/services").iterdir()
         ):
-            _load_module(path)
-        components = ArkoWrapper(get_all_services()).filter(lambda x: x.is_component)
-        retry_times = 0
-        max_retry_times = len(components)
-        while components:
-            start_len = len(components)
-            for component in list(components):
-                component: Type[ComponentType]
-                instance: ComponentType
-                try:
-                    instance = await self.executor(component)
-                    self._lib[component] = instance
-                    self._components[component] = instance
-                    components = components.remove(component)
-                except Exception as e:  # pylint: disable=W0703
-                    logger.debug('组件 "%s" 初始化失败: [red]%s[/]', component.__name__, e, extra={"markup": True})
-            end_len = len(list(components))
-            if start_len == end_len:
-                retry_times += 1
-
-            if retry_times == max_retry_times and components:
-                for component in components:
-                    logger.error('组件 "%s" 初始化失败', component.__name__)
-                raise SystemExit
+            _load_module(path, timeline=self.timeline)
+
+        levels = self._levels(filter(lambda x: x.is_component, get_all_services()), "组件")
+        await self._start_levels(levels, self._init_component, "组件")  # 按拓扑顺序逐层实例化，同一层的组件互不依赖
 
 
 class ServiceManager(Manager[BaseServiceType]):
@@ -182,34 +283,28 @@ class ServiceManager(Manager[BaseServiceType]):
     def services_map(self) -> Dict[Type[BaseServiceType], BaseServiceType]:
         return self._services
 
-    async def _initialize_service(self, target: Type[BaseServiceType]) -> BaseServiceType:
+    async def _initialize_service(self, target: Type[BaseServiceType]) -> None:
         instance: BaseServiceType
-        try:
+        with self.timeline.span("service", target.__name__, "construct"):
             if hasattr(target, "from_config"):  # 如果有 from_config 方法
                 instance = target.from_config(bot_config)  # 用 from_config 实例化服务
             else:
                 instance = await self.executor(target)
-
+        with self.timeline.span("service", target.__name__, "initialize"):
             await instance.initialize()
-            logger.success('服务 "%s" 启动成功', target.__name__)
+        logger.success('服务 "%s" 启动成功', target.__name__)
 
-            return instance
-
-        except Exception as e:  # pylint: disable=W0703
-            logger.exception('服务 "%s" 初始化失败，BOT 将自动关闭', target.__name__)
-            raise SystemExit from e
+        self._register(target, instance)
+        self._services[target] = instance
 
     async def start_services(self) -> None:
         for path in filter(
             lambda x: x.is_dir() and not x.name.startswith("_"), PROJECT_ROOT.joinpath("core/services").iterdir()
         ):
-            _load_module(path)
-
-        for service in filter(lambda x: not x.is_component and not x.is_dependence, get_all_services()):  # 遍历所有服务类
-            instance = await self._initialize_service(service)
+            _load_module(path, timeline=self.timeline)
 
-            self._lib[service] = instance
-            self._services[service] = instance
+        services = filter(lambda x: not x.is_component and not x.is_dependence, get_all_services())  # 遍历所有服务类
+        await self._start_levels(self._levels(services, "服务"), self._initialize_service, "服务")
 
     async def stop_services(self) -> None:
         """关闭服务"""
@@ -233,11 +328,17 @@ class ServiceManager(Manager[BaseServiceType]):
 
         await asyncio.gather(*tasks)
 
+        for service in list(self._services):
+            self._unregister(service)
+            del self._services[service]
+
 
 class PluginManager(Manager["PluginType"]):
     """插件管理"""
 
     _plugins: Dict[Type["PluginType"], "PluginType"] = {}
+    _lazy_handlers: List["LazyPluginHandler"] = []
+    _idle_task: Optional[asyncio.Task] = None
 
     @property
     def plugins(self) -> List["PluginType"]:
@@ -252,34 +353,112 @@ class PluginManager(Manager["PluginType"]):
         """安装所有插件"""
         from meido.plugin import get_all_plugins
 
+        lazy = None
+        if bot_config.lazy_plugins:
+            if manifest.enabled:
+                lazy = {}
+            else:
+                logger.warning("延迟加载插件需要启用 startup_manifest，将加载所有插件")
+
         for path in filter(lambda x: x.is_dir(), PLUGIN_DIR.iterdir()):
-            _load_module(path)
+            _load_module(path, lazy, self.timeline)
 
-        for plugin in get_all_plugins():
-            plugin: Type["PluginType"]
+        await self._start_levels(self._levels(get_all_plugins(), "插件", skip_cycles=True), self._install_plugin, "插件")
 
-            try:
+        for module, plugins in (lazy or {}).items():
+            for name, triggers in plugins.items():
+                self._add_lazy_handler(module, name, triggers)
+        if self._lazy_handlers and bot_config.plugin_idle_timeout:
+            self._idle_task = asyncio.create_task(self._unload_idle_plugins(bot_config.plugin_idle_timeout))
+        manifest.save()
+
+    async def _install_plugin(self, plugin: Type["PluginType"]) -> Optional["PluginType"]:
+        """实例化并安装插件，插件的异常不会导致 BOT 关闭"""
+        try:
+            with self.timeline.span("plugin", plugin.__name__, "construct"):
                 instance: "PluginType" = await self.executor(plugin)
-            except Exception as e:  # pylint: disable=W0703
-                logger.error('插件 "%s" 初始化失败', f"{plugin.__module__}.{plugin.__name__}", exc_info=e)
-                continue
+        except Exception as e:  # pylint: disable=W0703
+            logger.error('插件 "%s" 初始化失败', f"{plugin.__module__}.{plugin.__name__}", exc_info=e)
+            return None
 
-            self._plugins[plugin] = instance
+        self._register(plugin, instance)
+        self._plugins[plugin] = instance
 
-            if self._application is not None:
-                instance.set_application(self._application)
+        if self._application is not None:
+            instance.set_application(self._application)
 
-            await asyncio.create_task(self.plugin_install_task(plugin, instance))
+        with self.timeline.span("plugin", plugin.__name__, "install"):
+            installed = await self.plugin_install_task(plugin, instance)
+        return instance if installed else None
 
     @staticmethod
-    async def plugin_install_task(plugin: Type["PluginType"], instance: "PluginType"):
+    async def plugin_install_task(plugin: Type["PluginType"], instance: "PluginType") -> bool:
         try:
             await instance.install()
             logger.success('插件 "%s" 安装成功', f"{plugin.__module__}.{plugin.__name__}")
+            manifest.record_plugin(plugin, instance._lazy_triggers())  # pylint: disable=W0212
+            return True
         except Exception as e:  # pylint: disable=W0703
             logger.error('插件 "%s" 安装失败', f"{plugin.__module__}.{plugin.__name__}", exc_info=e)
+            return False
+
+    def _add_lazy_handler(self, module: str, name: str, triggers: Dict[str, List[Any]]) -> None:
+        """注册延迟加载插件的占位 handler，收到匹配的 update 时才导入并安装插件"""
+        from meido.handler.lazyhandler import LazyPluginHandler
+
+        async def loader() -> Optional["PluginType"]:
+            try:
+                plugin = reduce(getattr, name.split("."), import_module(module))
+            except Exception as e:  # pylint: disable=W0703
+                logger.error('插件 "%s" 导入失败', f"{module}.{name}", exc_info=e)
+                return None
+            instance = await self._install_plugin(plugin)
+            manifest.save()
+            return instance
+
+        handler = LazyPluginHandler(f"{module}.{name}", triggers["commands"], triggers["patterns"], loader)
+        if self.application.router is not None:
+            # 插件加载后其 handler 由 router 路由，占位 handler 也需位于 router 中，
+            # 使 router 在本次 update 中不会再次检查插件新添加的 group
+            self.application.router.add_handlers(id(handler), [handler])
+        else:
+            self.application.telegram.add_handler(handler, id(handler))
+        self._lazy_handlers.append(handler)
+        logger.debug('插件 "%s" 将延迟加载', handler.name)
+
+    async def _uninstall_plugin(self, instance: "PluginType") -> None:
+        plugin = type(instance)
+        try:
+            await instance.uninstall()
+        except Exception as e:  # pylint: disable=W0703
+            logger.error('插件 "%s" 卸载失败', f"{plugin.__module__}.{plugin.__name__}", exc_info=e)
+        self._unregister(plugin)
+        self._plugins.pop(plugin, None)
+
+    async def _unload_idle_plugins(self, timeout: float) -> None:
+        """卸载闲置超过 timeout 秒的延迟加载插件，收到匹配的 update 时会重新加载"""
+        while True:
+            await asyncio.sleep(min(timeout, 60))
+            for handler in self._lazy_handlers:
+                async with handler.lock:
+                    if (instance := handler.plugin) is None or monotonic() - handler.last_used < timeout:
+                        continue
+                    handler.plugin = None
+                    await self._uninstall_plugin(instance)
+                    logger.info('插件 "%s" 闲置超过 %s 秒，已卸载', handler.name, timeout)
 
     async def uninstall_plugins(self) -> None:
+        if self._idle_task is not None:
+            self._idle_task.cancel()
+            self._idle_task = None
+        for handler in self._lazy_handlers:
+            if self.application.router is not None:
+                self.application.router.remove_group(id(handler))
+            else:
+                self.application.telegram.remove_handler(handler, id(handler))
+            handler.plugin = None
+        self._lazy_handlers.clear()
+
         for plugin in self._plugins.values():
             try:
                 await plugin.uninstall()
@@ -0,0 +1,149 @@
+"""启动清单
+
+缓存模块导入与插件反射的结果，重启时可以跳过未定义服务或插件的模块，并且无需对插件进行 dir() 扫描。
+清单以文件的修改时间与大小作为键，文件发生变化时对应的记录失效。
+类的记录还依赖于其 MRO 中其它模块的文件，这些文件发生变化时该类的记录同样失效。
+"""
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Type, Union
+
+from meido.config import config
+from meido.utils import jsonlib
+from meido.utils.const import CACHE_DIR, PROJECT_ROOT
+from meido.utils.log import logger
+
+__all__ = ("StartupManifest", "manifest")
+
+PathType = Union[str, Path]
+
+
+class StartupManifest:
+    """启动清单
+
+    Args:
+        path (Path): 清单文件的路径
+    """
+
+    version: int = 3
+
+    def __init__(self, path: Path = CACHE_DIR / "startup_manifest.json"):
+        self.path = path
+        self._modules: Optional[Dict[str, Dict[str, Any]]] = None
+        self._dirty = False
+
+    @property
+    def enabled(self) -> bool:
+        return config.startup_manifest
+
+    @property
+    def modules(self) -> Dict[str, Dict[str, Any]]:
+        if self._modules is None:
+            self._modules = {}
+            try:
+                data = jsonlib.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                data = {}
+            if isinstance(data, dict) and data.get("version") == self.version:
+                self._modules = data.get("modules", {})
+        return self._modules
+
+    def save(self) -> None:
+        """若清单发生了变化，则将其写入文件"""
+        if not (self.enabled and self._dirty):
+            return
+        temp = self.path.with_suffix(".tmp")
+        try:
+            temp.write_text(jsonlib.dumps({"version": self.version, "modules": self.modules}), encoding="utf-8")
+            os.replace(temp, self.path)
+        except OSError as e:
+            logger.warning("启动清单写入失败：%s", e)
+        else:
+            self._dirty = False
+
+    @staticmethod
+    def _fingerprint(file: Optional[PathType]) -> Optional[List[int]]:
+        try:
+            stat = os.stat(file)
+        except (OSError, TypeError):
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+    @staticmethod
+    def _module_file(module: str) -> Optional[str]:
+        if (loaded := sys.modules.get(module)) is not None:
+            return getattr(loaded, "__file__", None)
+        return str(PROJECT_ROOT.joinpath(*module.split(".")).with_suffix(".py"))
+
+    def _dependencies(self, cls: Type) -> Dict[str, Optional[List[int]]]:
+        """类的 MRO 中除定义该类的模块以外的其它模块的文件及其指纹"""
+        dependencies = {}
+        for klass in cls.__mro__:
+            if klass.__module__ in (cls.__module__, "builtins"):
+                continue
+            if (file := self._module_file(klass.__module__)) is not None:
+                dependencies[file] = self._fingerprint(file)
+        return dependencies
+
+    def _is_fresh(self, record: Any) -> bool:
+        """类的记录所依赖的文件是否均未发生变化"""
+        return isinstance(record, dict) and all(
+            self._fingerprint(file) == fingerprint for file, fingerprint in record.get("dependencies", {}).items()
+        )
+
+    def _entry(self, module: str, create: bool = False) -> Optional[Dict[str, Any]]:
+        """获取模块的记录，文件发生变化时记录失效"""
+        fingerprint = self._fingerprint(self._module_file(module))
+        if (entry := self.modules.get(module)) is not None and fingerprint is not None:
+            if entry.get("fingerprint") == fingerprint:
+                return entry
+        if not create or fingerprint is None:
+            return None
+        entry = self.modules[module] = {"fingerprint": fingerprint, "targets": True, "classes": {}}
+        self._dirty = True
+        return entry
+
+    def can_skip(self, module: str) -> bool:
+        """模块是否可以跳过导入，即上次导入时未定义任何服务或插件且文件未发生变化"""
+        return self.enabled and (entry := self._entry(module)) is not None and not entry["targets"]
+
+    def record_module(self, module: str, targets: bool, services: bool = True) -> None:
+        """记录模块是否定义了服务或插件，以及是否定义了服务"""
+        if self.enabled and (entry := self._entry(module, create=True)) is not None:
+            if entry["targets"] != targets or entry.get("services") != services:
+                entry.update(targets=targets, services=services)
+                self._dirty = True
+
+    def get_attrs(self, cls: Type) -> Optional[Dict[str, List[str]]]:
+        """获取类中带有 handler、job 等元数据的方法名"""
+        if self.enabled and (entry := self._entry(cls.__module__)) is not None:
+            if self._is_fresh(record := entry["classes"].get(cls.__qualname__)):
+                return record["attrs"]
+        return None
+
+    def record_attrs(self, cls: Type, attrs: Dict[str, List[str]]) -> None:
+        if self.enabled and (entry := self._entry(cls.__module__, create=True)) is not None:
+            entry["classes"][cls.__qualname__] = {"attrs": attrs, "dependencies": self._dependencies(cls)}
+            self._dirty = True
+
+    def record_plugin(self, cls: Type, triggers: Optional[Dict[str, List[str]]]) -> None:
+        """记录插件延迟加载的触发条件，None 表示该插件无法延迟加载"""
+        if self.enabled and (entry := self._entry(cls.__module__, create=True)) is not None:
+            record = {"triggers": triggers, "dependencies": self._dependencies(cls)}
+            if entry.setdefault("plugins", {}).get(cls.__qualname__) != record:
+                entry["plugins"][cls.__qualname__] = record
+                self._dirty = True
+
+    def get_lazy_plugins(self, module: str) -> Optional[Dict[str, Dict[str, List[Any]]]]:
+        """若模块未定义服务，且其中所有插件都可以延迟加载，则返回插件名及其触发条件"""
+        if not self.enabled or (entry := self._entry(module)) is None or entry.get("services", True):
+            return None
+        if not (plugins := entry.get("plugins")):
+            return None
+        if any(not self._is_fresh(record) or record["triggers"] is None for record in plugins.values()):
+            return None
+        return {name: record["triggers"] for name, record in plugins.items()}
+
+
+manifest = StartupManifest()
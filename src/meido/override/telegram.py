@@ -1,43 +1,177 @@
-"""重写 telegram.request.HTTPXRequest 使其使用 ujson 库进行 json 序列化"""
-from typing import Any, AsyncIterable, Optional
+"""重写 telegram.request.HTTPXRequest 使其使用 meido.utils.jsonlib 进行 json 序列化，并根据排队情况动态调整连接池"""
+import asyncio
+import json
+from collections import deque
+from time import monotonic
+from typing import Any, AsyncIterable, Callable, Deque, Dict, Optional, Tuple
 
 import httpcore
 from httpx import (
     AsyncByteStream,
+    AsyncClient,
     AsyncHTTPTransport as DefaultAsyncHTTPTransport,
     Limits,
     Response as DefaultResponse,
     Timeout,
 )
-from telegram.request import HTTPXRequest as DefaultHTTPXRequest
 
-try:
-    import ujson as jsonlib
-except ImportError:
-    import json as jsonlib
+# noinspection PyProtectedMember
+from httpx._transports.default import AsyncResponseStream
+from telegram.request import HTTPXRequest as DefaultHTTPXRequest, RequestData as DefaultRequestData
+
+from meido.utils import jsonlib
 
-__all__ = ("HTTPXRequest",)
+__all__ = ("HTTPXRequest", "PoolController", "RequestData")
 
 
 class Response(DefaultResponse):
     def json(self, **kwargs: Any) -> Any:
+        if kwargs:
+            return json.loads(self.content, **kwargs)
+        encoding = self.charset_encoding
+        if encoding is None or encoding.lower() in ("utf-8", "utf8"):
+            return jsonlib.loads(self.content)  # JSON 默认以 UTF-8 编码，直接解析 bytes，无需先解码为 str
+        return jsonlib.loads(self.content.decode(encoding))
+
+
+class RequestData(DefaultRequestData):
+    """使用 jsonlib 序列化请求参数"""
+
+    def __init__(self, request_data: DefaultRequestData):
         # noinspection PyProtectedMember
-        from httpx._utils import guess_json_utf
+        super().__init__(request_data._parameters)
+
+    @property
+    def json_parameters(self) -> Dict[str, str]:
+        return {
+            param.name: value if isinstance(value := param.value, str) else jsonlib.dumps(value)
+            for param in self._parameters
+            if param.value is not None
+        }
+
+    @property
+    def json_payload(self) -> bytes:
+        return jsonlib.dumps_bytes(self.json_parameters)
+
+
+class PoolController:
+    """根据排队情况动态调整同时进行的请求数
+
+    请求需要排队时立即将容量翻倍，使突发的请求无需等待下一次检查；
+    每隔 interval 秒检查一次，期间同时进行的请求数的峰值不足容量的一半时容量减半。
+    容量始终位于 min_size 与 max_size 之间。
+
+    :param min_size: 最小容量
+    :param max_size: 最大容量
+    :param interval: 缩减容量的检查间隔（秒）
+    """
+
+    def __init__(self, min_size: int, max_size: int, interval: float = 5.0):
+        self.min_size = max(min(min_size, max_size), 1)
+        self.max_size = max(max_size, 1)
+        self.size = self.min_size
+        self.interval = interval
+        self.in_flight = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.on_resize: Optional[Callable[[int], None]] = None
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._window_peak = 0
+        self._shrunk_at = monotonic()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "size": self.size,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "wait_seconds": self.wait_seconds,
+        }
+
+    def _resize(self, size: int) -> None:
+        if size != self.size:
+            self.size = size
+            if self.on_resize is not None:
+                self.on_resize(size)
+            while self._waiters and self.in_flight < self.size:
+                self._grant()
+
+    def _maybe_shrink(self, now: float) -> None:
+        if now - self._shrunk_at < self.interval:
+            return
+        self._shrunk_at = now
+        if not self._waiters and self._window_peak < self.size // 2:
+            self._resize(max(self.size // 2, self.min_size))
+        self._window_peak = self.in_flight
+
+    def _grant(self) -> None:
+        waiter = self._waiters.popleft()
+        if not waiter.done():
+            self.in_flight += 1
+            waiter.set_result(None)
 
-        if self.charset_encoding is None and self.content and len(self.content) > 3:
-            encoding = guess_json_utf(self.content)
-            if encoding is not None:
-                return jsonlib.loads(self.content.decode(encoding), **kwargs)
-        return jsonlib.loads(self.text, **kwargs)
+    async def acquire(self, timeout: Optional[float] = None) -> None:
+        """获取一个请求的名额，超时则抛出 httpcore.PoolTimeout"""
+        start = monotonic()
+        self._maybe_shrink(start)
+        if self.in_flight >= self.size and self.size < self.max_size:
+            self._resize(min(self.size * 2, self.max_size))
+        if self._waiters or self.in_flight >= self.size:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, timeout)
+            except asyncio.TimeoutError as exc:
+                self.timeouts += 1
+                raise httpcore.PoolTimeout from exc
+        else:
+            self.in_flight += 1
+        self.acquired += 1
+        self.wait_seconds += monotonic() - start
+        self._window_peak = max(self._window_peak, self.in_flight)
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._maybe_shrink(monotonic())
+        while self._waiters and self.in_flight < self.size:
+            self._grant()
+
+
+class _ControlledResponseStream(AsyncResponseStream):
+    """关闭时释放 PoolController 的名额"""
+
+    def __init__(self, httpcore_stream: AsyncIterable[bytes], controller: PoolController):
+        super().__init__(httpcore_stream)
+        self._controller: Optional[PoolController] = controller
+
+    async def aclose(self) -> None:
+        try:
+            await super().aclose()
+        finally:
+            if self._controller is not None:
+                self._controller.release()
+                self._controller = None
 
 
 # noinspection PyProtectedMember
 class AsyncHTTPTransport(DefaultAsyncHTTPTransport):
+    def __init__(self, *args, controller: Optional[PoolController] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.controller = controller
+        if controller is not None:
+            controller.on_resize = self._resize
+
+    def _resize(self, size: int) -> None:
+        """使连接池保留的空闲连接数与容量一致，多余的连接由 httpcore 在之后的请求中关闭"""
+        if hasattr(self._pool, "_max_keepalive_connections"):
+            self._pool._max_keepalive_connections = size
+
     async def handle_async_request(self, request) -> Response:
-        from httpx._transports.default import (
-            map_httpcore_exceptions,
-            AsyncResponseStream,
-        )
+        from httpx._transports.default import map_httpcore_exceptions
+
+        controller = self.controller
 
         if not isinstance(request.stream, AsyncByteStream):
             raise AssertionError
@@ -55,20 +189,36 @@ class AsyncHTTPTransport(DefaultAsyncHTTPTransport):
             extensions=request.extensions,
         )
         with map_httpcore_exceptions():
-            resp = await self._pool.handle_async_request(req)
+            if controller is not None:
+                await controller.acquire(request.extensions.get("timeout", {}).get("pool"))
+            try:
+                resp = await self._pool.handle_async_request(req)
+            except BaseException:
+                if controller is not None:
+                    controller.release()
+                raise
 
         if not isinstance(resp.stream, AsyncIterable):
             raise AssertionError
 
+        stream = AsyncResponseStream(resp.stream)
+        if controller is not None:
+            stream = _ControlledResponseStream(resp.stream, controller)
         return Response(
             status_code=resp.status,
             headers=resp.headers,
-            stream=AsyncResponseStream(resp.stream),
+            stream=stream,
             extensions=resp.extensions,
         )
 
 
 class HTTPXRequest(DefaultHTTPXRequest):
+    """
+    :param http_version: 使用的 HTTP 版本，``"2"`` 时同一个连接可以同时进行多个请求，需要安装 ``httpx[http2]``
+    :param pool_min_size: 连接池的最小容量，指定后由 :class:`PoolController` 在该值与 connection_pool_size
+        之间根据排队情况动态调整同时进行的请求数
+    """
+
     def __init__(  # pylint: disable=W0231
         self,
         connection_pool_size: int = 1,
@@ -78,6 +228,7 @@ class HTTPXRequest(DefaultHTTPXRequest):
         connect_timeout: Optional[float] = 5.0,
         pool_timeout: Optional[float] = 1.0,
         http_version: str = "1.1",
+        pool_min_size: Optional[int] = None,
     ):
         self._http_version = http_version
         timeout = Timeout(
@@ -93,11 +244,13 @@ class HTTPXRequest(DefaultHTTPXRequest):
         if http_version not in ("1.1", "2"):
             raise ValueError("`http_version` must be either '1.1' or '2'.")
         http1 = http_version == "1.1"
+        self.pool: Optional[PoolController] = None
+        if pool_min_size is not None:
+            self.pool = PoolController(pool_min_size, connection_pool_size)
         self._client_kwargs = dict(
             timeout=timeout,
             proxies=proxy_url,
             limits=limits,
-            transport=AsyncHTTPTransport(limits=limits),
             http1=http1,
             http2=not http1,
         )
@@ -115,3 +268,26 @@ class HTTPXRequest(DefaultHTTPXRequest):
             raise RuntimeError(
                 "To use HTTP/2, PTB must be installed via `pip install " "python-telegram-bot[http2]`."
             ) from exc
+
+    def _build_client(self) -> AsyncClient:
+        """每次构建 client 时都创建新的 transport，HTTP 版本由 transport 决定"""
+        kwargs = self._client_kwargs
+        transport = AsyncHTTPTransport(
+            limits=kwargs["limits"], http1=kwargs["http1"], http2=kwargs["http2"], controller=self.pool
+        )
+        return AsyncClient(**kwargs, transport=transport)
+
+    @staticmethod
+    def parse_json_payload(payload: bytes) -> Dict[str, Any]:
+        """直接从 bytes 解析响应，解析失败时交由 python-telegram-bot 处理"""
+        try:
+            return jsonlib.loads(payload)
+        except ValueError:
+            return DefaultHTTPXRequest.parse_json_payload(payload)
+
+    async def do_request(
+        self, url: str, method: str, request_data: Optional[DefaultRequestData] = None, *args, **kwargs
+    ) -> Tuple[int, bytes]:
+        if request_data is not None and not request_data.contains_files:
+            request_data = RequestData(request_data)
+        return await super().do_request(url, method, request_data, *args, **kwargs)
@@ -29,6 +29,7 @@ from typing_extensions import ParamSpec
 
 from meido.handler.callbackqueryhandler import CallbackQueryHandler
 from meido.utils.const import WRAPPER_ASSIGNMENTS as _WRAPPER_ASSIGNMENTS
+from meido.utils.workers import OffloadType, get_callback_offload
 
 if TYPE_CHECKING:
     from meido.builtins.dispatcher import AbstractDispatcher
@@ -79,6 +80,7 @@ class HandlerData:
     admin: bool
     kwargs: Dict[str, Any]
     dispatcher: Optional[Type["AbstractDispatcher"]] = None
+    offload: OffloadType = None
 
 
 class _Handler:
@@ -97,8 +99,15 @@ class _Handler:
 
         cls._type = getattr(Module, handler_name, None)
 
-    def __init__(self, admin: bool = False, dispatcher: Optional[Type["AbstractDispatcher"]] = None, **kwargs) -> None:
+    def __init__(
+        self,
+        admin: bool = False,
+        dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
+        **kwargs,
+    ) -> None:
         self.dispatcher = dispatcher
+        self.offload = get_callback_offload(offload)
         self.admin = admin
         self.kwargs = kwargs
 
@@ -107,7 +116,13 @@ class _Handler:
 
         handler_datas = getattr(func, HANDLER_DATA_ATTR_NAME, [])
         handler_datas.append(
-            HandlerData(type=self._type, admin=self.admin, kwargs=self.kwargs, dispatcher=self.dispatcher)
+            HandlerData(
+                type=self._type,
+                admin=self.admin,
+                kwargs=self.kwargs,
+                dispatcher=self.dispatcher,
+                offload=self.offload,
+            )
         )
         setattr(func, HANDLER_DATA_ATTR_NAME, handler_datas)
 
@@ -122,13 +137,23 @@ class _CallbackQuery(_Handler):
         block: DVInput[bool] = DEFAULT_TRUE,
         admin: bool = False,
         dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
+        coalesce: bool = False,
     ):
-        super(_CallbackQuery, self).__init__(pattern=pattern, block=block, admin=admin, dispatcher=dispatcher)
+        super(_CallbackQuery, self).__init__(
+            pattern=pattern, block=block, admin=admin, dispatcher=dispatcher, offload=offload, coalesce=coalesce
+        )
 
 
 class _ChatJoinRequest(_Handler):
-    def __init__(self, *, block: DVInput[bool] = DEFAULT_TRUE, dispatcher: Optional[Type["AbstractDispatcher"]] = None):
-        super(_ChatJoinRequest, self).__init__(block=block, dispatcher=dispatcher)
+    def __init__(
+        self,
+        *,
+        block: DVInput[bool] = DEFAULT_TRUE,
+        dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
+    ):
+        super(_ChatJoinRequest, self).__init__(block=block, dispatcher=dispatcher, offload=offload)
 
 
 class _ChatMember(_Handler):
@@ -138,8 +163,9 @@ class _ChatMember(_Handler):
         *,
         block: DVInput[bool] = DEFAULT_TRUE,
         dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
     ):
-        super().__init__(chat_member_types=chat_member_types, block=block, dispatcher=dispatcher)
+        super().__init__(chat_member_types=chat_member_types, block=block, dispatcher=dispatcher, offload=offload)
 
 
 class _ChosenInlineResult(_Handler):
@@ -149,8 +175,9 @@ class _ChosenInlineResult(_Handler):
         *,
         pattern: Union[str, Pattern] = None,
         dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
     ):
-        super().__init__(block=block, pattern=pattern, dispatcher=dispatcher)
+        super().__init__(block=block, pattern=pattern, dispatcher=dispatcher, offload=offload)
 
 
 class _Command(_Handler):
@@ -162,9 +189,10 @@ class _Command(_Handler):
         block: DVInput[bool] = DEFAULT_TRUE,
         admin: bool = False,
         dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
     ):
         super(_Command, self).__init__(
-            command=command, filters=filters, block=block, admin=admin, dispatcher=dispatcher
+            command=command, filters=filters, block=block, admin=admin, dispatcher=dispatcher, offload=offload
         )
 
 
@@ -176,8 +204,11 @@ class _InlineQuery(_Handler):
         *,
         block: DVInput[bool] = DEFAULT_TRUE,
         dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
     ):
-        super(_InlineQuery, self).__init__(pattern=pattern, block=block, chat_types=chat_types, dispatcher=dispatcher)
+        super(_InlineQuery, self).__init__(
+            pattern=pattern, block=block, chat_types=chat_types, dispatcher=dispatcher, offload=offload
+        )
 
 
 class _Message(_Handler):
@@ -188,23 +219,44 @@ class _Message(_Handler):
         block: DVInput[bool] = DEFAULT_TRUE,
         admin: bool = False,
         dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
     ) -> None:
-        super(_Message, self).__init__(filters=filters, block=block, admin=admin, dispatcher=dispatcher)
+        super(_Message, self).__init__(
+            filters=filters, block=block, admin=admin, dispatcher=dispatcher, offload=offload
+        )
 
 
 class _PollAnswer(_Handler):
-    def __init__(self, *, block: DVInput[bool] = DEFAULT_TRUE, dispatcher: Optional[Type["AbstractDispatcher"]] = None):
-        super(_PollAnswer, self).__init__(block=block, dispatcher=dispatcher)
+    def __init__(
+        self,
+        *,
+        block: DVInput[bool] = DEFAULT_TRUE,
+        dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
+    ):
+        super(_PollAnswer, self).__init__(block=block, dispatcher=dispatcher, offload=offload)
 
 
 class _Poll(_Handler):
-    def __init__(self, *, block: DVInput[bool] = DEFAULT_TRUE, dispatcher: Optional[Type["AbstractDispatcher"]] = None):
-        super(_Poll, self).__init__(block=block, dispatcher=dispatcher)
+    def __init__(
+        self,
+        *,
+        block: DVInput[bool] = DEFAULT_TRUE,
+        dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
+    ):
+        super(_Poll, self).__init__(block=block, dispatcher=dispatcher, offload=offload)
 
 
 class _PreCheckoutQuery(_Handler):
-    def __init__(self, *, block: DVInput[bool] = DEFAULT_TRUE, dispatcher: Optional[Type["AbstractDispatcher"]] = None):
-        super(_PreCheckoutQuery, self).__init__(block=block, dispatcher=dispatcher)
+    def __init__(
+        self,
+        *,
+        block: DVInput[bool] = DEFAULT_TRUE,
+        dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
+    ):
+        super(_PreCheckoutQuery, self).__init__(block=block, dispatcher=dispatcher, offload=offload)
 
 
 class _Prefix(_Handler):
@@ -216,15 +268,22 @@ class _Prefix(_Handler):
         *,
         block: DVInput[bool] = DEFAULT_TRUE,
         dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
     ):
         super(_Prefix, self).__init__(
-            prefix=prefix, command=command, filters=filters, block=block, dispatcher=dispatcher
+            prefix=prefix, command=command, filters=filters, block=block, dispatcher=dispatcher, offload=offload
         )
 
 
 class _ShippingQuery(_Handler):
-    def __init__(self, *, block: DVInput[bool] = DEFAULT_TRUE, dispatcher: Optional[Type["AbstractDispatcher"]] = None):
-        super(_ShippingQuery, self).__init__(block=block, dispatcher=dispatcher)
+    def __init__(
+        self,
+        *,
+        block: DVInput[bool] = DEFAULT_TRUE,
+        dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
+    ):
+        super(_ShippingQuery, self).__init__(block=block, dispatcher=dispatcher, offload=offload)
 
 
 class _StringCommand(_Handler):
@@ -235,8 +294,11 @@ class _StringCommand(_Handler):
         admin: bool = False,
         block: DVInput[bool] = DEFAULT_TRUE,
         dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
     ):
-        super(_StringCommand, self).__init__(command=command, block=block, admin=admin, dispatcher=dispatcher)
+        super(_StringCommand, self).__init__(
+            command=command, block=block, admin=admin, dispatcher=dispatcher, offload=offload
+        )
 
 
 class _StringRegex(_Handler):
@@ -247,8 +309,11 @@ class _StringRegex(_Handler):
         block: DVInput[bool] = DEFAULT_TRUE,
         admin: bool = False,
         dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
     ):
-        super(_StringRegex, self).__init__(pattern=pattern, block=block, admin=admin, dispatcher=dispatcher)
+        super(_StringRegex, self).__init__(
+            pattern=pattern, block=block, admin=admin, dispatcher=dispatcher, offload=offload
+        )
 
 
 class _Type(_Handler):
@@ -260,8 +325,9 @@ class _Type(_Handler):
         *,
         block: DVInput[bool] = DEFAULT_TRUE,
         dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
     ):  # pylint: disable=redefined-builtin
-        super(_Type, self).__init__(type=type, strict=strict, block=block, dispatcher=dispatcher)
+        super(_Type, self).__init__(type=type, strict=strict, block=block, dispatcher=dispatcher, offload=offload)
 
 
 # noinspection PyPep8Naming
@@ -288,10 +354,11 @@ class handler(_Handler):
         *,
         admin: bool = False,
         dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
         **kwargs: P.kwargs,
     ) -> None:
         self._type = handler_type
-        super().__init__(admin=admin, dispatcher=dispatcher, **kwargs)
+        super().__init__(admin=admin, dispatcher=dispatcher, offload=offload, **kwargs)
 
 
 class ConversationDataType(Enum):
@@ -11,6 +11,8 @@ from telegram._utils.types import JSONDict
 from telegram.ext._utils.types import JobCallback
 from typing_extensions import ParamSpec
 
+from meido.utils.workers import OffloadType, get_callback_offload
+
 if TYPE_CHECKING:
     from meido.builtins.dispatcher import AbstractDispatcher
 
@@ -35,6 +37,7 @@ class JobData:
     job_kwargs: JSONDict = field(default_factory=dict)
     kwargs: JSONDict = field(default_factory=dict)
     dispatcher: Optional[Type["AbstractDispatcher"]] = None
+    offload: OffloadType = None
 
 
 class _Job:
@@ -49,6 +52,7 @@ class _Job:
         job_kwargs: JSONDict = None,
         *,
         dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
         **kwargs,
     ):
         self.name = name
@@ -63,6 +67,7 @@ class _Job:
             dispatcher = JobDispatcher
 
         self.dispatcher = dispatcher
+        self.offload = get_callback_offload(offload)
 
     def __call__(self, func: JobCallback) -> JobCallback:
         data = JobData(
@@ -74,6 +79,7 @@ class _Job:
             kwargs=self.kwargs,
             type=re.sub(r"([A-Z])", lambda x: "_" + x.group().lower(), self.__class__.__name__).lstrip("_"),
             dispatcher=self.dispatcher,
+            offload=self.offload,
         )
         if hasattr(func, _JOB_ATTR_NAME):
             job_datas = getattr(func, _JOB_ATTR_NAME)
@@ -95,8 +101,9 @@ class _RunOnce(_Job):
         job_kwargs: JSONDict = None,
         *,
         dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
     ):
-        super().__init__(name, data, chat_id, user_id, job_kwargs, dispatcher=dispatcher, when=when)
+        super().__init__(name, data, chat_id, user_id, job_kwargs, dispatcher=dispatcher, offload=offload, when=when)
 
 
 class _RunRepeating(_Job):
@@ -112,9 +119,19 @@ class _RunRepeating(_Job):
         job_kwargs: JSONDict = None,
         *,
         dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
     ):
         super().__init__(
-            name, data, chat_id, user_id, job_kwargs, dispatcher=dispatcher, interval=interval, first=first, last=last
+            name,
+            data,
+            chat_id,
+            user_id,
+            job_kwargs,
+            dispatcher=dispatcher,
+            offload=offload,
+            interval=interval,
+            first=first,
+            last=last,
         )
 
 
@@ -130,8 +147,11 @@ class _RunMonthly(_Job):
         job_kwargs: JSONDict = None,
         *,
         dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
     ):
-        super().__init__(name, data, chat_id, user_id, job_kwargs, dispatcher=dispatcher, when=when, day=day)
+        super().__init__(
+            name, data, chat_id, user_id, job_kwargs, dispatcher=dispatcher, offload=offload, when=when, day=day
+        )
 
 
 class _RunDaily(_Job):
@@ -146,8 +166,11 @@ class _RunDaily(_Job):
         job_kwargs: JSONDict = None,
         *,
         dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
     ):
-        super().__init__(name, data, chat_id, user_id, job_kwargs, dispatcher=dispatcher, time=time, days=days)
+        super().__init__(
+            name, data, chat_id, user_id, job_kwargs, dispatcher=dispatcher, offload=offload, time=time, days=days
+        )
 
 
 class _RunCustom(_Job):
@@ -160,8 +183,9 @@ class _RunCustom(_Job):
         job_kwargs: JSONDict = None,
         *,
         dispatcher: Optional[Type["AbstractDispatcher"]] = None,
+        offload: OffloadType = None,
     ):
-        super().__init__(name, data, chat_id, user_id, job_kwargs, dispatcher=dispatcher)
+        super().__init__(name, data, chat_id, user_id, job_kwargs, dispatcher=dispatcher, offload=offload)
 
 
 # noinspection PyPep8Naming
@@ -6,9 +6,11 @@ from datetime import timedelta
 from functools import partial, wraps
 from itertools import chain
 from multiprocessing import RLock as Lock
+from re import Pattern
 from types import MethodType
 from typing import (
     Any,
+    Callable,
     ClassVar,
     Dict,
     Iterable,
@@ -21,15 +23,26 @@ from typing import (
 )
 
 from pydantic import BaseModel
-from telegram.ext import BaseHandler, ConversationHandler, Job, TypeHandler
+from telegram.ext import (
+    BaseHandler,
+    CallbackQueryHandler,
+    CommandHandler,
+    ConversationHandler,
+    Job,
+    TypeHandler,
+    filters,
+)
 from typing_extensions import ParamSpec
 
 from meido.handler.adminhandler import AdminHandler
+from meido.manifest import manifest
 from meido.plugin._funcs import ConversationFuncs, PluginFuncs
 from meido.plugin._handler import ConversationDataType
+from meido.ratelimiter import background
 from meido.utils.const import WRAPPER_ASSIGNMENTS
 from meido.utils.helpers import isabstract
 from meido.utils.log import logger
+from meido.utils.workers import Offload
 
 if TYPE_CHECKING:
     from meido.application import Application
@@ -58,6 +71,13 @@ _JOB_ATTR_NAME = "_job_data"
 
 _EXCLUDE_ATTRS = ["handlers", "jobs", "error_handlers"]
 
+_JOB_DATA_EXCLUDE_KEYS = ["type", "kwargs", "dispatcher", "offload"]
+
+_METADATA_ATTR_NAMES = (_HANDLER_DATA_ATTR_NAME, _ERROR_HANDLER_ATTR_NAME, _JOB_ATTR_NAME)
+
+_METADATA_ATTRS_CACHE: Dict[type, Dict[str, List[str]]] = {}
+"""插件类中带有各类元数据的方法名"""
+
 
 class _Plugin(PluginFuncs):
     """插件"""
@@ -80,6 +100,76 @@ class _Plugin(PluginFuncs):
             raise RuntimeError("No application was set for this Plugin.")
         return self._application
 
+    @classmethod
+    def _metadata_attrs(cls, name: str) -> List[str]:
+        """带有 name 所指定的元数据的方法名
+
+        结果按类缓存，并记录于启动清单中，以免每次都对实例进行 dir() 扫描
+        """
+        if (attrs := _METADATA_ATTRS_CACHE.get(cls)) is None:
+            if (attrs := manifest.get_attrs(cls)) is None:
+                attrs = {key: [] for key in _METADATA_ATTR_NAMES}
+                for attr in dir(cls):
+                    if attr.startswith("_") or attr in _EXCLUDE_ATTRS or (value := getattr(cls, attr, None)) is None:
+                        continue
+                    for key in _METADATA_ATTR_NAMES:
+                        if getattr(value, key, None):
+                            attrs[key].append(attr)
+                manifest.record_attrs(cls, attrs)
+            _METADATA_ATTRS_CACHE[cls] = attrs
+        return attrs.get(name, [])
+
+    def _lazy_triggers(self) -> Optional[Dict[str, List[Any]]]:
+        """用于延迟加载的触发条件；若插件含有 job、error handler 或无法描述的 handler，则返回 None
+
+        占位 handler 只能匹配命令与 callback query 的正则表达式，
+        因此带有 filters 或 has_args 的命令、以及以函数或类型作为 pattern 的 callback query 均无法延迟加载
+        """
+        if self._metadata_attrs(_JOB_ATTR_NAME) or self._metadata_attrs(_ERROR_HANDLER_ATTR_NAME):
+            return None
+        commands: List[str] = []
+        patterns: List[List[Union[str, int]]] = []
+        for h in self.handlers:
+            if isinstance(h, AdminHandler):
+                h = h.handler
+            if isinstance(h, CommandHandler) and h.filters is filters.UpdateType.MESSAGES and h.has_args is None:
+                commands.extend(h.commands)
+            elif (
+                isinstance(h, CallbackQueryHandler)
+                and isinstance(h.pattern, Pattern)
+                and isinstance(h.pattern.pattern, str)
+            ):
+                patterns.append([h.pattern.pattern, h.pattern.flags])
+            else:
+                return None
+        return {"commands": sorted(commands), "patterns": patterns}
+
+    def _offloaded(self, func: MethodType, offload: Optional[Offload]) -> Callable:
+        """若指定了 offload，使同步的 callback 在工作池中执行
+
+        callback 的调用方式与未指定 offload 时相同：handler 以 ``(update, context)``、job 以 ``(context)`` 调用，
+        不会按类型注解分发参数
+        """
+        if offload is None or asyncio.iscoroutinefunction(func):
+            return func
+
+        @wraps(func)
+        async def callback(*args: Any) -> Any:
+            return await self.application.workers.run(offload, func, *args)
+
+        return callback
+
+    def _handler_callback(self, func: MethodType, data: "HandlerData") -> Callable:
+        """包装 callback 以记录指标；若指定了 offload，则使同步的 callback 在工作池中执行"""
+        callback = self._offloaded(func, data.offload)
+        return self.application.metrics.instrument("handler", self.__class__.__name__, func.__name__, callback)
+
+    def _job_callback(self, func: MethodType, data: "JobData") -> Callable:
+        """包装 callback 以记录指标，并使其中发出的请求以后台任务的优先级发送；
+        若指定了 offload，则使同步的 callback 在工作池中执行"""
+        callback = self._offloaded(func, data.offload)
+        return background(self.application.metrics.instrument("job", self.__class__.__name__, func.__name__, callback))
+
     @property
     def handlers(self) -> List[HandlerType]:
         """该插件的所有 handler"""
@@ -87,11 +177,9 @@ class _Plugin(PluginFuncs):
             if self._handlers is None:
                 self._handlers = []
 
-                for attr in dir(self):
-                    if (
-                        not (attr.startswith("_") or attr in _EXCLUDE_ATTRS)
-                        and isinstance(func := getattr(self, attr), MethodType)
-                        and (datas := getattr(func, _HANDLER_DATA_ATTR_NAME, []))
+                for attr in self._metadata_attrs(_HANDLER_DATA_ATTR_NAME):
+                    if isinstance(func := getattr(self, attr), MethodType) and (
+                        datas := getattr(func, _HANDLER_DATA_ATTR_NAME, [])
                     ):
                         for data in datas:
                             data: "HandlerData"
@@ -99,7 +187,7 @@ class _Plugin(PluginFuncs):
                                 self._handlers.append(
                                     AdminHandler(
                                         handler=data.type(
-                                            callback=func,
+                                            callback=self._handler_callback(func, data),
                                             **data.kwargs,
                                         ),
                                         application=self.application,
@@ -108,7 +196,7 @@ class _Plugin(PluginFuncs):
                             else:
                                 self._handlers.append(
                                     data.type(
-                                        callback=func,
+                                        callback=self._handler_callback(func, data),
                                         **data.kwargs,
                                     )
                                 )
@@ -119,11 +207,9 @@ class _Plugin(PluginFuncs):
         with self._lock:
             if self._error_handlers is None:
                 self._error_handlers = []
-                for attr in dir(self):
-                    if (
-                        not (attr.startswith("_") or attr in _EXCLUDE_ATTRS)
-                        and isinstance(func := getattr(self, attr), MethodType)
-                        and (datas := getattr(func, _ERROR_HANDLER_ATTR_NAME, []))
+                for attr in self._metadata_attrs(_ERROR_HANDLER_ATTR_NAME):
+                    if isinstance(func := getattr(self, attr), MethodType) and (
+                        datas := getattr(func, _ERROR_HANDLER_ATTR_NAME, [])
                     ):
                         for data in datas:
                             data: "ErrorHandlerData"
@@ -135,24 +221,16 @@ class _Plugin(PluginFuncs):
     def _install_jobs(self) -> None:
         if self._jobs is None:
             self._jobs = []
-        for attr in dir(self):
+        for attr in self._metadata_attrs(_JOB_ATTR_NAME):
             # noinspection PyUnboundLocalVariable
-            if (
-                not (attr.startswith("_") or attr in _EXCLUDE_ATTRS)
-                and isinstance(func := getattr(self, attr), MethodType)
-                and (datas := getattr(func, _JOB_ATTR_NAME, []))
-            ):
+            if isinstance(func := getattr(self, attr), MethodType) and (datas := getattr(func, _JOB_ATTR_NAME, [])):
                 for data in datas:
                     data: "JobData"
                     self._jobs.append(
                         getattr(self.application.telegram.job_queue, data.type)(
-                            callback=func,
+                            callback=self._job_callback(func, data),
                             **data.kwargs,
-                            **{
-                                key: value
-                                for key, value in asdict(data).items()
-                                if key not in ["type", "kwargs", "dispatcher"]
-                            },
+                            **{key: value for key, value in asdict(data).items() if key not in _JOB_DATA_EXCLUDE_KEYS},
                         )
                     )
 
@@ -179,11 +257,16 @@ class _Plugin(PluginFuncs):
             async with self._asyncio_lock:
                 self._install_jobs()
 
+                routed = []
                 for h in self.handlers:
-                    if not isinstance(h, TypeHandler):
-                        self.application.telegram.add_handler(h, group)
-                    else:
+                    if isinstance(h, TypeHandler):
                         self.application.telegram.add_handler(h, -1)
+                    elif self.application.router is not None:
+                        routed.append(h)
+                    else:
+                        self.application.telegram.add_handler(h, group)
+                if routed:
+                    self.application.router.add_handlers(group, routed)
 
                 for h in self.error_handlers:
                     self.application.telegram.add_error_handler(h.func, h.block)
@@ -197,6 +280,8 @@ class _Plugin(PluginFuncs):
             if self._installed:
                 if group in self.application.telegram.handlers:
                     del self.application.telegram.handlers[id(self)]
+                if self.application.router is not None:
+                    self.application.router.remove_group(group)
 
                 for h in self.handlers:
                     if isinstance(h, TypeHandler):
@@ -204,8 +289,9 @@ class _Plugin(PluginFuncs):
                 for h in self.error_handlers:
                     self.application.telegram.remove_error_handler(h.func)
 
-                for j in self.application.telegram.job_queue.jobs():
+                for j in self._jobs or []:
                     j.schedule_removal()
+                self._jobs = None
                 await self.shutdown()
                 self._installed = False
 
@@ -242,11 +328,9 @@ class _Conversation(_Plugin, ConversationFuncs, ABC):
                 entry_points: List[HandlerType] = []
                 states: Dict[Any, List[HandlerType]] = {}
                 fallbacks: List[HandlerType] = []
-                for attr in dir(self):
-                    if (
-                        not (attr.startswith("_") or attr in _EXCLUDE_ATTRS)
-                        and (func := getattr(self, attr, None)) is not None
-                        and (datas := getattr(func, _HANDLER_DATA_ATTR_NAME, []))
+                for attr in self._metadata_attrs(_HANDLER_DATA_ATTR_NAME):
+                    if (func := getattr(self, attr, None)) is not None and (
+                        datas := getattr(func, _HANDLER_DATA_ATTR_NAME, [])
                     ):
                         conversation_data: "ConversationData"
 
@@ -256,7 +340,7 @@ class _Conversation(_Plugin, ConversationFuncs, ABC):
                                 handlers.append(
                                     AdminHandler(
                                         handler=data.type(
-                                            callback=func,
+                                            callback=self._handler_callback(func, data),
                                             **data.kwargs,
                                         ),
                                         application=self.application,
@@ -265,7 +349,7 @@ class _Conversation(_Plugin, ConversationFuncs, ABC):
                             else:
                                 handlers.append(
                                     data.type(
-                                        callback=func,
+                                        callback=self._handler_callback(func, data),
                                         **data.kwargs,
                                     )
                                 )
@@ -296,6 +380,9 @@ class _Conversation(_Plugin, ConversationFuncs, ABC):
                     )
         return self._handlers
 
+    def _lazy_triggers(self) -> Optional[Dict[str, List[str]]]:
+        return None
+
 
 class Plugin(_Plugin, ABC):
     """插件"""
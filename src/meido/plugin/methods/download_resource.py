@@ -4,10 +4,10 @@ import aiofiles
 import httpx
 from httpx import UnsupportedProtocol
 
-from utils.const import CACHE_DIR, REQUEST_HEADERS
-from utils.error import UrlResourcesNotFoundError
-from utils.helpers import sha1
-from utils.log import logger
+from meido.utils.const import CACHE_DIR, REQUEST_HEADERS
+from meido.error import UrlResourcesNotFoundError
+from meido.utils.helpers import sha1
+from meido.utils.log import logger
 
 
 class DownloadResource:
@@ -3,15 +3,11 @@ from typing import Union, Optional, TYPE_CHECKING
 from telegram import Chat
 
 from meido.dependence.redis import Redis
+from meido.utils import jsonlib
 
 if TYPE_CHECKING:
     from . import PluginFuncMethods
 
-try:
-    import ujson as jsonlib
-except ImportError:
-    import json as jsonlib
-
 
 class GetChat:
     async def get_chat(
@@ -34,5 +30,5 @@ class GetChat:
             return Chat.de_json(json_data, application.telegram.bot)
 
         chat_info = await application.telegram.bot.get_chat(chat_id)
-        await redis_db.client.set(qname, chat_info.to_json(), ex=expire)
+        await redis_db.client.set(qname, jsonlib.dumps_bytes(chat_info.to_dict()), ex=expire)
         return chat_info
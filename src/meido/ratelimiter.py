@@ -1,27 +1,245 @@
 """This module contains an implementation of the BaseRateLimiter"""
 import asyncio
 import contextlib
-from typing import Callable, Coroutine, Any, Union, List, Dict, Optional, Type
+from contextvars import ContextVar
+from enum import IntEnum
+from functools import wraps
+from heapq import heappop, heappush
+from itertools import count
+from typing import Callable, Coroutine, Any, Union, List, Dict, Optional, Set, Tuple, Type, TypeVar
 
 from telegram.error import RetryAfter
-from telegram.ext import BaseRateLimiter, ApplicationHandlerStop
+from telegram.ext import BaseRateLimiter
 
 from meido.utils.log import logger
 
+__all__ = ("Priority", "RateLimiter", "background")
+
 JSONDict: Type[dict[str, Any]] = Dict[str, Any]
+T = TypeVar("T")
+
+
+class Priority(IntEnum):
+    """请求的优先级，数值越小越先发送"""
+
+    REPLY = 0
+    """回复用户的请求"""
+    BACKGROUND = 10
+    """后台任务（例如定时任务的通知）的请求"""
+
+
+_priority: ContextVar[Priority] = ContextVar("_priority", default=Priority.REPLY)
+
+
+def background(func: Callable[..., Coroutine[Any, Any, T]]) -> Callable[..., Coroutine[Any, Any, T]]:
+    """使 func 中发出的请求以 :attr:`Priority.BACKGROUND` 的优先级发送"""
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs) -> T:
+        token = _priority.set(Priority.BACKGROUND)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _priority.reset(token)
+
+    return wrapper
+
+
+class _Bucket:
+    """以 GCRA 实现的令牌桶
+
+    :param rate: 每秒发放的令牌数
+    :param burst: 令牌桶的容量
+    """
+
+    __slots__ = ("interval", "tolerance", "tat")
+
+    def __init__(self, rate: float, burst: int):
+        self.interval = 1 / rate
+        self.tolerance = self.interval * (burst - 1)
+        self.tat = 0.0
+        """理论到达时间"""
+
+    def delay(self, now: float) -> float:
+        """距离下一个令牌可用的时间"""
+        return max(self.tat - self.tolerance - now, 0.0)
+
+    def consume(self, now: float) -> None:
+        self.tat = max(self.tat, now) + self.interval
+
+    def reserve(self, now: float) -> float:
+        """预留一个令牌，返回需要等待的时间"""
+        delay = self.delay(now)
+        self.tat = max(self.tat, now + delay) + self.interval
+        return delay
+
+
+class _PendingEdit:
+    """尚未发送的编辑消息的请求，只保留最后一次编辑的参数"""
+
+    __slots__ = ("callback", "args", "kwargs", "task")
+
+    def __init__(self, callback: Callable[..., Coroutine], args: Any, kwargs: Dict[str, Any]):
+        self.callback = callback
+        self.args = args
+        self.kwargs = kwargs
+        self.task: Optional[asyncio.Task] = None
 
 
 class RateLimiter(BaseRateLimiter[int]):
-    _lock = asyncio.Lock()
+    """在发送请求前主动限流，而不是等到服务器返回 RetryAfter
+
+    发送消息的请求（send*、copyMessage、forwardMessage 等）需要先取得所属 chat 的令牌（私聊与群组分别限流），
+    所有请求都需要按优先级取得全局的令牌，getChat、sendChatAction 等其他请求不受 chat 的限制。
+    全局令牌不足时请求进入优先队列，回复用户的请求先于后台任务的请求发送。
+    优先级默认取自 :func:`background` 设置的上下文，也可以通过 ``rate_limit_args`` 显式指定。
+
+    服务器返回 RetryAfter 时只推迟对应 chat 的所有请求，不影响其他 chat；请求不属于任何 chat 时才推迟全局的令牌桶。
+    推迟的记录在限制时间过去后与空闲的令牌桶一同被清理。
+
+    对同一条消息的编辑请求会被合并：同一条消息的两次编辑之间至少间隔 edit_window 秒，
+    等待间隔或令牌期间收到的新的编辑会替换尚未发送的编辑，被替换的调用者得到最后一次编辑的结果。
+    编辑由限流器持有的任务发送，调用者被取消不会影响其他调用者与最后一次编辑的发送。
+
+    :param overall_rate: 全局每秒最多发送的请求数
+    :param private_rate: 每个私聊每秒最多发送的请求数
+    :param group_rate: 每个群组、频道每秒最多发送的请求数
+    :param group_burst: 群组、频道最多允许连续发送的请求数
+    :param max_retries: 服务器返回 RetryAfter 后最多重试的次数
+    :param edit_window: 同一条消息的两次编辑之间至少间隔的时间（秒），期间对该消息的编辑会被合并
+    """
+
     __slots__ = (
-        "_limiter_info",
-        "_retry_after_event",
+        "_overall",
+        "_private_rate",
+        "_group_rate",
+        "_group_burst",
+        "_chats",
+        "_retry_until",
+        "_next_sweep",
+        "_waiters",
+        "_counter",
+        "_dispatcher",
+        "_max_retries",
+        "_edit_window",
+        "_edits",
+        "_edit_tasks",
+        "_edit_until",
+    )
+
+    _unlimited_endpoints = frozenset({"getUpdates", "getMe", "setWebhook", "deleteWebhook"})
+    _edit_endpoints = frozenset({"editMessageText", "editMessageCaption", "editMessageMedia", "editMessageReplyMarkup"})
+    _message_endpoints = frozenset(
+        {
+            "sendMessage",
+            "sendPhoto",
+            "sendAudio",
+            "sendDocument",
+            "sendVideo",
+            "sendAnimation",
+            "sendVoice",
+            "sendVideoNote",
+            "sendMediaGroup",
+            "sendLocation",
+            "sendVenue",
+            "sendContact",
+            "sendPoll",
+            "sendDice",
+            "sendSticker",
+            "sendInvoice",
+            "sendGame",
+            "copyMessage",
+            "copyMessages",
+            "forwardMessage",
+            "forwardMessages",
+        }
     )
+    """会在 chat 中产生新消息的请求，只有这些请求受 chat 的限流"""
+    _sweep_interval = 60
+
+    def __init__(
+        self,
+        overall_rate: float = 30,
+        private_rate: float = 1,
+        group_rate: float = 20 / 60,
+        group_burst: int = 20,
+        max_retries: int = 1,
+        edit_window: float = 1.0,
+    ):
+        self._overall = _Bucket(overall_rate, max(int(overall_rate), 1))
+        self._private_rate = private_rate
+        self._group_rate = group_rate
+        self._group_burst = group_burst
+        self._chats: Dict[Union[str, int], _Bucket] = {}
+        self._retry_until: Dict[Union[str, int], float] = {}
+        self._next_sweep = 0.0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = count()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._max_retries = max_retries
+        self._edit_window = edit_window
+        self._edits: Dict[Tuple[str, Any, Any], _PendingEdit] = {}
+        self._edit_tasks: Set[asyncio.Task] = set()
+        self._edit_until: Dict[Tuple[str, Any, Any], float] = {}
+        """每条消息下一次编辑最早的发送时间"""
+
+    def _sweep(self, now: float) -> None:
+        if now >= self._next_sweep:
+            self._next_sweep = now + self._sweep_interval
+            for key in [key for key, bucket in self._chats.items() if bucket.tat <= now]:
+                del self._chats[key]
+            for key in [key for key, until in self._retry_until.items() if until <= now]:
+                del self._retry_until[key]
+            for key in [key for key, until in self._edit_until.items() if until <= now]:
+                del self._edit_until[key]
+
+    def _chat_bucket(self, chat_id: Union[str, int], now: float) -> _Bucket:
+        if (bucket := self._chats.get(chat_id)) is None:
+            if isinstance(chat_id, int) and chat_id > 0:
+                bucket = _Bucket(self._private_rate, 1)
+            else:
+                bucket = _Bucket(self._group_rate, self._group_burst)
+            self._chats[chat_id] = bucket
+        return bucket
 
-    def __init__(self):
-        self._limiter_info: Dict[Union[str, int], float] = {}
-        self._retry_after_event = asyncio.Event()
-        self._retry_after_event.set()
+    async def _dispatch(self) -> None:
+        """按优先级依次为等待中的请求发放全局令牌"""
+        loop = asyncio.get_running_loop()
+        while self._waiters:
+            if (delay := self._overall.delay(loop.time())) > 0:
+                await asyncio.sleep(delay)
+                continue
+            _, _, future = heappop(self._waiters)
+            if not future.done():
+                self._overall.consume(loop.time())
+                future.set_result(None)
+
+    async def _acquire(self, chat_id: Optional[Union[str, int]], priority: int, per_chat: bool) -> None:
+        loop = asyncio.get_running_loop()
+        if chat_id is not None:
+            now = loop.time()
+            self._sweep(now)
+            delay = self._chat_bucket(chat_id, now).reserve(now) if per_chat else 0.0
+            if (until := self._retry_until.get(chat_id)) is not None:
+                delay = max(delay, until - now)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        if not self._waiters and self._overall.delay(loop.time()) == 0:
+            self._overall.consume(loop.time())
+            return
+        future = loop.create_future()
+        heappush(self._waiters, (priority, next(self._counter), future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    def _back_off(self, chat_id: Optional[Union[str, int]], retry_after: float) -> None:
+        """服务器返回 RetryAfter 后，推迟对应 chat 的请求；请求不属于任何 chat 时推迟全局的令牌桶"""
+        now = asyncio.get_running_loop().time()
+        if chat_id is None:
+            self._overall.tat = max(self._overall.tat, now + retry_after + self._overall.tolerance)
+        else:
+            self._retry_until[chat_id] = max(self._retry_until.get(chat_id, 0.0), now + retry_after)
 
     async def process_request(
         self,
@@ -32,36 +250,92 @@ class RateLimiter(BaseRateLimiter[int]):
         data: Dict[str, Any],
         rate_limit_args: Optional[int],
     ) -> Union[bool, JSONDict, List[JSONDict]]:
+        if endpoint in self._unlimited_endpoints:
+            return await callback(*args, **kwargs)
+
         chat_id = data.get("chat_id")
 
         with contextlib.suppress(ValueError, TypeError):
             chat_id = int(chat_id)
 
-        loop = asyncio.get_running_loop()
-        time = loop.time()
+        priority = _priority.get() if rate_limit_args is None else rate_limit_args
+        if endpoint in self._edit_endpoints:
+            if (message_id := data.get("message_id", data.get("inline_message_id"))) is not None:
+                return await self._coalesce((endpoint, chat_id, message_id), callback, args, kwargs, priority)
+        return await self._send(
+            lambda: callback(*args, **kwargs), chat_id, priority, endpoint in self._message_endpoints
+        )
 
-        await self._retry_after_event.wait()
+    async def _send(
+        self,
+        call: Callable[[], Coroutine[Any, Any, Union[bool, JSONDict, List[JSONDict]]]],
+        chat_id: Optional[Union[str, int]],
+        priority: int,
+        per_chat: bool,
+    ) -> Union[bool, JSONDict, List[JSONDict]]:
+        for retries in count():
+            await self._acquire(chat_id, priority, per_chat)
+            try:
+                return await call()
+            except RetryAfter as exc:
+                logger.warning("chat_id[%s] 触发洪水限制 当前被服务器限制 retry_after[%s]秒", chat_id, exc.retry_after)
+                self._back_off(chat_id, exc.retry_after)
+                if retries >= self._max_retries:
+                    raise
+
+    async def _coalesce(
+        self,
+        key: Tuple[str, Any, Any],
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, JSONDict, List[JSONDict]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        priority: int,
+    ) -> Union[bool, JSONDict, List[JSONDict]]:
+        """合并对同一条消息的编辑，只发送最后一次编辑"""
+        if (pending := self._edits.get(key)) is None:
+            pending = self._edits[key] = _PendingEdit(callback, args, kwargs)
+            pending.task = asyncio.create_task(self._send_edit(key, pending, priority))
+            self._edit_tasks.add(pending.task)
+            pending.task.add_done_callback(self._edit_done)
+        else:
+            pending.callback, pending.args, pending.kwargs = callback, args, kwargs
+        return await asyncio.shield(pending.task)
+
+    async def _send_edit(
+        self, key: Tuple[str, Any, Any], pending: _PendingEdit, priority: int
+    ) -> Union[bool, JSONDict, List[JSONDict]]:
+        loop = asyncio.get_running_loop()
 
-        async with self._lock:
-            chat_limit_time = self._limiter_info.get(chat_id)
-            if chat_limit_time:
-                if time >= chat_limit_time:
-                    raise ApplicationHandlerStop
-                del self._limiter_info[chat_id]
+        def call() -> Coroutine[Any, Any, Union[bool, JSONDict, List[JSONDict]]]:
+            if self._edits.get(key) is pending:
+                del self._edits[key]  # 开始发送后，新的编辑不再合并至该请求
+            self._edit_until[key] = loop.time() + self._edit_window
+            return pending.callback(*pending.args, **pending.kwargs)
 
         try:
-            return await callback(*args, **kwargs)
-        except RetryAfter as exc:
-            logger.warning("chat_id[%s] 触发洪水限制 当前被服务器限制 retry_after[%s]秒", chat_id, exc.retry_after)
-            self._limiter_info[chat_id] = time + (exc.retry_after * 2)
-            sleep = exc.retry_after + 0.1
-            self._retry_after_event.clear()
-            await asyncio.sleep(sleep)
+            if (delay := self._edit_until.get(key, 0.0) - loop.time()) > 0:
+                await asyncio.sleep(delay)
+            return await self._send(call, key[1], priority, False)
         finally:
-            self._retry_after_event.set()
+            if self._edits.get(key) is pending:
+                del self._edits[key]
+
+    def _edit_done(self, task: asyncio.Task) -> None:
+        self._edit_tasks.discard(task)
+        if not task.cancelled():
+            task.exception()  # 所有调用者都已被取消时避免 "exception was never retrieved"
 
     async def initialize(self) -> None:
         pass
 
     async def shutdown(self) -> None:
-        pass
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._dispatcher
+        for _, _, future in self._waiters:
+            future.cancel()
+        self._waiters.clear()
+        for task in list(self._edit_tasks):
+            task.cancel()
+        self._edits.clear()
@@ -4,7 +4,7 @@ from meido.base_service import BaseService
 from meido.basemodel import RegionEnum
 from meido.dependence.redis import Redis
 from meido.services.cookies.error import CookiesCachePoolExhausted
-from utils.error import RegionNotFoundError
+from meido.utils.error import RegionNotFoundError
 
 __all__ = ("PublicCookiesCache",)
 
@@ -7,7 +7,7 @@ from meido.services.cookies.error import TooManyRequestPublicCookies
 from meido.services.cookies.models import CookiesDataBase as Cookies, CookiesStatusEnum
 from meido.services.cookies.repositories import CookiesRepository
 from meido.services.devices.repositories import DevicesRepository
-from utils.log import logger
+from meido.utils.log import logger
 
 __all__ = ("CookiesService", "PublicCookiesService", "NeedContinue")
 
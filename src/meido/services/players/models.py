@@ -6,11 +6,7 @@ from sqlalchemy import TypeDecorator
 from sqlmodel import Boolean, Column, Enum, Field, SQLModel, Integer, Index, BigInteger, VARCHAR, func, DateTime
 
 from meido.basemodel import RegionEnum
-
-try:
-    import ujson as jsonlib
-except ImportError:
-    import json as jsonlib
+from meido.utils import jsonlib
 
 __all__ = ("Player", "PlayersDataBase", "PlayerInfo", "PlayerInfoSQLModel")
 
@@ -16,8 +16,8 @@ from meido.dependence.aiobrowser import AioBrowser
 from meido.services.template.cache import HtmlToFileIdCache, TemplatePreviewCache
 from meido.services.template.error import QuerySelectorNotFound
 from meido.services.template.models import FileType, RenderResult
-from utils.const import PROJECT_ROOT
-from utils.log import logger
+from meido.utils.const import PROJECT_ROOT
+from meido.utils.log import logger
 
 __all__ = ("TemplateService", "TemplatePreviewer")
 
@@ -1,24 +1,96 @@
-from typing import List
+import asyncio
+import contextlib
+from time import monotonic
+from typing import FrozenSet, List, Optional
 
 from meido.base_service import BaseService
 from meido.dependence.redis import Redis
+from meido.utils.aioredis import RedisConnectionError, RedisTimeoutError
+from meido.utils.log import logger
 
 __all__ = ("UserAdminCache",)
 
 
 class UserAdminCache(BaseService.Component):
+    """管理员列表的缓存
+
+    本地保存一份带有版本号的管理员列表快照，判断是否为管理员时无需访问 Redis。
+    管理员发生变化时版本号加一并通过 Redis pub/sub 通知所有进程刷新快照；
+    快照超过 max_staleness 秒未与 Redis 核对时（例如订阅断开），会在下次判断前重新获取。
+    """
+
     def __init__(self, redis: Redis):
         self.client = redis.client
         self.qname = "users:admin"
+        self.version_key = "users:admin:version"
+        self.channel = "users:admin:changed"
+        self.max_staleness = 60
+        self._snapshot: Optional[FrozenSet[int]] = None
+        self._version = 0
+        self._checked_at = 0.0
+        self._listener: Optional[asyncio.Task] = None
+
+    async def refresh(self) -> None:
+        """重新获取管理员列表快照"""
+        async with self.client.pipeline(transaction=True) as pipe:
+            members, version = await pipe.smembers(self.qname).get(self.version_key).execute()
+        self._snapshot = frozenset(int(i) for i in members)
+        self._version = int(version or 0)
+        self._checked_at = monotonic()
+
+    async def _check_version(self) -> None:
+        if self._snapshot is None or int(await self.client.get(self.version_key) or 0) != self._version:
+            await self.refresh()
+        else:
+            self._checked_at = monotonic()
+
+    async def _listen(self) -> None:
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(self.channel)
+            while True:
+                try:
+                    message = await pubsub.get_message(timeout=self.max_staleness / 2)
+                    if message is None or int(message["data"]) != self._version:
+                        await self._check_version()
+                except (RedisConnectionError, RedisTimeoutError, ValueError) as exc:
+                    logger.warning("管理员列表订阅出现错误：%s", exc)
+                    await asyncio.sleep(1)
+        finally:
+            with contextlib.suppress(Exception):
+                await pubsub.aclose()
+
+    async def start_listening(self) -> None:
+        await self.refresh()
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop_listening(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+
+    async def _changed(self) -> None:
+        self._snapshot = None
+        version = await self.client.incr(self.version_key)
+        await self.client.publish(self.channel, version)
 
     async def ismember(self, user_id: int) -> bool:
-        return await self.client.sismember(self.qname, user_id)
+        if self._snapshot is None or monotonic() - self._checked_at > self.max_staleness:
+            await self.refresh()
+        return user_id in self._snapshot
 
     async def get_all(self) -> List[int]:
         return [int(str_data) for str_data in await self.client.smembers(self.qname)]
 
     async def set(self, user_id: int) -> bool:
-        return await self.client.sadd(self.qname, user_id)
+        if result := await self.client.sadd(self.qname, user_id):
+            await self._changed()
+        return result
 
     async def remove(self, user_id: int) -> bool:
-        return await self.client.srem(self.qname, user_id)
+        if result := await self.client.srem(self.qname, user_id):
+            await self._changed()
+        return result
@@ -8,7 +8,7 @@ from meido.services.users.repositories import UserRepository
 
 __all__ = ("UserService", "UserAdminService")
 
-from utils.log import logger
+from meido.utils.log import logger
 
 
 class UserService(BaseService):
@@ -52,6 +52,10 @@ class UserAdminService(BaseService):
         users = await self.user_repository.get_all()
         for user in users:
             await self._cache.set(user.user_id)
+        await self._cache.start_listening()
+
+    async def shutdown(self):
+        await self._cache.stop_listening()
 
     async def is_admin(self, user_id: int) -> bool:
         return await self._cache.ismember(user_id)
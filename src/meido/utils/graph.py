@@ -0,0 +1,92 @@
+"""依据 __init__ 的类型注解构建的依赖图"""
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Type, get_type_hints
+
+from meido.error import DependencyCycleError
+
+__all__ = ("get_init_dependencies", "DependencyGraph")
+
+
+def get_init_dependencies(target: Type, candidates: Iterable[Type]) -> Set[Type]:
+    """获取 target 的 __init__ 中以类型注解声明、且位于 candidates 中的依赖
+
+    与 BaseDispatcher 的解析方式一致：注解为某个类型时，其子类也视为满足该依赖
+    """
+    if hasattr(target, "from_config"):  # 使用 from_config 实例化的服务不依赖其他服务
+        return set()
+    try:
+        hints: Dict[str, Any] = get_type_hints(target.__init__)
+    except Exception:  # pylint: disable=W0703
+        hints = getattr(target.__init__, "__annotations__", {})
+    annotations = [i for key, i in hints.items() if key != "return" and isinstance(i, type) and i is not object]
+    return {
+        candidate
+        for candidate in candidates
+        if candidate is not target and any(issubclass(candidate, annotation) for annotation in annotations)
+    }
+
+
+class DependencyGraph:
+    """以类型为节点的依赖图
+
+    Args:
+        dependencies (Dict[Type, Iterable[Type]]): 每个节点及其所依赖的节点，不在图中的依赖会被忽略
+    """
+
+    def __init__(self, dependencies: Dict[Type, Iterable[Type]]):
+        self.nodes: List[Type] = list(dependencies)
+        self.edges: Dict[Type, Set[Type]] = {
+            node: {i for i in deps if i in dependencies and i is not node} for node, deps in dependencies.items()
+        }
+
+    @classmethod
+    def from_init(cls, targets: Iterable[Type], provided: Iterable[Type] = ()) -> "DependencyGraph":
+        """依据 __init__ 的类型注解构建依赖图，provided 中的类型视为已经就绪"""
+        targets = list(targets)
+        provided = set(provided)
+        return cls({target: get_init_dependencies(target, targets) - provided for target in targets})
+
+    def find_cycle(self) -> Optional[List[Type]]:
+        """查找图中的一个环，返回首尾相同的路径"""
+        visited: Set[Type] = set()
+        stack: List[Type] = []
+        on_stack: Set[Type] = set()
+
+        def visit(node: Type) -> Optional[List[Type]]:
+            visited.add(node)
+            stack.append(node)
+            on_stack.add(node)
+            for dependency in self.edges[node]:
+                if dependency in on_stack:
+                    return stack[stack.index(dependency) :] + [dependency]
+                if dependency not in visited and (cycle := visit(dependency)) is not None:
+                    return cycle
+            stack.pop()
+            on_stack.discard(node)
+            return None
+
+        for node in self.nodes:
+            if node not in visited and (result := visit(node)) is not None:
+                return result
+        return None
+
+    def partial_levels(self) -> Tuple[List[List[Type]], List[Type]]:
+        """按拓扑顺序分层，同一层中的节点互不依赖；返回分层结果，以及位于环中或依赖于环的无法分层的节点"""
+        remaining = {node: set(edges) for node, edges in self.edges.items()}
+        levels: List[List[Type]] = []
+        while remaining:
+            level = [node for node in self.nodes if node in remaining and not remaining[node]]
+            if not level:
+                break
+            for node in level:
+                del remaining[node]
+            for edges in remaining.values():
+                edges.difference_update(level)
+            levels.append(level)
+        return levels, [node for node in self.nodes if node in remaining]
+
+    def levels(self) -> List[List[Type]]:
+        """按拓扑顺序分层，同一层中的节点互不依赖；若存在环则抛出 DependencyCycleError"""
+        levels, blocked = self.partial_levels()
+        if blocked:
+            raise DependencyCycleError(self.find_cycle() or blocked)
+        return levels
@@ -0,0 +1,69 @@
+"""JSON 编解码
+
+按 orjson、msgspec、ujson、json 的顺序使用第一个已安装的库。
+loads 可以直接解析 bytes，无需先解码为 str；dumps 在传入 indent 等额外参数时使用标准库 json。
+"""
+import json
+from typing import Any, Callable, Optional, Union
+
+__all__ = ("backend", "loads", "dumps", "dumps_bytes")
+
+Default = Optional[Callable[[Any], Any]]
+
+try:
+    import orjson
+
+    backend = "orjson"
+
+    def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+        return orjson.loads(data)
+
+    def dumps_bytes(obj: Any, *, default: Default = None) -> bytes:
+        return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS)
+
+except ImportError:
+    try:
+        import msgspec
+
+        backend = "msgspec"
+        _decoder = msgspec.json.Decoder()
+        _encoder = msgspec.json.Encoder()
+
+        def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+            try:
+                return _decoder.decode(data)
+            except msgspec.DecodeError as exc:
+                raise ValueError(str(exc)) from exc
+
+        def dumps_bytes(obj: Any, *, default: Default = None) -> bytes:
+            if default is None:
+                return _encoder.encode(obj)
+            return msgspec.json.encode(obj, enc_hook=default)
+
+    except ImportError:
+        try:
+            import ujson
+
+            backend = "ujson"
+
+            def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+                return ujson.loads(bytes(data) if isinstance(data, (bytearray, memoryview)) else data)
+
+            def dumps_bytes(obj: Any, *, default: Default = None) -> bytes:
+                return ujson.dumps(obj, ensure_ascii=False, default=default).encode()
+
+        except ImportError:
+            backend = "json"
+
+            def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+                return json.loads(bytes(data) if isinstance(data, (bytearray, memoryview)) else data)
+
+            def dumps_bytes(obj: Any, *, default: Default = None) -> bytes:
+                return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=default).encode()
+
+
+def dumps(obj: Any, *, default: Default = None, **kwargs: Any) -> str:
+    """序列化为 str；传入 indent 等额外参数时使用标准库 json"""
+    if kwargs:
+        return json.dumps(obj, default=default, **kwargs)
+    return dumps_bytes(obj, default=default).decode()
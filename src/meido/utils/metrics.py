@@ -0,0 +1,133 @@
+"""调用次数、错误次数与耗时的统计，以 Prometheus 文本格式导出"""
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Tuple, TypeVar
+
+from telegram.ext import ApplicationHandlerStop
+
+__all__ = ("DEFAULT_BUCKETS", "CallMetrics", "MetricsRegistry")
+
+R = TypeVar("R")
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+"""耗时直方图的默认分桶（秒）"""
+
+Labels = Tuple[Tuple[str, str], ...]
+Samples = Iterable[Tuple[Dict[str, str], float]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    if not (text := ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels)):
+        return ""
+    return "{" + text + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class CallMetrics:
+    """单个 callback 的统计数据，分桶计数在创建时预先分配"""
+
+    __slots__ = ("labels", "buckets", "counts", "calls", "errors", "total")
+
+    def __init__(self, labels: Labels, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.labels = labels
+        self.buckets = buckets
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+
+    def observe(self, elapsed: float, error: bool = False) -> None:
+        """记录一次调用"""
+        self.calls += 1
+        if error:
+            self.errors += 1
+        self.total += elapsed
+        self.counts[bisect_left(self.buckets, elapsed)] += 1
+
+
+class MetricsRegistry:
+    """handler 与 job 的统计数据
+
+    Args:
+        prefix (str): 导出的指标名称前缀
+        buckets (Tuple[float, ...]): 耗时直方图的分桶（秒）
+    """
+
+    def __init__(self, prefix: str = "meido", buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(sorted(buckets))
+        self._metrics: Dict[Labels, CallMetrics] = {}
+        self._collectors: List[Tuple[str, str, str, Callable[[], Samples]]] = []
+
+    def get(self, kind: str, plugin: str, callback: str) -> CallMetrics:
+        """获取（或创建）某个 callback 的统计数据"""
+        labels = (("kind", kind), ("plugin", plugin), ("callback", callback))
+        if (metrics := self._metrics.get(labels)) is None:
+            metrics = self._metrics[labels] = CallMetrics(labels, self.buckets)
+        return metrics
+
+    def instrument(
+        self, kind: str, plugin: str, callback: str, func: Callable[..., Awaitable[R]]
+    ) -> Callable[..., Awaitable[R]]:
+        """包装异步的 callback，记录其调用次数、错误次数与耗时"""
+        metrics = self.get(kind, plugin, callback)
+
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> R:
+            start = perf_counter()
+            error = False
+            try:
+                return await func(*args, **kwargs)
+            except ApplicationHandlerStop:
+                raise
+            except BaseException:
+                error = True
+                raise
+            finally:
+                metrics.observe(perf_counter() - start, error)
+
+        return wrapper
+
+    def add_collector(
+        self, name: str, documentation: str, collect: Callable[[], Samples], metric_type: str = "gauge"
+    ) -> None:
+        """添加在导出时才采集的指标，collect 返回 (labels, value) 的序列"""
+        self._collectors.append((f"{self.prefix}_{name}", documentation, metric_type, collect))
+
+    def render(self) -> str:
+        """以 Prometheus 文本格式导出所有指标"""
+        lines: List[str] = []
+        metrics = list(self._metrics.values())
+        calls, errors, duration = (f"{self.prefix}_{i}" for i in ("calls_total", "errors_total", "duration_seconds"))
+
+        lines.append(f"# HELP {calls} Number of callback calls.")
+        lines.append(f"# TYPE {calls} counter")
+        lines.extend(f"{calls}{_format_labels(m.labels)} {m.calls}" for m in metrics)
+        lines.append(f"# HELP {errors} Number of callback calls that raised an exception.")
+        lines.append(f"# TYPE {errors} counter")
+        lines.extend(f"{errors}{_format_labels(m.labels)} {m.errors}" for m in metrics)
+        lines.append(f"# HELP {duration} Callback latency in seconds.")
+        lines.append(f"# TYPE {duration} histogram")
+        for m in metrics:
+            cumulative = 0
+            for bound, count in zip((*map(repr, m.buckets), "+Inf"), m.counts):
+                cumulative += count
+                lines.append(f"{duration}_bucket{_format_labels((*m.labels, ('le', bound)))} {cumulative}")
+            lines.append(f"{duration}_sum{_format_labels(m.labels)} {m.total!r}")
+            lines.append(f"{duration}_count{_format_labels(m.labels)} {m.calls}")
+
+        for name, documentation, metric_type, collect in self._collectors:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(
+                f"{name}{_format_labels(labels.items())} {_format_value(value)}" for labels, value in collect()
+            )
+        return "\n".join(lines) + "\n"
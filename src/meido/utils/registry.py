@@ -0,0 +1,71 @@
+"""以类型为键的实例注册表"""
+from typing import Any, Dict, Generic, Iterator, Optional, Type, TypeVar
+
+__all__ = ("TypeRegistry",)
+
+T = TypeVar("T")
+
+_MISSING = object()
+
+
+class TypeRegistry(Generic[T]):
+    """以类型为键的实例注册表
+
+    查找时会按照 MRO 进行解析：若以基类进行查找，则会返回最先注册的子类实例。
+    查找结果（包括未找到）会被缓存，注册表发生变化时缓存失效。
+    """
+
+    __slots__ = ("_instances", "_resolved")
+
+    def __init__(self) -> None:
+        self._instances: Dict[Type[T], T] = {}
+        self._resolved: Dict[Type, Any] = {}
+
+    def add(self, instance: T, key: Optional[Type[T]] = None) -> None:
+        """注册实例，默认以实例的类型作为键"""
+        self._instances[type(instance) if key is None else key] = instance
+        self._resolved.clear()
+
+    def remove(self, key: Type[T]) -> Optional[T]:
+        """移除并返回以 key 注册的实例"""
+        instance = self._instances.pop(key, None)
+        if instance is not None:
+            self._resolved.clear()
+        return instance
+
+    def clear(self) -> None:
+        self._instances.clear()
+        self._resolved.clear()
+
+    def _resolve(self, target: Type) -> Any:
+        if (instance := self._instances.get(target, _MISSING)) is not _MISSING or target is object:
+            return instance
+        if isinstance(target, type):
+            for key, instance in self._instances.items():
+                if issubclass(key, target):
+                    return instance
+        return _MISSING
+
+    def get(self, target: Type[T], default: Optional[T] = None) -> Optional[T]:
+        """获取 target 类型（或其子类）的实例"""
+        try:
+            instance = self._resolved.get(target, _MISSING)
+        except TypeError:  # target 不可哈希
+            return default
+        if instance is _MISSING and target not in self._resolved:
+            instance = self._resolved[target] = self._resolve(target)
+        return default if instance is _MISSING else instance
+
+    def __contains__(self, target: Type) -> bool:
+        return self.get(target, _MISSING) is not _MISSING
+
+    def __getitem__(self, target: Type[T]) -> T:
+        if (instance := self.get(target, _MISSING)) is _MISSING:
+            raise KeyError(target)
+        return instance
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(list(self._instances.values()))
+
+    def __len__(self) -> int:
+        return len(self._instances)
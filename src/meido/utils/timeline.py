@@ -0,0 +1,101 @@
+"""启动过程的耗时记录"""
+from contextlib import contextmanager
+from pathlib import Path
+from time import perf_counter
+from typing import Iterator, List, NamedTuple, Optional, TYPE_CHECKING
+
+from meido.utils import jsonlib
+
+if TYPE_CHECKING:
+    from psutil import Process
+
+__all__ = ("Span", "StartupTimeline")
+
+
+class Span(NamedTuple):
+    category: str
+    name: str
+    start: float
+    """相对于 timeline 起点的开始时间（秒）"""
+    end: float
+    """相对于 timeline 起点的结束时间（秒）"""
+    phase: str = ""
+    """步骤所处的阶段，例如 construct、initialize"""
+    rss_delta: Optional[int] = None
+    """步骤前后 RSS 的变化（字节），仅在启用分析时记录"""
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class StartupTimeline:
+    """记录启动过程中各个步骤的开始时间与耗时
+
+    启用分析后还会通过 psutil 记录每个步骤前后 RSS 的变化以及 RSS 的峰值
+    """
+
+    def __init__(self) -> None:
+        self._origin = perf_counter()
+        self._spans: List[Span] = []
+        self._process: Optional["Process"] = None
+        self.peak_rss = 0
+
+    @property
+    def profiling(self) -> bool:
+        return self._process is not None
+
+    def enable_profiling(self) -> None:
+        import psutil
+
+        self._process = psutil.Process()
+        self._rss()
+
+    def _rss(self) -> int:
+        rss = self._process.memory_info().rss
+        self.peak_rss = max(self.peak_rss, rss)
+        return rss
+
+    def reset(self) -> None:
+        self._origin = perf_counter()
+        self._spans.clear()
+
+    @contextmanager
+    def span(self, category: str, name: str, phase: str = "") -> Iterator[None]:
+        """记录 with 语句块的耗时"""
+        rss = self._rss() if self._process is not None else None
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            end = perf_counter()
+            rss_delta = None if rss is None else self._rss() - rss
+            self._spans.append(Span(category, name, start - self._origin, end - self._origin, phase, rss_delta))
+
+    def spans(self, category: Optional[str] = None) -> List[Span]:
+        return [i for i in self._spans if category is None or i.category == category]
+
+    def report(self, category: Optional[str] = None) -> str:
+        """按耗时从长到短排列的报告"""
+        spans = sorted(self.spans(category), key=lambda x: x.duration, reverse=True)
+        name_width = max((len(i.name) for i in spans), default=0)
+        phase_width = max((len(i.phase) for i in spans), default=0)
+        lines = []
+        for i in spans:
+            line = f"{i.category:<10} {i.name:<{name_width}} {i.phase:<{phase_width}} "
+            line += f"{i.start:>8.3f}s -> {i.end:>8.3f}s {i.duration:>8.3f}s"
+            if i.rss_delta is not None:
+                line += f" {i.rss_delta / 1024 / 1024:>+9.2f}MiB"
+            lines.append(line)
+        if self.profiling:
+            lines.append(f"RSS 峰值：{self.peak_rss / 1024 / 1024:.2f}MiB")
+        return "\n".join(lines)
+
+    def dump(self, path: Path) -> None:
+        """将所有记录按耗时从长到短写入 JSON 文件"""
+        spans = sorted(self._spans, key=lambda x: x.duration, reverse=True)
+        data = {
+            "peak_rss": self.peak_rss if self.profiling else None,
+            "spans": [dict(i._asdict(), duration=i.duration) for i in spans],
+        }
+        path.write_text(jsonlib.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
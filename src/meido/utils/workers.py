@@ -0,0 +1,185 @@
+"""用于执行同步函数的工作池"""
+import asyncio
+import contextvars
+import os
+import pickle
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from enum import Enum
+from functools import partial
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, TypeVar, Union
+
+__all__ = ("Offload", "OffloadType", "get_offload", "get_callback_offload", "WorkerPool", "WorkerPools")
+
+R = TypeVar("R")
+
+
+class Offload(str, Enum):
+    """同步函数的执行方式"""
+
+    Thread = "thread"
+    """在线程池中执行，适用于会释放 GIL 的 IO 或 C 扩展操作"""
+    Process = "process"
+    """在进程池中执行，适用于 CPU 密集型操作。
+
+    函数及其参数必须可以被 pickle，因此只能用于模块级的函数；
+    插件的 callback 不能在进程池中执行，应在 callback 中将 CPU 密集的部分交由 ``application.workers.run`` 执行
+    """
+
+
+OffloadType = Union[bool, str, Offload, None]
+
+
+def get_offload(offload: OffloadType) -> Optional[Offload]:
+    """将 offload 参数转换为 Offload，True 表示使用线程池，None 或 False 表示直接在事件循环中执行"""
+    if offload is None or offload is False:
+        return None
+    if offload is True:
+        return Offload.Thread
+    return Offload(offload)
+
+
+def get_callback_offload(offload: OffloadType) -> Optional[Offload]:
+    """插件 callback 所使用的 get_offload
+
+    callback 通常是插件的方法，调用时传入的 update 与 context 也无法被 pickle，因此不能在进程池中执行
+    """
+    if (offload := get_offload(offload)) is Offload.Process:
+        raise ValueError(
+            "plugin callbacks cannot use offload='process' because they cannot be pickled, "
+            "run the CPU-bound helper with `application.workers.run(Offload.Process, func, *args)` instead"
+        )
+    return offload
+
+
+class WorkerPool:
+    """有界的工作池
+
+    Args:
+        name (str): 工作池的名称
+        factory (Callable[[], Executor]): 用于创建 Executor 的函数，Executor 会在第一次使用时创建
+        max_workers (int): 最大的 worker 数量
+        copy_context (bool): 是否将当前的 contextvars 复制到 worker 中执行
+        check_pickle (bool): 是否在提交前检查函数及其参数能否被 pickle
+    """
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Executor],
+        max_workers: int,
+        copy_context: bool = False,
+        check_pickle: bool = False,
+    ):
+        self.name = name
+        self.max_workers = max_workers
+        self._factory = factory
+        self._copy_context = copy_context
+        self._check_pickle = check_pickle
+        self._executor: Optional[Executor] = None
+        self._lock = Lock()
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._factory()
+            return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        """正在排队等待空闲 worker 的任务数"""
+        return max(self.in_flight - self.max_workers, 0)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_workers": self.max_workers,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": self.queue_depth,
+        }
+
+    async def run(self, func: Callable[..., R], *args: Any) -> R:
+        """在工作池中执行 func 并等待其结果"""
+        loop = asyncio.get_running_loop()
+        if self._check_pickle:
+            try:
+                pickle.dumps((func, args))
+            except Exception as exc:
+                raise TypeError(
+                    f"{func!r} cannot be run in the {self.name} pool because it or its arguments cannot be pickled, "
+                    "only module-level functions with picklable arguments are supported"
+                ) from exc
+        if self._copy_context:
+            func = partial(contextvars.copy_context().run, func)
+        self.submitted += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            result = await loop.run_in_executor(self.executor, func, *args)
+        except BaseException:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        self.completed += 1
+        return result
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+
+class WorkerPools:
+    """Application 所持有的线程池与进程池
+
+    Args:
+        thread_workers (int | None): 线程池的大小，默认为 min(32, CPU 数 + 4)
+        process_workers (int | None): 进程池的大小，默认为 CPU 数
+    """
+
+    def __init__(self, thread_workers: Optional[int] = None, process_workers: Optional[int] = None):
+        cpu_count = os.cpu_count() or 1
+        thread_workers = thread_workers or min(32, cpu_count + 4)
+        process_workers = process_workers or cpu_count
+        self._pools: Dict[Offload, WorkerPool] = {
+            Offload.Thread: WorkerPool(
+                Offload.Thread.value,
+                partial(ThreadPoolExecutor, max_workers=thread_workers, thread_name_prefix="meido-worker"),
+                thread_workers,
+                copy_context=True,
+            ),
+            Offload.Process: WorkerPool(
+                Offload.Process.value,
+                partial(ProcessPoolExecutor, max_workers=process_workers),
+                process_workers,
+                check_pickle=True,
+            ),
+        }
+
+    @property
+    def pools(self) -> List[WorkerPool]:
+        return list(self._pools.values())
+
+    def get(self, offload: OffloadType) -> WorkerPool:
+        if (offload := get_offload(offload)) is None:
+            raise ValueError("offload must not be None or False")
+        return self._pools[offload]
+
+    async def run(self, offload: OffloadType, func: Callable[..., R], *args: Any) -> R:
+        return await self.get(offload).run(func, *args)
+
+    def shutdown(self, wait: bool = False) -> None:
+        for pool in self._pools.values():
+            pool.shutdown(wait=wait)
@@ -0,0 +1,56 @@
+from datetime import datetime
+from types import SimpleNamespace
+from typing import List, Optional
+
+import pytest
+from telegram import Bot, CallbackQuery, Chat, Message, MessageEntity, Update, User
+
+
+def make_bot(username: str = "meido_bot") -> Bot:
+    """构造无需联网即可获取用户名的 Bot"""
+    bot = Bot("123456:token")
+    bot._bot_user = User(123456, "meido", True, username=username)  # pylint: disable=W0212
+    return bot
+
+
+def make_update(
+    update_id: int,
+    user_id: int = 1,
+    chat_id: int = 1,
+    text: str = "/start",
+    bot: Optional[Bot] = None,
+    entities: Optional[List[MessageEntity]] = None,
+) -> Update:
+    """构造只包含消息的 Update，未指定 entities 时以 / 开头的文本会带有覆盖第一个单词的 bot_command 实体"""
+    user = User(user_id, f"user{user_id}", False)
+    chat = Chat(chat_id, Chat.PRIVATE if chat_id > 0 else Chat.GROUP)
+    if entities is None and text[:1] == "/":
+        entities = [MessageEntity(MessageEntity.BOT_COMMAND, 0, len(text.split(None, 1)[0]))]
+    message = Message(update_id, datetime.now(), chat, from_user=user, text=text, entities=entities)
+    if bot is not None:
+        message.set_bot(bot)
+    return Update(update_id, message=message)
+
+
+def make_callback_update(update_id: int, user_id: int = 1, data: str = "button", bot: Optional[Bot] = None) -> Update:
+    """构造只包含 callback query 的 Update"""
+    user = User(user_id, f"user{user_id}", False)
+    callback_query = CallbackQuery(str(update_id), user, "instance", data=data)
+    if bot is not None:
+        callback_query.set_bot(bot)
+    return Update(update_id, callback_query=callback_query)
+
+
+def make_application(**kwargs) -> SimpleNamespace:
+    """构造代替 Application 的对象，供插件生成 handler；metrics 不记录指标，直接返回 callback"""
+    return SimpleNamespace(metrics=SimpleNamespace(instrument=lambda *args: args[-1]), **kwargs)
+
+
+def make_context(**kwargs) -> SimpleNamespace:
+    """构造代替 CallbackContext 的对象，分发器只在其上读写属性"""
+    return SimpleNamespace(**kwargs)
+
+
+@pytest.fixture
+def update_factory():
+    return make_update
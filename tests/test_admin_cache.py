@@ -0,0 +1,103 @@
+import asyncio
+from types import SimpleNamespace
+
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from meido.services.users.cache import UserAdminCache
+
+
+def _cache(server: FakeServer, max_staleness: float = 60) -> UserAdminCache:
+    cache = UserAdminCache(SimpleNamespace(client=FakeRedis(server=server)))
+    cache.max_staleness = max_staleness
+    return cache
+
+
+async def _wait_for(predicate, timeout: float = 2.0) -> bool:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        if loop.time() > deadline:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+
+def test_refresh_loads_snapshot_and_version():
+    async def main():
+        server = FakeServer()
+        writer, reader = _cache(server), _cache(server)
+        await writer.set(1)
+        await writer.set(2)
+        await reader.refresh()
+        return reader._snapshot, reader._version, await reader.ismember(1), await reader.ismember(3)
+
+    snapshot, version, is_admin, is_not_admin = asyncio.run(main())
+    assert snapshot == {1, 2}
+    assert version == 2
+    assert is_admin and not is_not_admin
+
+
+def test_unchanged_membership_keeps_version():
+    async def main():
+        cache = _cache(FakeServer())
+        await cache.set(1)
+        assert not await cache.set(1)
+        assert not await cache.remove(2)
+        return int(await cache.client.get(cache.version_key))
+
+    assert asyncio.run(main()) == 1
+
+
+def test_pubsub_invalidates_other_processes():
+    async def main():
+        server = FakeServer()
+        writer, reader = _cache(server), _cache(server)
+        await reader.start_listening()
+        try:
+            await asyncio.sleep(0.05)  # 等待订阅生效
+            await writer.set(7)
+            added = await _wait_for(lambda: reader._snapshot == {7})
+            await writer.remove(7)
+            removed = await _wait_for(lambda: reader._snapshot == frozenset())
+            return added, removed, reader._version
+        finally:
+            await reader.stop_listening()
+
+    added, removed, version = asyncio.run(main())
+    assert added and removed
+    assert version == 2
+
+
+def test_stale_snapshot_is_refreshed_without_listener():
+    async def main():
+        server = FakeServer()
+        writer, reader = _cache(server), _cache(server, max_staleness=0.05)
+        assert not await reader.ismember(3)
+        await writer.set(3)
+        cached = await reader.ismember(3)  # 快照尚未过期
+        await asyncio.sleep(0.06)
+        return cached, await reader.ismember(3)
+
+    cached, refreshed = asyncio.run(main())
+    assert not cached
+    assert refreshed
+
+
+def test_dead_listener_falls_back_to_staleness_check():
+    async def main():
+        server = FakeServer()
+        writer, reader = _cache(server, max_staleness=0.1), _cache(server, max_staleness=0.1)
+        await reader.start_listening()
+        reader._listener.cancel()  # 模拟订阅意外终止
+        await asyncio.sleep(0)
+        await writer.set(4)
+        await asyncio.sleep(0.11)
+        try:
+            return reader._listener.done(), await reader.ismember(4)
+        finally:
+            await reader.stop_listening()
+
+    listener_done, is_admin = asyncio.run(main())
+    assert listener_done
+    assert is_admin
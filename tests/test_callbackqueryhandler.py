@@ -0,0 +1,137 @@
+import asyncio
+import re
+from types import SimpleNamespace
+
+import pytest
+from telegram import Bot
+from telegram.ext import ApplicationHandlerStop
+
+from meido.handler.callbackqueryhandler import CallbackQueryHandler, PrefixTrie, literal_prefix
+from meido.plugin import Plugin, handler
+from tests.conftest import make_application, make_callback_update
+
+
+class _Bot(Bot):
+    def __init__(self):
+        super().__init__("123456:token")
+        self._answered = []
+
+    async def answer_callback_query(self, callback_query_id, *args, **kwargs):
+        self._answered.append(callback_query_id)
+        return True
+
+
+class _Buttons(Plugin):
+    def __init__(self):
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    @handler.callback_query("^press", coalesce=True)
+    async def press(self, update, context):
+        self.started.set()
+        await self.release.wait()
+        return "pressed"
+
+
+def _coalescing_handler(plugin: _Buttons) -> CallbackQueryHandler:
+    plugin.set_application(make_application())
+    (callback_handler,) = plugin.handlers
+    assert isinstance(callback_handler, CallbackQueryHandler) and callback_handler.coalesce
+    return callback_handler
+
+
+async def _press(callback_handler, update):
+    check = callback_handler.check_update(update)
+    return await callback_handler.handle_update(update, None, check, SimpleNamespace())
+
+
+def test_duplicate_presses_share_the_first_result():
+    user_id = 101
+
+    async def main():
+        bot, plugin = _Bot(), _Buttons()
+        callback_handler = _coalescing_handler(plugin)
+        first = asyncio.create_task(_press(callback_handler, make_callback_update(1, user_id, "press", bot)))
+        await plugin.started.wait()
+        second = asyncio.create_task(_press(callback_handler, make_callback_update(2, user_id, "press", bot)))
+        await asyncio.sleep(0)
+        plugin.release.set()
+        assert await asyncio.gather(first, second) == ["pressed", "pressed"]
+        assert bot._answered == ["2"]
+
+    asyncio.run(main())
+
+
+def test_duplicate_presses_are_answered_when_the_first_is_cancelled():
+    user_id = 102
+
+    async def main():
+        bot, plugin = _Bot(), _Buttons()
+        callback_handler = _coalescing_handler(plugin)
+        first = asyncio.create_task(_press(callback_handler, make_callback_update(1, user_id, "press", bot)))
+        await plugin.started.wait()
+        second = asyncio.create_task(_press(callback_handler, make_callback_update(2, user_id, "press", bot)))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(ApplicationHandlerStop):
+            await second
+        assert bot._answered == ["2"]
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize(
+    "pattern, prefix",
+    [
+        ("^item:", "item:"),
+        ("item:(\\d+)$", "item:"),
+        (r"^a\.b\|c", "a.b|c"),
+        (r"^a\-b\\", "a-b\\"),
+        (r"^page\d+", "page"),
+        (r"^\w+", ""),
+        ("^a|b", ""),
+        ("^[|]x", ""),
+        ("^item:(a|b)", "item:"),
+        ("^(?:item):", ""),
+        ("^abc?", "ab"),
+        ("^abc*", "ab"),
+        ("^abc{0,2}", "ab"),
+        ("^abc+", "abc"),
+        ("^abc+?", "abc"),
+        (r"^ab\.?", "ab"),
+        ("^abc$", "abc"),
+        (re.compile("^item:"), "item:"),
+        (re.compile("^item:", re.IGNORECASE), ""),
+        (re.compile("^item:", re.VERBOSE), ""),
+        (lambda data: True, ""),
+        (str, ""),
+    ],
+)
+def test_literal_prefix(pattern, prefix):
+    assert literal_prefix(pattern) == prefix
+
+
+def test_prefix_trie():
+    trie: PrefixTrie[int] = PrefixTrie()
+    trie.add("", 0)
+    trie.add("item", 1)
+    trie.add("item:", 2)
+    trie.add("items", 3)
+    trie.add("item:", 4)
+    assert trie.find("item:1") == {0, 1, 2, 4}
+    assert trie.find("items") == {0, 1, 3}
+    assert trie.find("ite") == {0}
+    assert trie.find("other") == {0}
+
+    trie.discard("item:", 2)
+    trie.discard("missing", 1)
+    trie.discard("item", 5)
+    assert trie.find("item:1") == {0, 1, 4}
+    trie.discard("item:", 4)
+    trie.discard("items", 3)
+    assert trie.find("items") == {0, 1}
+    node = trie._root.children["i"].children["t"].children["e"].children["m"]
+    assert node.children == {}  # 空的节点被移除
+    trie.discard("item", 1)
+    trie.discard("", 0)
+    assert trie._root.children == {} and trie.find("item") == set()
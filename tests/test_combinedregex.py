@@ -0,0 +1,87 @@
+import re
+
+import pytest
+
+from meido.handler.combinedregex import CombinedRegex, mergeable_pattern
+
+
+def _combined(patterns, search=False) -> CombinedRegex:
+    combined = CombinedRegex(search=search)
+    for value, pattern in enumerate(patterns):
+        combined.add(mergeable_pattern(pattern), value)
+    return combined
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [("uid 123", {0, 2}), ("name meido", {1}), ("uid abc", set()), ("UID 5", {2})],
+)
+def test_named_groups_in_patterns(text, expected):
+    patterns = [r"uid (?P<uid>\d+)", r"name (?P<uid>\w+)", re.compile(r"(uid) (\d)", re.IGNORECASE)]
+    assert _combined(patterns).find(text) == expected
+
+
+def test_search_matches_like_re_search():
+    patterns = [r"hello\b", r"^start", re.compile("^second", re.MULTILINE), r"[(]literal(?P<x>)"]
+    combined = _combined(patterns, search=True)
+    for text in ["say hello", "start now", "now start", "first\nsecond", "a (literal b", "helloworld"]:
+        expected = {value for value, pattern in enumerate(patterns) if re.search(pattern, text)}
+        assert combined.find(text) == expected, text
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        r"(a)\1",
+        r"(?P<a>x)(?P=a)",
+        r"(?i)global",
+        r"\p{Han}+",  # 只有 regex 支持
+        r"\mword",
+        re.compile("ascii", re.ASCII),
+        b"bytes",
+        re.compile("# (comment [\n(x)]", re.VERBOSE),
+    ],
+)
+def test_unmergeable_patterns(pattern):
+    assert mergeable_pattern(pattern) is None
+
+
+def test_patterns_are_compiled_with_re():
+    # 合并后的正则表达式与 python-telegram-bot 一样使用 re 进行匹配
+    assert _combined([r"a++b", r"(?>a+)c"]).find("aab") == {0}
+
+
+def test_discard():
+    combined = _combined(["^a", "^b"])
+    combined.discard(mergeable_pattern("^a"), 0)
+    assert combined.find("a") == set() and combined.find("b") == {1}
+    combined.discard(mergeable_pattern("^b"), 1)
+    assert not combined and combined.find("b") == set()
+
+
+@pytest.mark.parametrize("search", [False, True])
+def test_every_matching_pattern_is_found(search):
+    # 按字面前缀索引的与逐个匹配的 pattern 混合时，结果与逐个使用 re 匹配一致
+    patterns = [r"b\w", r"ab", r"a", r"\bc", r"b", r"x?", r"^a\b", r"(?<=a)b", re.compile("A", re.IGNORECASE)]
+    combined = _combined(patterns, search=search)
+    method = re.search if search else re.match
+    for text in ["ab", "abc", "ba", "cab", "a c", "a", "", "xab", "bab b"]:
+        expected = {value for value, pattern in enumerate(patterns) if method(pattern, text)}
+        assert combined.find(text) == expected, text
+
+
+@pytest.mark.parametrize(
+    "search, pattern, indexed",
+    [
+        (False, "abc", True),
+        (False, re.compile("abc", re.IGNORECASE), False),
+        (True, "abc", False),
+        (True, "^abc", True),
+        (True, re.compile("^abc", re.MULTILINE), False),
+    ],
+)
+def test_literal_prefix_index(search, pattern, indexed):
+    combined = _combined([pattern, r"\w"], search=search)
+    assert (mergeable_pattern(pattern) not in combined._unindexed) is indexed
+    assert combined.find("abc") == {0, 1}
+    assert combined.find("xyz") == {1}
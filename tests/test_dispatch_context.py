@@ -0,0 +1,67 @@
+import asyncio
+import random
+
+from telegram import Chat, Update, User
+
+from meido.builtins.dispatcher import DispatchContext, HandlerDispatcher, catch
+from tests.conftest import make_context, make_update
+
+
+class _StressDispatcher(HandlerDispatcher):
+    active = set()
+
+    @catch("session")
+    async def catch_session(self) -> int:
+        # 同一个 DispatchContext 不应同时服务两次分发
+        assert id(self) not in self.active
+        self.active.add(id(self))
+        try:
+            await asyncio.sleep(random.random() / 1000)
+            return self.catch_user().id
+        finally:
+            self.active.discard(id(self))
+
+
+def _callback(update: Update, user: User, chat: Chat, session: int):
+    return update, user, chat, session
+
+
+def test_concurrent_dispatches_do_not_share_contexts():
+    dispatcher = _StressDispatcher()
+    updates = [make_update(i, user_id=i + 1, chat_id=-(i + 1)) for i in range(2000)]
+
+    async def dispatch(update: Update):
+        await asyncio.sleep(random.random() / 1000)
+        return (await dispatcher.adispatch(_callback, update=update, context=make_context()))()
+
+    async def main():
+        return await asyncio.gather(*(dispatch(update) for update in updates))
+
+    results = asyncio.run(main())
+    for update, (got_update, user, chat, session) in zip(updates, results):
+        assert got_update is update
+        assert user is update.effective_user
+        assert chat is update.effective_chat
+        assert session == update.effective_user.id
+
+    assert not _StressDispatcher.active
+    assert len(DispatchContext._free) <= DispatchContext._max_free
+    assert len({id(i) for i in DispatchContext._free}) == len(DispatchContext._free)
+    for released in DispatchContext._free:
+        assert released._dispatcher is None and released._update is None and released._context is None
+        assert released._cache is None
+
+
+def test_catch_cache_is_not_shared_between_updates():
+    dispatcher = _StressDispatcher()
+    first, second = make_context(), make_context()
+
+    async def main():
+        await dispatcher.adispatch(_callback, update=make_update(1, user_id=1), context=first)
+        await dispatcher.adispatch(_callback, update=make_update(2, user_id=2), context=second)
+
+    asyncio.run(main())
+    assert first._meido_catch_cache is not second._meido_catch_cache
+    session = _StressDispatcher.catch_session
+    assert first._meido_catch_cache[session].result() == 1
+    assert second._meido_catch_cache[session].result() == 2
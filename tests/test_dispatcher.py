@@ -0,0 +1,103 @@
+import asyncio
+import gc
+import weakref
+
+import pytest
+from telegram import Chat, Update, User
+
+from meido.builtins.dispatcher import DispatchContext, HandlerDispatcher, catch
+from tests.conftest import make_context, make_update
+
+
+class _Plugin:
+    def callback(self, update: Update, user: User, chat: Chat, flag: bool = True):
+        return update, user, chat, flag
+
+
+def test_plan_is_compiled_once():
+    dispatcher = HandlerDispatcher()
+    plugin = _Plugin()
+    assert dispatcher.get_plan(plugin.callback) is dispatcher.get_plan(plugin.callback)
+    assert [item.name for item in dispatcher.get_plan(plugin.callback).items] == ["update", "user", "chat", "flag"]
+
+
+def test_plan_is_shared_between_instances():
+    dispatcher = HandlerDispatcher()
+    assert dispatcher.get_plan(_Plugin().callback) is dispatcher.get_plan(_Plugin().callback)
+
+
+def test_plan_cache_does_not_keep_instances_alive():
+    dispatcher = HandlerDispatcher()
+    plugin = _Plugin()
+    ref = weakref.ref(plugin)
+    update = make_update(1)
+    assert dispatcher.dispatch(plugin.callback, update=update, context=make_context())()[0] is update
+    del plugin
+    gc.collect()
+    assert ref() is None
+
+
+def test_dispatch_resolves_parameters():
+    update = make_update(1, user_id=2, chat_id=3)
+    result = HandlerDispatcher().dispatch(_Plugin().callback, update=update, context=make_context())()
+    assert result == (update, update.effective_user, update.effective_chat, True)
+
+
+class _AsyncDispatcher(HandlerDispatcher):
+    calls = 0
+
+    @catch("profile")
+    async def catch_profile(self) -> str:
+        type(self._dispatcher if isinstance(self, DispatchContext) else self).calls += 1
+        await asyncio.sleep(0.01)
+        return f"profile{self.catch_user().id}"
+
+
+class _LegacyAsyncDispatcher(_AsyncDispatcher):
+    calls = 0
+
+
+_LegacyAsyncDispatcher._plan_supported = False
+
+
+async def _needs_profile(user: User, profile: str):
+    return user, profile
+
+
+def test_cancelled_handler_does_not_cancel_shared_catch_func():
+    _AsyncDispatcher.calls = 0
+    dispatcher = _AsyncDispatcher()
+    update, context = make_update(1, user_id=7), make_context()
+
+    async def main():
+        first = asyncio.create_task(dispatcher.adispatch(_needs_profile, update=update, context=context))
+        second = asyncio.create_task(dispatcher.adispatch(_needs_profile, update=update, context=context))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await (await second)()
+
+    assert asyncio.run(main()) == (update.effective_user, "profile7")
+    assert _AsyncDispatcher.calls == 1
+
+
+def test_fallback_awaits_async_catch_funcs():
+    _LegacyAsyncDispatcher.calls = 0
+    dispatcher = _LegacyAsyncDispatcher()
+    assert dispatcher.get_plan(_needs_profile) is None
+    update, context = make_update(1, user_id=3), make_context()
+
+    async def main():
+        first = await dispatcher.adispatch(_needs_profile, update=update, context=context)
+        second = await dispatcher.adispatch(_needs_profile, update=update, context=context)
+        return await first(), await second()
+
+    assert asyncio.run(main()) == ((update.effective_user, "profile3"),) * 2
+    assert _LegacyAsyncDispatcher.calls == 1
+
+
+@pytest.mark.parametrize("dispatcher_class", [_AsyncDispatcher, _LegacyAsyncDispatcher])
+def test_sync_dispatch_refuses_async_catch_funcs(dispatcher_class):
+    dispatcher_class.calls = 0
+    with pytest.raises(TypeError):
+        dispatcher_class().dispatch(_needs_profile, update=make_update(1), context=make_context())
+    assert dispatcher_class.calls == 0
@@ -0,0 +1,82 @@
+import pytest
+
+from meido.error import DependencyCycleError
+from meido.manager import Manager
+from meido.utils.graph import DependencyGraph, get_init_dependencies
+
+
+class _Redis:
+    def __init__(self):
+        pass
+
+
+class _FakeRedis(_Redis):
+    pass
+
+
+class _Cache:
+    def __init__(self, redis: _Redis):
+        self.redis = redis
+
+
+class _Service:
+    def __init__(self, cache: _Cache, redis: _Redis, name: str = ""):
+        self.cache = cache
+
+
+class _Configured:
+    def __init__(self, redis: _Redis):
+        pass
+
+    @classmethod
+    def from_config(cls):
+        return cls(_Redis())
+
+
+class _Ping:
+    def __init__(self, pong: "_Pong"):
+        pass
+
+
+class _Pong:
+    def __init__(self, ping: _Ping):
+        pass
+
+
+class _Waiter:
+    def __init__(self, ping: _Ping, redis: _Redis):
+        pass
+
+
+def test_init_dependencies_follow_subclasses():
+    candidates = [_FakeRedis, _Cache, _Service, _Configured]
+    assert get_init_dependencies(_Cache, candidates) == {_FakeRedis}
+    assert get_init_dependencies(_Service, candidates) == {_Cache, _FakeRedis}
+    assert get_init_dependencies(_Configured, candidates) == set()
+
+
+def test_levels_are_topological():
+    graph = DependencyGraph.from_init([_Service, _Cache, _Redis, _Configured])
+    assert graph.levels() == [[_Redis, _Configured], [_Cache], [_Service]]
+    assert DependencyGraph.from_init([_Service, _Cache], provided=[_Cache]).levels() == [[_Service, _Cache]]
+    assert DependencyGraph({_Cache: [_Cache, _Redis]}).levels() == [[_Cache]]  # 自身与图外的依赖被忽略
+
+
+def test_cycles_are_detected():
+    graph = DependencyGraph.from_init([_Redis, _Ping, _Pong, _Waiter])
+    cycle = graph.find_cycle()
+    assert cycle[0] is cycle[-1] and set(cycle) == {_Ping, _Pong}
+    assert graph.partial_levels() == ([[_Redis]], [_Ping, _Pong, _Waiter])
+    with pytest.raises(DependencyCycleError) as exc_info:
+        graph.levels()
+    assert set(exc_info.value.cycle) == {_Ping, _Pong}
+    assert DependencyGraph.from_init([_Redis, _Cache]).find_cycle() is None
+
+
+def test_manager_exits_on_service_cycles():
+    with pytest.raises(SystemExit):
+        Manager._levels([_Redis, _Ping, _Pong], "服务")
+
+
+def test_manager_skips_cyclic_plugins():
+    assert Manager._levels([_Redis, _Ping, _Pong, _Waiter, _Cache], "插件", skip_cycles=True) == [[_Redis], [_Cache]]
@@ -0,0 +1,90 @@
+import importlib
+import json
+import sys
+
+import pytest
+from telegram.request import RequestData as DefaultRequestData
+from telegram.request._requestparameter import RequestParameter
+
+from meido.override.telegram import RequestData, Response
+from meido.utils import jsonlib
+
+BACKENDS = ("orjson", "msgspec", "ujson", "json")
+
+UPDATE = {
+    "ok": True,
+    "result": [
+        {
+            "update_id": 1,
+            "message": {
+                "message_id": 10,
+                "date": 1700000000,
+                "chat": {"id": -1001234567890, "type": "supergroup", "title": "メイド"},
+                "text": '你好 👋 "quoted" \\ back',
+                "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+            },
+        }
+    ],
+}
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, monkeypatch):
+    """屏蔽优先级更高的库，重新加载 jsonlib 以使用指定的库"""
+    if request.param != "json":
+        pytest.importorskip(request.param)
+    for name in BACKENDS[: BACKENDS.index(request.param)]:
+        monkeypatch.setitem(sys.modules, name, None)
+    importlib.reload(jsonlib)
+    yield request.param
+    monkeypatch.undo()
+    importlib.reload(jsonlib)
+
+
+def test_backend_is_selected(backend):
+    assert jsonlib.backend == backend
+
+
+def test_round_trip(backend):
+    data = jsonlib.dumps_bytes(UPDATE)
+    assert isinstance(data, bytes)
+    assert json.loads(data) == UPDATE
+    for payload in (data, data.decode(), bytearray(data), memoryview(data)):
+        assert jsonlib.loads(payload) == UPDATE
+    with pytest.raises(ValueError):
+        jsonlib.loads(b"{")
+
+
+def test_non_ascii_is_not_escaped(backend):
+    assert jsonlib.dumps({"text": "你好"}) == '{"text":"你好"}'
+    assert jsonlib.dumps({"text": "你好"}, ensure_ascii=True) == '{"text": "\\u4f60\\u597d"}'  # 额外参数使用标准库
+
+
+def test_default_is_used_for_unknown_types(backend):
+    assert json.loads(jsonlib.dumps({"value": {1, 2}}, default=sorted)) == {"value": [1, 2]}
+
+
+def test_request_data_matches_ptb(backend):
+    parameters = [
+        RequestParameter.from_input("chat_id", -1001234567890),
+        RequestParameter.from_input("text", "你好 👋"),
+        RequestParameter.from_input("reply_markup", {"inline_keyboard": [[{"text": "按钮", "callback_data": "item:1"}]]}),
+        RequestParameter.from_input("disable_notification", True),
+        RequestParameter.from_input("caption", None),
+    ]
+    ours, ptb = RequestData(DefaultRequestData(parameters)), DefaultRequestData(parameters)
+
+    def decoded(values):
+        return {key: value if key == "text" else json.loads(value) for key, value in values.items()}
+
+    assert decoded(ours.json_parameters) == decoded(ptb.json_parameters)
+    assert decoded(json.loads(ours.json_payload)) == decoded(json.loads(ptb.json_payload))
+    assert "按钮".encode() in ours.json_payload  # 与 PTB 不同，非 ASCII 字符不会被转义
+
+
+@pytest.mark.parametrize("charset", [None, "utf-8", "utf-16"])
+def test_response_json(backend, charset):
+    headers = {"content-type": "application/json" + (f"; charset={charset}" if charset else "")}
+    response = Response(200, headers=headers, content=json.dumps(UPDATE).encode(charset or "utf-8"))
+    assert response.json() == UPDATE
+    assert response.json(parse_int=str)["result"][0]["update_id"] == "1"
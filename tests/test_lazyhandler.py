@@ -0,0 +1,151 @@
+import asyncio
+import re
+from types import SimpleNamespace
+
+import pytest
+from telegram.ext import ApplicationBuilder, CommandHandler
+
+from meido.handler.lazyhandler import LazyPluginHandler
+from meido.handler.router import PluginRouter
+from meido.plugin import Plugin, handler
+from tests.conftest import make_application, make_bot, make_callback_update, make_update
+
+
+async def _loader():
+    return None
+
+
+@pytest.fixture
+def lazy_handler():
+    return LazyPluginHandler("plugin", ["start"], [["^ITEM", re.IGNORECASE]], _loader)
+
+
+@pytest.mark.parametrize(
+    "text, matched",
+    [
+        ("/start", True),
+        ("/START arg", True),
+        ("/start@meido_bot", True),
+        ("/start@Meido_Bot arg", True),
+        ("/start@other_bot", False),
+        ("/stop", False),
+        ("start", False),
+    ],
+)
+def test_commands_match_like_command_handler(lazy_handler, text, matched):
+    assert lazy_handler._match(make_update(1, text=text, bot=make_bot())) is matched
+
+
+def test_patterns_keep_their_flags(lazy_handler):
+    assert lazy_handler._match(make_callback_update(1, data="item:1"))
+    assert not lazy_handler._match(make_callback_update(1, data="other"))
+
+
+def _triggers(plugin_class):
+    plugin = plugin_class()
+    plugin.set_application(make_application())
+    return plugin._lazy_triggers()
+
+
+def test_triggers_record_pattern_flags():
+    class _Lazy(Plugin):
+        @handler.command("start")
+        async def start(self):
+            pass
+
+        @handler.callback_query(re.compile("^item", re.IGNORECASE))
+        async def item(self):
+            pass
+
+    assert _triggers(_Lazy) == {"commands": ["start"], "patterns": [["^item", re.IGNORECASE | re.UNICODE]]}
+
+
+def test_filtered_commands_are_not_lazy():
+    from telegram.ext import filters
+
+    class _Filtered(Plugin):
+        @handler.command("start", filters=filters.ChatType.PRIVATE)
+        async def start(self):
+            pass
+
+    assert _triggers(_Filtered) is None
+
+
+@pytest.mark.parametrize("pattern", [lambda data: True, str])
+def test_non_regex_patterns_are_not_lazy(pattern):
+    class _Callable(Plugin):
+        @handler.callback_query(pattern)
+        async def item(self):
+            pass
+
+    assert _triggers(_Callable) is None
+
+
+def test_router_handles_first_update_once():
+    router, handled = PluginRouter(), []
+
+    async def start(update, context):
+        handled.append(update.update_id)
+
+    async def loader():
+        plugin = SimpleNamespace(handlers=[CommandHandler("start", start)])
+        router.add_handlers(id(plugin), plugin.handlers)
+        loaded.append(plugin)
+        return plugin
+
+    loaded = []
+    lazy = LazyPluginHandler("plugin", ["start"], [], loader)
+    router.add_handlers(id(lazy), [lazy])
+    application = SimpleNamespace(bot=SimpleNamespace(defaults=None), handlers={})
+
+    async def process(update):
+        if (check := router.check_update(update)) is not None:
+            await router.handle_update(update, application, check, SimpleNamespace())
+
+    async def main():
+        bot = make_bot()
+        await process(make_update(1, bot=bot))
+        await process(make_update(2, bot=bot))
+        await process(make_update(3, text="/help", bot=bot))
+
+    asyncio.run(main())
+    assert len(loaded) == 1
+    assert handled == [1, 2]
+
+
+def test_application_handles_first_update_once_without_router():
+    handled = []
+
+    async def start(update, context):
+        handled.append(update.update_id)
+
+    async def main():
+        application = ApplicationBuilder().bot(make_bot()).build()
+        application._initialized = True  # pylint: disable=W0212
+
+        async def loader():
+            plugin = SimpleNamespace(handlers=[CommandHandler("start", start)])
+            application.add_handler(plugin.handlers[0], id(plugin))
+            return plugin
+
+        lazy = LazyPluginHandler("plugin", ["start"], [], loader)
+        application.add_handler(lazy, id(lazy))
+        for update_id in (1, 2):
+            await application.process_update(make_update(update_id, bot=application.bot))
+
+    asyncio.run(main())
+    assert handled == [1, 2]
+
+
+def test_manager_registers_lazy_handler_in_router():
+    from meido.manager import PluginManager
+
+    router, manager = PluginRouter(), PluginManager()
+    manager.set_application(SimpleNamespace(router=router))
+    try:
+        manager._add_lazy_handler("plugins.lazy", "Lazy", {"commands": ["start"], "patterns": []})
+        candidates, index, (matched, _), _ = router.check_update(make_update(1, bot=make_bot()))
+        assert matched is manager._lazy_handlers[0]
+        assert candidates[index] == id(matched)
+    finally:
+        manager._lazy_handlers.clear()
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from telegram.ext import ApplicationHandlerStop
+
+from meido.handler.limiterhandler import LimiterHandler, RedisLimiter
+from tests.conftest import make_update
+
+pytest.importorskip("lupa")
+
+
+async def _allowed(limiter, user, times: int) -> int:
+    allowed = 0
+    for _ in range(times):
+        try:
+            await limiter.acquire(user)
+        except ApplicationHandlerStop:
+            continue
+        allowed += 1
+    return allowed
+
+
+def test_gcra_script_limits_and_blocks():
+    user = make_update(1, user_id=42).effective_user
+
+    async def main():
+        server = FakeServer()
+        first = RedisLimiter(FakeRedis(server=server), max_rate=3, rate_per_sec=1, amount=1, limit_time=2)
+        second = RedisLimiter(FakeRedis(server=server), max_rate=3, rate_per_sec=1, amount=1, limit_time=2)
+        assert await _allowed(first, user, 3) == 3
+        with pytest.raises(ApplicationHandlerStop):
+            await first.acquire(user)
+        # 其他进程共享同一份状态
+        with pytest.raises(ApplicationHandlerStop):
+            await second.acquire(user)
+        ttl = await first.client.pttl("meido:limiter:42:block")
+        assert 0 < ttl <= 2000
+        assert user.id in first._deny_until
+        # 其他用户不受影响
+        assert await _allowed(second, make_update(2, user_id=43).effective_user, 3) == 3
+
+    asyncio.run(main())
+
+
+def test_gcra_script_recovers_after_the_emission_interval():
+    user = make_update(1, user_id=7).effective_user
+
+    async def main():
+        limiter = RedisLimiter(FakeRedis(server=FakeServer()), max_rate=2, rate_per_sec=20, amount=1, limit_time=0.05)
+        assert await _allowed(limiter, user, 2) == 2
+        await asyncio.sleep(0.06)
+        assert await _allowed(limiter, user, 1) == 1
+
+    asyncio.run(main())
+
+
+def test_falls_back_to_local_buckets_when_redis_fails():
+    update = make_update(1, user_id=5)
+    handler = LimiterHandler(max_rate=2, time_period=10)
+    server = FakeServer()
+    handler.use_redis(FakeRedis(server=server))
+
+    async def main():
+        server.connected = False
+        await handler.limiter_callback(update, None)
+        await handler.limiter_callback(update, None)
+        with pytest.raises(ApplicationHandlerStop):
+            await handler.limiter_callback(update, None)
+        assert handler._redis_retry_at > 0 and handler.buckets.get(5) is not None
+
+        server.connected = True
+        handler._redis_retry_at = handler.redis_retry_interval = 0.0
+        await handler.limiter_callback(make_update(2, user_id=6), None)
+        assert handler.buckets.get(6) is None and handler._redis_retry_at == 0.0
+
+    asyncio.run(main())
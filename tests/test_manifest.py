@@ -0,0 +1,49 @@
+import importlib
+import sys
+
+import pytest
+
+from meido.manifest import StartupManifest
+
+
+class _Manifest(StartupManifest):
+    enabled = True
+
+
+@pytest.fixture
+def modules(tmp_path, monkeypatch):
+    (tmp_path / "manifest_base.py").write_text("class Base:\n    def start(self):\n        pass\n")
+    (tmp_path / "manifest_child.py").write_text(
+        "from manifest_base import Base\n\n\nclass Child(Base):\n    pass\n\n\nclass Alone:\n    pass\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield tmp_path, importlib.import_module("manifest_child")
+    sys.modules.pop("manifest_base", None)
+    sys.modules.pop("manifest_child", None)
+
+
+def test_attrs_depend_on_base_class_modules(modules, tmp_path):
+    path, module = modules
+    manifest = _Manifest(tmp_path / "manifest.json")
+    attrs = {"handler": ["start"]}
+    manifest.record_attrs(module.Child, attrs)
+    manifest.record_attrs(module.Alone, {"handler": []})
+    assert manifest.get_attrs(module.Child) == attrs
+
+    (path / "manifest_base.py").write_text("class Base:\n    pass\n")
+    assert manifest.get_attrs(module.Child) is None
+    assert manifest.get_attrs(module.Alone) == {"handler": []}
+
+
+def test_lazy_plugins_depend_on_base_class_modules(modules, tmp_path):
+    path, module = modules
+    manifest = _Manifest(tmp_path / "manifest.json")
+    manifest.record_module("manifest_child", targets=True, services=False)
+    manifest.record_plugin(module.Child, {"commands": ["start"], "patterns": []})
+    manifest.save()
+
+    reloaded = _Manifest(tmp_path / "manifest.json")
+    assert reloaded.get_lazy_plugins("manifest_child") == {"Child": {"commands": ["start"], "patterns": []}}
+
+    (path / "manifest_base.py").write_text("class Base:\n    pass\n")
+    assert reloaded.get_lazy_plugins("manifest_child") is None
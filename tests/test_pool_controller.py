@@ -0,0 +1,43 @@
+import asyncio
+
+from meido.override.telegram import PoolController
+
+
+def test_burst_grows_without_waiting_for_interval():
+    async def main():
+        controller, sizes = PoolController(4, 64, interval=60), []
+        controller.on_resize = sizes.append
+
+        async def request():
+            await controller.acquire()
+            await asyncio.sleep(0.01)
+            controller.release()
+
+        await asyncio.gather(*(request() for _ in range(64)))
+        return controller, sizes
+
+    controller, sizes = asyncio.run(main())
+    assert sizes == [8, 16, 32, 64]
+    assert controller.acquired == 64
+    assert controller.in_flight == 0
+
+
+def test_shrinks_only_after_interval():
+    async def main():
+        controller = PoolController(2, 16, interval=0.05)
+        for _ in range(16):
+            await controller.acquire()
+        grown = controller.size
+        for _ in range(16):
+            controller.release()
+        idle = controller.size
+        for _ in range(2):  # 第一个间隔内仍有突发时的峰值
+            await asyncio.sleep(0.06)
+            await controller.acquire()
+            controller.release()
+        return grown, idle, controller.size
+
+    grown, idle, shrunk = asyncio.run(main())
+    assert grown == 16
+    assert idle == 16
+    assert shrunk < 16
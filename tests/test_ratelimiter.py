@@ -0,0 +1,130 @@
+import asyncio
+
+from telegram.error import RetryAfter
+
+from meido.ratelimiter import RateLimiter
+
+
+def _recorder(calls):
+    async def callback(endpoint, chat_id):
+        calls.append((endpoint, chat_id, asyncio.get_running_loop().time()))
+        return True
+
+    return callback
+
+
+async def _request(limiter, callback, endpoint, chat_id):
+    return await limiter.process_request(callback, (endpoint, chat_id), {}, endpoint, {"chat_id": chat_id}, None)
+
+
+def test_only_message_endpoints_take_chat_tokens():
+    calls = []
+
+    async def main():
+        limiter, callback = RateLimiter(private_rate=5), _recorder(calls)
+        start = asyncio.get_running_loop().time()
+        await _request(limiter, callback, "sendMessage", 1)
+        for endpoint in ("getChat", "getChatMember", "sendChatAction", "deleteMessage"):
+            await _request(limiter, callback, endpoint, 1)
+        await _request(limiter, callback, "sendMessage", 1)
+        await limiter.shutdown()
+        return start
+
+    start = asyncio.run(main())
+    assert all(at - start < 0.05 for _, _, at in calls[:-1])
+    assert calls[-1][2] - calls[0][2] >= 0.19
+
+
+def test_retry_after_delays_only_its_chat():
+    calls = []
+
+    async def main():
+        limiter, record = RateLimiter(max_retries=1), _recorder(calls)
+        failed = []
+
+        async def callback(endpoint, chat_id):
+            if not failed:
+                failed.append(True)
+                raise RetryAfter(1)
+            return await record(endpoint, chat_id)
+
+        start = asyncio.get_running_loop().time()
+        retried = asyncio.create_task(_request(limiter, callback, "getChat", -1))
+        await asyncio.sleep(0.05)
+        await _request(limiter, record, "getChat", -2)
+        await retried
+        await limiter.shutdown()
+        return start
+
+    start = asyncio.run(main())
+    assert [chat_id for _, chat_id, _ in calls] == [-2, -1]
+    assert calls[0][2] - start < 0.1 and calls[1][2] - start >= 0.99
+
+
+async def _edit(limiter, callback, text):
+    data = {"chat_id": 1, "message_id": 10, "text": text}
+    return await limiter.process_request(callback, (text,), {}, "editMessageText", data, None)
+
+
+def test_edit_is_sent_without_delay_when_idle():
+    async def main():
+        limiter, sent = RateLimiter(), []
+
+        async def callback(text):
+            sent.append(asyncio.get_running_loop().time())
+            return text
+
+        start = asyncio.get_running_loop().time()
+        result = await _edit(limiter, callback, "a")
+        await limiter.shutdown()
+        return result, sent[0] - start
+
+    result, delay = asyncio.run(main())
+    assert result == "a"
+    assert delay < 0.05
+
+
+def test_cancelled_caller_does_not_drop_coalesced_edit():
+    async def main():
+        limiter, sent = RateLimiter(overall_rate=1), []
+
+        async def callback(text):
+            sent.append(text)
+            return text
+
+        await _request(limiter, _recorder([]), "getChat", -1)  # 耗尽全局令牌，使编辑进入排队
+        first = asyncio.create_task(_edit(limiter, callback, "a"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(_edit(limiter, callback, "b"))
+        await asyncio.sleep(0)
+        first.cancel()
+        result = await second
+        await limiter.shutdown()
+        return first.cancelled(), result, sent
+
+    first_cancelled, result, sent = asyncio.run(main())
+    assert first_cancelled
+    assert result == "b"
+    assert sent == ["b"]
+
+
+def test_rapid_edits_to_one_message_are_coalesced():
+    async def main():
+        limiter, sent = RateLimiter(edit_window=0.2), []
+
+        async def callback(text):
+            sent.append(text)
+            return text
+
+        edits = []
+        for index in range(10):
+            edits.append(asyncio.create_task(_edit(limiter, callback, str(index))))
+            await asyncio.sleep(0.03)
+        results = await asyncio.gather(*edits)
+        await limiter.shutdown()
+        return results, sent
+
+    results, sent = asyncio.run(main())
+    assert len(sent) < 10
+    assert sent[0] == "0" and sent[-1] == "9"
+    assert results[-1] == "9"
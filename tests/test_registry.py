@@ -0,0 +1,78 @@
+from typing import List
+
+import pytest
+
+from meido.utils.registry import TypeRegistry
+
+
+class _Base:
+    pass
+
+
+class _Child(_Base):
+    pass
+
+
+class _GrandChild(_Child):
+    pass
+
+
+class _Other:
+    pass
+
+
+def test_exact_type_wins_over_mro():
+    registry: TypeRegistry[object] = TypeRegistry()
+    child, base = _Child(), _Base()
+    registry.add(child)
+    registry.add(base)
+    assert registry.get(_Base) is base
+    assert registry.get(_Child) is child
+
+
+def test_base_resolves_to_first_registered_subclass():
+    registry: TypeRegistry[object] = TypeRegistry()
+    grand_child, child = _GrandChild(), _Child()
+    registry.add(grand_child)
+    registry.add(child)
+    assert registry.get(_Base) is grand_child
+    assert registry[_Child] is child
+    assert _Base in registry and _Other not in registry
+    assert registry.get(_Other) is None and registry.get(_Other, "default") == "default"
+    with pytest.raises(KeyError):
+        _ = registry[_Other]
+
+
+def test_explicit_key_and_unhashable_targets():
+    registry: TypeRegistry[object] = TypeRegistry()
+    other = _Other()
+    registry.add(other, _Base)
+    assert registry.get(_Base) is other
+    assert registry.get(_Other) is None
+    assert registry.get(List[int]) is None
+    assert registry.get([]) is None
+
+
+def test_cache_is_invalidated_on_changes():
+    registry: TypeRegistry[object] = TypeRegistry()
+    assert registry.get(_Base) is None  # 未找到的结果同样被缓存
+    child = _Child()
+    registry.add(child)
+    assert registry.get(_Base) is child
+    base = _Base()
+    registry.add(base)
+    assert registry.get(_Base) is base
+    assert registry.remove(_Base) is base
+    assert registry.get(_Base) is child
+    assert registry.remove(_Other) is None
+    registry.clear()
+    assert registry.get(_Base) is None and len(registry) == 0
+
+
+def test_iteration_is_a_snapshot():
+    registry: TypeRegistry[object] = TypeRegistry()
+    registry.add(_Base())
+    registry.add(_Child())
+    for instance in registry:
+        registry.remove(type(instance))
+    assert len(registry) == 0
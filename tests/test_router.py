@@ -0,0 +1,112 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any, List
+
+from telegram import MessageEntity
+from telegram.ext import ApplicationHandlerStop, BaseHandler, CommandHandler
+
+from meido.handler.router import PluginRouter
+from tests.conftest import make_bot, make_update
+
+
+class _Probe(BaseHandler):
+    """记录检查与处理顺序的 handler"""
+
+    def __init__(self, name: str, log: List[str], matches=lambda update: True, error: Exception = None, on_handle=None):
+        super().__init__(self._callback)
+        self.name = name
+        self.log = log
+        self.matches = matches
+        self.error = error
+        self.on_handle = on_handle
+
+    def check_update(self, update: object) -> Any:
+        self.log.append(f"check {self.name}")
+        if self.error is not None:
+            raise self.error
+        return self.matches(update) or None
+
+    async def _callback(self, update, context):
+        self.log.append(f"handle {self.name}")
+        if self.on_handle is not None:
+            self.on_handle()
+
+    async def handle_update(self, update, application, check_result, context):
+        return await self.callback(update, context)
+
+
+class _Application:
+    def __init__(self, stop_on_error: bool = False):
+        self.bot = SimpleNamespace(defaults=None)
+        self.errors: List[Exception] = []
+        self.stop_on_error = stop_on_error
+
+    async def process_error(self, update: object, error: Exception, **_) -> bool:
+        self.errors.append(error)
+        return self.stop_on_error
+
+    def create_task(self, coroutine, update=None):
+        return asyncio.ensure_future(coroutine)
+
+
+async def _process(router: PluginRouter, update: object, application: _Application) -> bool:
+    """与 Application.process_update 对单个 group 的处理相同"""
+    if (check := router.check_update(update)) is None:
+        return False
+    try:
+        await router.handle_update(update, application, check, SimpleNamespace())
+    except ApplicationHandlerStop:
+        pass
+    return True
+
+
+def test_groups_are_checked_after_earlier_groups_are_handled():
+    log: List[str] = []
+    state = {"seen": False}
+    router = PluginRouter()
+    router.add_handlers(1, [_Probe("first", log, on_handle=lambda: state.update(seen=True))])
+    router.add_handlers(2, [_Probe("second", log, matches=lambda update: state["seen"])])
+    assert asyncio.run(_process(router, object(), _Application()))
+    assert log == ["check first", "handle first", "check second", "handle second"]
+
+
+def test_check_errors_are_isolated_per_group():
+    log: List[str] = []
+    router = PluginRouter()
+    router.add_handlers(1, [_Probe("broken", log, error=RuntimeError("broken"))])
+    router.add_handlers(2, [_Probe("fine", log)])
+    router.add_handlers(3, [_Probe("also broken", log, error=ValueError("broken")), _Probe("skipped", log)])
+    router.add_handlers(4, [_Probe("last", log)])
+    application = _Application()
+    assert asyncio.run(_process(router, object(), application))
+    assert [type(i) for i in application.errors] == [RuntimeError, ValueError]
+    assert log == ["check broken", "check fine", "handle fine", "check also broken", "check last", "handle last"]
+
+
+def test_error_handler_can_stop_routing():
+    log: List[str] = []
+    router = PluginRouter()
+    router.add_handlers(1, [_Probe("broken", log, error=RuntimeError("broken"))])
+    router.add_handlers(2, [_Probe("fine", log)])
+    assert asyncio.run(_process(router, object(), _Application(stop_on_error=True)))
+    assert log == ["check broken"]
+
+
+def test_unmatched_update_is_not_handled():
+    router = PluginRouter()
+    router.add_handlers(1, [CommandHandler("start", lambda update, context: None)])
+    router.add_handlers(2, [_Probe("never", [], matches=lambda update: False)])
+    assert router.check_update(make_update(1, text="/help", bot=make_bot())) is None
+    assert router.check_update(make_update(1, text="/start", bot=make_bot())) is not None
+
+
+def test_command_is_taken_from_bot_command_entity():
+    router = PluginRouter()
+    router.add_handlers(1, [CommandHandler("start", lambda update, context: None)])
+    bot = make_bot()
+    for text in ("/start，", "/start,x", "/start@meido_bot，你好"):
+        length = len(text.split("，")[0].split(",")[0])
+        update = make_update(1, text=text, bot=bot, entities=[MessageEntity(MessageEntity.BOT_COMMAND, 0, length)])
+        assert CommandHandler("start", lambda update, context: None).check_update(update)
+        assert router.check_update(update) is not None, text
+    assert router.check_update(make_update(1, text="/startx", bot=bot)) is None
@@ -0,0 +1,98 @@
+import json
+import asyncio
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from meido.utils.timeline import StartupTimeline
+
+
+class _Process:
+    """按顺序返回预设 RSS 的 psutil.Process"""
+
+    samples = []
+
+    def memory_info(self):
+        return SimpleNamespace(rss=self.samples.pop(0))
+
+
+@pytest.fixture
+def timeline(monkeypatch):
+    monkeypatch.setitem(sys.modules, "psutil", SimpleNamespace(Process=_Process))
+    _Process.samples = [100, 100, 200, 250, 400, 300]
+    timeline = StartupTimeline()
+    timeline.enable_profiling()  # 启用时采样一次
+    return timeline
+
+
+def test_spans_record_phases_in_completion_order(timeline):
+    _Process.samples.append(350)
+    with timeline.span("startup", "plugin"):  # 开始与结束时各采样一次
+        with timeline.span("plugin", "Foo", "construct"):
+            pass
+        with pytest.raises(RuntimeError):
+            with timeline.span("plugin", "Foo", "install"):  # 出现异常时仍然记录
+                raise RuntimeError
+    spans = timeline.spans()
+    assert [(i.category, i.name, i.phase) for i in spans] == [
+        ("plugin", "Foo", "construct"),
+        ("plugin", "Foo", "install"),
+        ("startup", "plugin", ""),
+    ]
+    construct, install, outer = spans
+    assert 0 <= outer.start <= construct.start <= construct.end <= install.start <= install.end <= outer.end
+    assert (construct.rss_delta, install.rss_delta, outer.rss_delta) == (50, -100, 250)
+    assert timeline.spans("plugin") == [construct, install]
+    assert timeline.peak_rss == 400
+
+
+def test_report_and_dump(timeline, tmp_path):
+    _Process.samples.append(500)
+    with timeline.span("service", "Cache", "initialize"):
+        pass
+    assert "Cache" in timeline.report("service") and "RSS 峰值" in timeline.report()
+    timeline.dump(tmp_path / "startup.json")
+    data = json.loads((tmp_path / "startup.json").read_text(encoding="utf-8"))
+    assert data["peak_rss"] == 200
+    assert [(i["category"], i["phase"], i["rss_delta"]) for i in data["spans"]] == [("service", "initialize", 100)]
+
+
+def test_rss_is_not_sampled_without_profiling():
+    timeline = StartupTimeline()
+    with timeline.span("import", "plugins.foo"):
+        pass
+    (span,) = timeline.spans()
+    assert span.rss_delta is None and not timeline.profiling
+    assert "RSS" not in timeline.report()
+    timeline.reset()
+    assert timeline.spans() == []
+
+
+def test_plugin_manager_records_construct_and_install(monkeypatch):
+    from meido.manager import PluginManager
+
+    class _Plugin:
+        async def install(self):
+            pass
+
+    async def executor(target):
+        return target()
+
+    async def install_task(plugin, instance):
+        await instance.install()
+        return True
+
+    manager = PluginManager()
+    manager._timeline = StartupTimeline()
+    manager._executor = executor
+    monkeypatch.setattr(PluginManager, "plugin_install_task", staticmethod(install_task))
+    try:
+        assert isinstance(asyncio.run(manager._install_plugin(_Plugin)), _Plugin)
+    finally:
+        manager._unregister(_Plugin)
+        manager._plugins.pop(_Plugin, None)
+    assert [(i.category, i.name, i.phase) for i in manager.timeline.spans()] == [
+        ("plugin", "_Plugin", "construct"),
+        ("plugin", "_Plugin", "install"),
+    ]
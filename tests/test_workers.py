@@ -0,0 +1,116 @@
+import asyncio
+import gc
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+
+import pytest
+
+from meido.builtins.executor import HandlerExecutor, JobExecutor
+from meido.plugin import Plugin, handler, job
+from meido.utils.workers import Offload, WorkerPool, WorkerPools
+from tests.conftest import make_application
+
+
+def _square(value: int) -> int:
+    return value * value
+
+
+def _fail() -> None:
+    raise RuntimeError("boom")
+
+
+class _Plugin:
+    def __init__(self):
+        self.lock = Lock()  # 插件实例通常持有无法被 pickle 的状态
+
+    def callback(self) -> int:
+        return 1
+
+
+def test_failures_are_not_counted_as_completed():
+    pool = WorkerPool("thread", partial(ThreadPoolExecutor, max_workers=2), 2)
+
+    async def main():
+        assert await pool.run(_square, 3) == 9
+        with pytest.raises(RuntimeError):
+            await pool.run(_fail)
+
+    asyncio.run(main())
+    pool.shutdown(wait=True)
+    assert pool.stats() == {
+        "max_workers": 2,
+        "submitted": 2,
+        "completed": 1,
+        "failed": 1,
+        "in_flight": 0,
+        "max_in_flight": 1,
+        "queue_depth": 0,
+    }
+
+
+def test_process_pool_runs_module_level_functions():
+    workers = WorkerPools(process_workers=1)
+    try:
+        assert asyncio.run(workers.run(Offload.Process, _square, 4)) == 16
+    finally:
+        workers.shutdown(wait=True)
+
+
+@pytest.mark.parametrize("func", [lambda: 1, _Plugin().callback])
+def test_process_pool_rejects_unpicklable_functions(func):
+    workers = WorkerPools(process_workers=1)
+    pool = workers.get(Offload.Process)
+    with pytest.raises(TypeError):
+        asyncio.run(pool.run(func))
+    assert pool.submitted == 0 and pool._executor is None
+
+
+@pytest.mark.parametrize("executor_class", [HandlerExecutor, JobExecutor])
+def test_callback_executors_reject_process_offload(executor_class):
+    with pytest.raises(ValueError):
+        executor_class(_Plugin().callback, offload="process")
+
+
+def test_decorators_reject_process_offload():
+    with pytest.raises(ValueError):
+        handler.command("start", offload="process")
+    with pytest.raises(ValueError):
+        job.run_once(when=1, offload=Offload.Process)
+    assert handler.command("start", offload="thread").offload is Offload.Thread
+
+
+def test_callback_executors_are_not_cached_by_name():
+    plugin = _Plugin()
+    first, second = HandlerExecutor(plugin.callback), JobExecutor(plugin.callback)
+    assert first is not HandlerExecutor(plugin.callback)
+    assert first._callback == second._callback == plugin.callback
+    assert all(not isinstance(i, (HandlerExecutor, JobExecutor)) for i in HandlerExecutor._instances.values())
+    reference = weakref.ref(plugin)
+    del plugin, first, second
+    gc.collect()
+    assert reference() is None
+
+
+def test_offloaded_handler_keeps_calling_convention():
+    class _Offloaded(Plugin):
+        @handler.command("start", offload="thread")
+        def start(self, update, context):
+            return threading.current_thread() is not threading.main_thread(), update, context
+
+        @job.run_once(when=1, offload=True)
+        def tick(self, context):
+            return threading.current_thread() is not threading.main_thread(), context
+
+    workers = WorkerPools(thread_workers=1)
+    plugin = _Offloaded()
+    plugin.set_application(make_application(workers=workers))
+    try:
+        callback = plugin.handlers[0].callback
+        job_callback = plugin._job_callback(plugin.tick, plugin.tick._job_data[0])
+        assert asyncio.run(callback("update", "context")) == (True, "update", "context")
+        assert asyncio.run(job_callback("context")) == (True, "context")
+    finally:
+        workers.shutdown(wait=True)